@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the PCFG training and of the parsers on a synthetic treebank
+(no corpus needed).
+"""
+
+
+from speechnlpProject.benchmark import run_benchmark, compare_results, \
+    save_results, load_results
+from speechnlpProject.synthetic_treebank import Treebank_Generator
+from speechnlpProject.parse import CYK_Parser
+from speechnlpProject.vectorized_parse import Vectorized_CYK_Parser
+from speechnlpProject.agenda_parse import AStar_CYK_Parser
+import argparse
+import sys
+
+
+# USAGE:
+# Run the benchmark and save the results:
+# python benchmark_main.py --output base.json
+# Run it again after a change, and compare (exit status 1 on regression):
+# python benchmark_main.py --output new.json --compare base.json
+# Compare two saved runs:
+# python benchmark_main.py --compare base.json new.json
+# Write a synthetic treebank usable with test_main.py --corpus:
+# python benchmark_main.py --write-treebank synthetic.mrg --sentences 3000
+
+
+PARSERS = {"cyk": CYK_Parser, "vectorized": Vectorized_CYK_Parser, \
+    "astar": AStar_CYK_Parser}
+
+
+def print_results(results):
+    """
+        print_results
+        Prints the main benchmark results.
+
+        Parameters
+        ----------
+        results: dict.
+    """
+    train = results["train"]
+    print("train: %.3fs (%d non-terminals, %d words), parser init: %.3fs" \
+        % (train["train_s"], train["n_non_terminals"], train["n_words"], \
+        train["parser_init_s"]))
+    print("%8s %10s %10s %10s %10s %12s %7s" % ("length", "p50 ms", \
+        "p95 ms", "p99 ms", "mean ms", "sentences/s", "failed"))
+    for length, stats in results["parse"].items():
+        print("%8s %10.2f %10.2f %10.2f %10.2f %12.2f %7s" % (length, \
+            stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], \
+            stats["mean_ms"], stats["sentences_per_s"], \
+            stats.get("failed", "")))
+    unknown = results["unknown_words"]
+    print("unknown words: index %.3fs, p50 %.3f ms, p95 %.3f ms, p99 " \
+        "%.3f ms, %d/%d replaced" % (unknown["index_s"], \
+        unknown["p50_ms"], unknown["p95_ms"], unknown["p99_ms"], \
+        unknown["replaced"], unknown["n"]))
+    for name, value in sorted(results["memory"].items()):
+        print("%s: %.1f MB" % (name, value / 2**20))
+
+
+def print_comparison(comparison):
+    """
+        print_comparison
+        Prints the comparison of two runs.
+
+        Parameters
+        ----------
+        comparison: list(tuple).
+            Result of compare_results.
+
+        Returns
+        ----------
+        n_regressions: int.
+    """
+    n_regressions = 0
+    for name, base_value, new_value, change, regression in comparison:
+        print("%-32s %14.4g %14.4g %+8.1f%% %s" % (name, base_value, \
+            new_value, 100 * change, "REGRESSION" if regression else ""))
+        n_regressions += regression
+    print(n_regressions, "regression(s)")
+    return n_regressions
+
+
+arg_parser = argparse.ArgumentParser(description="PCFG/CYK benchmark.")
+arg_parser.add_argument("--parser", default="vectorized", \
+    choices=sorted(PARSERS.keys()), help="Parser to be benchmarked.")
+arg_parser.add_argument("--sentences", type=int, default=2000, \
+    help="Number of sentences of the synthetic training treebank.")
+arg_parser.add_argument("--depth", type=int, default=4, \
+    help="Maximum depth of the synthetic trees.")
+arg_parser.add_argument("--branching", type=int, default=3, \
+    help="Maximum number of children of the synthetic phrases.")
+arg_parser.add_argument("--vocabulary", type=int, default=1000, \
+    help="Number of open class words of the synthetic treebank.")
+arg_parser.add_argument("--seed", type=int, default=0, \
+    help="Seed of the synthetic treebank.")
+arg_parser.add_argument("--lengths", default="5,10,15,20,30,40,50,60", \
+    help="Lengths of the parsed sentences, separated by commas.")
+arg_parser.add_argument("--per-length", type=int, default=10, \
+    help="Number of parsed sentences of each length.")
+arg_parser.add_argument("--unknown-words", type=int, default=200, \
+    help="Number of unknown words looked up.")
+arg_parser.add_argument("--workers", type=int, default=1, \
+    help="Number of worker processes used to train.")
+arg_parser.add_argument("--no-memory", action="store_true", \
+    help="Do not measure the peak memory (faster).")
+arg_parser.add_argument("--output", default=None, \
+    help="Save the results to this JSON file.")
+arg_parser.add_argument("--compare", nargs="+", default=None, \
+    help="Compare with the results of this file (or compare two files).")
+arg_parser.add_argument("--tolerance", type=float, default=0.2, \
+    help="Relative change above which a metric is a regression.")
+arg_parser.add_argument("--write-treebank", default=None, \
+    help="Only write the synthetic treebank to this file.")
+args = arg_parser.parse_args()
+
+
+if args.write_treebank is not None:
+    generator = Treebank_Generator(args.depth, args.branching, \
+        args.vocabulary, args.seed)
+    with open(args.write_treebank, "w") as f:
+        for tree in generator.treebank(args.sentences):
+            f.write(tree + "\n")
+    sys.exit(0)
+
+if args.compare is not None and len(args.compare) == 2:
+    sys.exit(1 if print_comparison(compare_results(load_results( \
+        args.compare[0]), load_results(args.compare[1]), \
+        args.tolerance)) > 0 else 0)
+
+results = run_benchmark(PARSERS[args.parser], n_sentences=args.sentences, \
+    lengths=[int(length) for length in args.lengths.split(",")], \
+    per_length=args.per_length, n_unknown=args.unknown_words, \
+    max_depth=args.depth, max_branching=args.branching, \
+    vocabulary_size=args.vocabulary, seed=args.seed, workers=args.workers, \
+    memory=not args.no_memory)
+print_results(results)
+if args.output is not None:
+    save_results(results, args.output)
+    print("Saved results to " + args.output)
+
+if args.compare is not None:
+    if len(args.compare) != 1:
+        raise Exception("--compare takes one or two files")
+    sys.exit(1 if print_comparison(compare_results(load_results( \
+        args.compare[0]), results, args.tolerance)) > 0 else 0)
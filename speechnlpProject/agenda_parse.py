@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+"""
+Agenda-based A* parser: edges (non-terminal over a span) are popped from a
+priority queue by inside log-score plus an admissible estimate of their
+outside log-score, and parsing stops as soon as the root symbol over the
+whole sentence is popped.
+"""
+
+
+from speechnlpProject.grammar import *
+from speechnlpProject.vectorized_parse import *
+from speechnlpProject.parse import _Budget_Exceeded
+import heapq
+import numpy as np
+import time
+
+
+# Added to the outside estimate for each word out of the span, so that
+# rounding errors never make a parent edge pass before its children
+_EPSILON = 1e-9
+
+
+def context_scores(grammar, root):
+    """
+        context_scores
+        Computes, for each non-terminal a, the best log-probability of the
+        rules on a path from the root down to a (Dijkstra on the rules,
+        whose log-probabilities are <= 0). Since every inside score is also
+        <= 0, it bounds the rule part of the outside score of a.
+
+        Parameters
+        ----------
+        grammar: CompiledPCFG.
+        root: int.
+            The id of the root non-terminal.
+
+        Returns
+        ----------
+        rho: np.array(n_nt).
+            -inf for the non-terminals which can not be reached from root.
+    """
+    rule_parent, rule_left, rule_right, rule_logp = grammar.binary_rules()
+    parent_ptr = grammar.rules_by_parent()
+    rho = np.full(grammar.n_nt(), -np.inf)
+    done = np.zeros(grammar.n_nt(), dtype=bool)
+    rho[root] = 0.0
+    agenda = [(0.0, root)]
+    while len(agenda) > 0:
+        neg_score, a = heapq.heappop(agenda)
+        if done[a]:
+            continue
+        done[a] = True
+        for r in range(parent_ptr[a], parent_ptr[a+1]):
+            score = rho[a] + rule_logp[r]
+            for child in (rule_left[r], rule_right[r]):
+                if score > rho[child]:
+                    rho[child] = score
+                    heapq.heappush(agenda, (-score, child))
+    return rho
+
+
+def outside_length_scores(grammar, root, max_length):
+    """
+        outside_length_scores
+        Computes the context-summary outside estimate of each non-terminal
+        given the number of words out of its span (but not the words): the
+        best outside log-score when each word can be any word of the
+        lexicon.
+
+        Parameters
+        ----------
+        grammar: CompiledPCFG.
+        root: int.
+            The id of the root non-terminal.
+        max_length: int.
+            The largest number of words out of the span.
+
+        Returns
+        ----------
+        outside: np.array((n_nt, max_length+1)).
+            outside[a, m]: estimate for m words out of the span.
+    """
+    rule_parent, rule_left, rule_right, rule_logp = grammar.binary_rules()
+    n_nt = grammar.n_nt()
+
+    # Best inside log-score over any sequence of s words
+    inside = np.full((n_nt, max_length+1), -np.inf)
+    for w in range(len(grammar.words())):
+        nt_ids, logps = grammar.lexical_rules(w)
+        np.maximum.at(inside[:, 1], nt_ids, logps)
+    for s in range(2, max_length+1):
+        for s1 in range(1, s):
+            np.maximum.at(inside[:, s], rule_parent, inside[rule_left, s1] + \
+                inside[rule_right, s-s1] + rule_logp)
+
+    # The sibling of a non-terminal covers s of the m words out of its span
+    outside = np.full((n_nt, max_length+1), -np.inf)
+    outside[root, 0] = 0.0
+    for m in range(1, max_length+1):
+        for s in range(1, m+1):
+            np.maximum.at(outside[:, m], rule_left, outside[rule_parent, m-s] \
+                + rule_logp + inside[rule_right, s])
+            np.maximum.at(outside[:, m], rule_right, \
+                outside[rule_parent, m-s] + rule_logp + inside[rule_left, s])
+    return outside
+
+
+class AStar_CYK_Parser(Vectorized_CYK_Parser):
+    """
+        AStar_CYK_Parser
+        Drop-in replacement of Vectorized_CYK_Parser, returning the same
+        parses (including the tie-breaking: the derivations of an edge are
+        compared on (score, split, rule), even after the edge is popped),
+        which only builds the edges whose score plus outside estimate is
+        above the best parse.
+        The outside estimate of a non-terminal a over a span is the
+        minimum of:
+            context_scores(a) plus the best lexical log-probability of each
+            word out of the span,
+            outside_length_scores(a, number of words out of the span).
+        Both are admissible and consistent, hence so is their minimum.
+    """
+
+
+    def __init__(self, pcfg, root_symbol, verbose=False, max_length=40, \
+            time_budget=None, edge_budget=None, cache=None, \
+            collect_stats=False, oov_distance=3):
+        """
+            AStar_CYK_Parser.__init__
+
+            Parameters
+            ----------
+            pcfg: PCFG.
+                The grammar, preferably in Chomsky normal form.
+            root_symbol: GSymbol.
+                The symbol expected over the whole sentence.
+            verbose=False: bool.
+                Optional. Prints the chart after each parse.
+            max_length=40: int.
+                Optional. The context-summary estimate is precomputed up to
+                max_length words out of a span (only the first estimate is
+                used beyond).
+            time_budget=None, edge_budget=None: float, int.
+                Optional. Budget of a parse (see CYK_Parser.__init__), the
+                pairs of sub-derivations being a popped edge with each
+                popped edge of its sibling cells. When it is spent, the
+                degraded parses use the vectorized CYK.
+            cache=None: Parse_Cache.
+                Optional. Cache of the parses (see CYK_Parser.__init__).
+            collect_stats=False: bool.
+                Optional. Collects the stats of each parse (see
+                CYK_Parser.parse_stats; the agenda builds no chart level,
+                and adds the counters "pushed_edges" and "popped_edges").
+            oov_distance=3: int.
+                Optional. Maximum edit distance of the replacement of an
+                unknown word.
+        """
+        # Used by _load_grammar
+        self._max_length = max_length
+        Vectorized_CYK_Parser.__init__(self, pcfg, root_symbol, verbose, \
+            time_budget=time_budget, edge_budget=edge_budget, cache=cache, \
+            collect_stats=collect_stats, oov_distance=oov_distance)
+        self._agenda_stats = {"pushed_edges": 0, "popped_edges": 0}
+
+
+    def _load_grammar(self):
+        """
+            AStar_CYK_Parser._load_grammar
+            Compiles the grammar and precomputes the estimates of the
+            outside scores (see CYK_Parser._load_grammar).
+        """
+        Vectorized_CYK_Parser._load_grammar(self)
+        self._root = self._grammar.nt_id(self._root_symbol)
+        n_nt = len(self._nt_symbs)
+        if self._root is None:
+            self._rho = np.full(n_nt, -np.inf)
+            self._outside_length = np.full((n_nt, 1), -np.inf)
+        else:
+            self._rho = context_scores(self._grammar, self._root)
+            self._outside_length = outside_length_scores(self._grammar, \
+                self._root, self._max_length)
+        self._left_ptr, self._left_rules = self._grammar.rules_by_left()
+        self._right_ptr, self._right_rules = self._grammar.rules_by_right()
+
+
+    def agenda_stats(self):
+        """
+            AStar_CYK_Parser.agenda_stats
+            Get the statistics of the last parse.
+
+            Returns
+            ----------
+            stats: dict(string: int).
+                "pushed_edges": number of edges pushed on the agenda (with
+                a new best score),
+                "popped_edges": number of edges popped (i.e. built).
+        """
+        return dict(self._agenda_stats)
+
+
+    def _relax(self, chart, agenda, outside, cells, splits, rules, scores):
+        """
+            AStar_CYK_Parser._relax
+            Updates edges with new derivations, and pushes the improved ones
+            on the agenda.
+
+            Parameters
+            ----------
+            chart: tuple(np.array).
+                The flat charts score, rule, split and done, of shape
+                (n_cells, n_nt).
+            agenda: list(tuple).
+                The priority queue.
+            outside: np.array((n_cells, n_nt)).
+                Outside estimate of each edge.
+            cells, splits, rules, scores: np.array.
+                The derivations: parent cell, split point, rule and inside
+                log-score.
+        """
+        chart_score, chart_rule, chart_split, chart_done = chart
+        parents = self._rule_parent[rules]
+        # A popped edge has its best score, but a derivation of the same
+        # score may still take its backpointers by the tie-breaking
+        done = chart_done[cells, parents]
+        keep = (outside[cells, parents] > -np.inf) & (~done | \
+            (scores == chart_score[cells, parents]))
+        if not np.any(keep):
+            return
+
+        # Best derivation per edge, with the same tie-breaking as the
+        # vectorized CYK: lowest split point, then lowest rule index
+        order = np.lexsort((rules[keep], splits[keep], -scores[keep], \
+            parents[keep], cells[keep]))
+        cells = cells[keep][order]
+        parents = parents[keep][order]
+        first = np.flatnonzero(np.append(True, (cells[1:] != cells[:-1]) | \
+            (parents[1:] != parents[:-1])))
+        cells = cells[first]
+        parents = parents[first]
+        order = order[first]
+        splits = splits[keep][order]
+        rules = rules[keep][order]
+        scores = scores[keep][order]
+
+        old_scores = chart_score[cells, parents]
+        old_splits = chart_split[cells, parents]
+        better = (scores > old_scores) | ((scores == old_scores) & \
+            ((splits < old_splits) | ((splits == old_splits) & \
+                (rules < chart_rule[cells, parents]))))
+        chart_score[cells[better], parents[better]] = scores[better]
+        chart_split[cells[better], parents[better]] = splits[better]
+        chart_rule[cells[better], parents[better]] = rules[better]
+
+        # Only new best scores need a new agenda entry
+        pushed = (scores > old_scores) & ~chart_done[cells, parents]
+        priorities = scores[pushed] + outside[cells[pushed], parents[pushed]]
+        for c, a, priority in zip(cells[pushed].tolist(), \
+                parents[pushed].tolist(), priorities.tolist()):
+            heapq.heappush(agenda, (-priority, self._cell_level[c], c, a))
+        self._agenda_stats["pushed_edges"] += len(priorities)
+
+
+    def _build_chart(self, words, resolved, prune):
+        """
+            AStar_CYK_Parser._build_chart
+            Builds the edges of a sentence in best-first order, until the
+            root symbol over the whole sentence is popped.
+
+            Parameters
+            ----------
+            words: list(string).
+                The input words.
+            resolved: list(string).
+                The corresponding words of the lexicon.
+            prune: bool.
+                Unused (no pruning mode).
+
+            Returns
+            ----------
+            chart_score, chart_rule, chart_split: list(np.array).
+                As in Vectorized_CYK_Parser, the popped edges having their
+                best score and backpointers.
+        """
+        # Beam of a degraded parse: vectorized CYK
+        if self._beam_width is not None:
+            return Vectorized_CYK_Parser._build_chart(self, words, resolved, \
+                prune)
+
+        n = len(words)
+        n_nt = len(self._nt_symbs)
+        self._agenda_stats = {"pushed_edges": 0, "popped_edges": 0}
+        stats = self._stats
+        if stats is not None:
+            stats.count("charts")
+            lexical_start = time.perf_counter()
+
+        # Flat charts: the cell (lev, k) is the row offset[lev]+k
+        offset = np.zeros(n+1, dtype=np.int64)
+        np.cumsum(np.arange(n, 0, -1), out=offset[1:])
+        n_cells = int(offset[n])
+        self._cell_level = np.repeat(np.arange(n), \
+            np.arange(n, 0, -1)).tolist()
+        score_flat = np.full((n_cells, n_nt), -np.inf)
+        rule_flat = np.full((n_cells, n_nt), -1, dtype=np.int32)
+        split_flat = np.full((n_cells, n_nt), n, dtype=np.int32)
+        done_flat = np.zeros((n_cells, n_nt), dtype=bool)
+        chart = (score_flat, rule_flat, split_flat, done_flat)
+        # Number of popped edges in each cell
+        n_done = np.zeros(n_cells, dtype=np.int64)
+
+        # Outside estimate of each edge: the best lexical log-probability
+        # of the words out of the cell plus context_scores, or the
+        # context-summary estimate
+        lexical = [self._grammar.lexical_rules(self._grammar.word_id(ts)) \
+            for ts in resolved]
+        best_word = np.array([logps.max() for nt_ids, logps in lexical])
+        prefix = np.append(0.0, np.cumsum(best_word))
+        outside_words = np.array([prefix[n] - prefix[k+lev+1] + prefix[k] \
+            for lev in range(n) for k in range(n-lev)])
+        outside = self._rho[np.newaxis, :] + outside_words[:, np.newaxis]
+        for lev in range(n):
+            m = n-lev-1
+            rows = outside[offset[lev]:offset[lev+1]]
+            if m < self._outside_length.shape[1]:
+                np.minimum(rows, self._outside_length[:, m], out=rows)
+            rows += _EPSILON * m
+
+        agenda = []
+        for k in range(n):
+            nt_ids, logps = lexical[k]
+            reachable = outside[k, nt_ids] > -np.inf
+            score_flat[k, nt_ids[reachable]] = logps[reachable]
+            split_flat[k, nt_ids[reachable]] = 0
+            for a, logp in zip(nt_ids[reachable].tolist(), \
+                    logps[reachable].tolist()):
+                heapq.heappush(agenda, (-(logp + outside[k, a]), 0, k, a))
+                self._agenda_stats["pushed_edges"] += 1
+        if stats is not None:
+            stats.add_time("lexical", time.perf_counter() - lexical_start)
+            n_rules = 0
+
+        root_cell = n_cells - 1
+        while len(agenda) > 0:
+            neg_priority, lev, c, a = heapq.heappop(agenda)
+            if done_flat[c, a]:
+                continue
+            done_flat[c, a] = True
+            n_done[c] += 1
+            self._agenda_stats["popped_edges"] += 1
+            if c == root_cell and a == self._root:
+                break
+            k = c - offset[lev]
+            score = score_flat[c, a]
+            cells = []
+            splits = []
+            rules = []
+            scores = []
+
+            # As left child: right siblings over (j, k+lev+1), parents over
+            # (lev+1+j, k)
+            left_rules = self._left_rules[self._left_ptr[a]:\
+                self._left_ptr[a+1]]
+            if len(left_rules) > 0 and k+lev+1 < n:
+                sibling_levels = np.arange(n-k-lev-1)
+                siblings = offset[:n-k-lev-1] + k+lev+1
+                active = n_done[siblings] > 0
+                siblings = siblings[active]
+                sibling_levels = sibling_levels[active]
+                j, r = np.nonzero(done_flat[siblings][:, \
+                    self._rule_right[left_rules]])
+                if len(j) > 0:
+                    r = left_rules[r]
+                    cells.append(offset[lev+1+sibling_levels[j]] + k)
+                    splits.append(np.full(len(r), lev))
+                    rules.append(r)
+                    scores.append((score + score_flat[siblings[j], \
+                        self._rule_right[r]]) + self._rule_logp[r])
+
+            # As right child: left siblings over (j, k-1-j), parents over
+            # (lev+1+j, k-1-j)
+            right_rules = self._right_rules[self._right_ptr[a]:\
+                self._right_ptr[a+1]]
+            if len(right_rules) > 0 and k > 0:
+                sibling_levels = np.arange(k)
+                siblings = offset[:k] + k-1-sibling_levels
+                active = n_done[siblings] > 0
+                siblings = siblings[active]
+                sibling_levels = sibling_levels[active]
+                j, r = np.nonzero(done_flat[siblings][:, \
+                    self._rule_left[right_rules]])
+                if len(j) > 0:
+                    r = right_rules[r]
+                    cells.append(offset[lev+1+sibling_levels[j]] + \
+                        k-1-sibling_levels[j])
+                    splits.append(sibling_levels[j])
+                    rules.append(r)
+                    scores.append((score_flat[siblings[j], \
+                        self._rule_left[r]] + score) + self._rule_logp[r])
+
+            if len(cells) > 0:
+                cells = np.concatenate(cells)
+                if stats is not None:
+                    n_rules += len(cells)
+                self._relax(chart, agenda, outside, cells, \
+                    np.concatenate(splits), np.concatenate(rules), \
+                    np.concatenate(scores))
+            # The budget counts the pairs of sub-derivations, as
+            # CYK_Parser: the edge with each popped edge of its sibling
+            # cells
+            n_edges = 0
+            if self._edge_limit is not None:
+                n_edges = int(n_done[offset[:n-k-lev-1] + k+lev+1].sum() + \
+                    n_done[offset[:k] + k-1-np.arange(k)].sum())
+            try:
+                self._spend(n_edges, None)
+            except _Budget_Exceeded:
+                if stats is not None:
+                    self._agenda_chart_stats(n_done, n_rules)
+                # The popped edges have their best derivation, and so do
+                # all the lexical edges
+                raise _Budget_Exceeded(self._level_views(chart, offset, \
+                    True))
+
+        if stats is not None:
+            self._agenda_chart_stats(n_done, n_rules)
+        return self._level_views(chart, offset)
+
+
+    def _agenda_chart_stats(self, n_done, n_rules):
+        """
+            AStar_CYK_Parser._agenda_chart_stats
+            Adds the counters of an agenda to the stats of the parse.
+
+            Parameters
+            ----------
+            n_done: np.array(int).
+                Number of popped edges of each cell.
+            n_rules: int.
+                Number of rules applied.
+        """
+        self._stats.count("cells", int(np.count_nonzero(n_done)))
+        self._stats.count("rules", n_rules)
+        self._stats.count("chart_entries", int(n_done.sum()))
+        for name, n in self._agenda_stats.items():
+            self._stats.count(name, n)
+
+
+    def _level_views(self, chart, offset, lexical=False):
+        """
+            AStar_CYK_Parser._level_views
+            Get the per-level charts of the popped edges.
+
+            Parameters
+            ----------
+            chart: tuple(np.array).
+                The flat charts score, rule, split and done.
+            offset: np.array(int).
+                First row of each level.
+            lexical=False: bool.
+                Optional. Keeps all the lexical edges, popped or not.
+
+            Returns
+            ----------
+            chart_score, chart_rule, chart_split: list(np.array).
+        """
+        score_flat, rule_flat, split_flat, done_flat = chart
+        n = len(offset) - 1
+
+        # Edges which are not built are not part of the chart
+        if lexical:
+            done_flat[:offset[1]] |= score_flat[:offset[1]] > -np.inf
+        score_flat[~done_flat] = -np.inf
+        chart_score = [score_flat[offset[lev]:offset[lev+1]] \
+            for lev in range(n)]
+        chart_rule = [rule_flat[offset[lev]:offset[lev+1]] \
+            for lev in range(n)]
+        chart_split = [split_flat[offset[lev]:offset[lev+1]] \
+            for lev in range(n)]
+        return chart_score, chart_rule, chart_split
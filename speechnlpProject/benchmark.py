@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the training and of the parsers on synthetic treebanks (see
+synthetic_treebank.py): training time, parse latency by sentence length,
+cost of the replacement of unknown words, throughput and peak memory.
+Results are JSON objects, and two runs can be compared to catch
+regressions.
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.synthetic_treebank import Treebank_Generator
+import contextlib
+import io
+import json
+import numpy as np
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+
+RESULTS_VERSION = 1
+
+# Metrics compared by compare_results: name suffix (the first matching one)
+# and whether higher is better
+_COMPARED_METRICS = [("_per_s", True), ("_s", False), ("p50_ms", False), \
+    ("p95_ms", False), ("p99_ms", False), ("_bytes", False)]
+
+
+def latency_stats(latencies):
+    """
+        latency_stats
+        Summarizes a list of latencies.
+
+        Parameters
+        ----------
+        latencies: list(float).
+            Latencies in seconds.
+
+        Returns
+        ----------
+        stats: dict(string: float).
+            "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms" and
+            "sentences_per_s".
+    """
+    latencies = np.array(latencies, dtype=float) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"n": len(latencies), "mean_ms": float(latencies.mean()), \
+        "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), \
+        "max_ms": float(latencies.max()), \
+        "sentences_per_s": float(1000 * len(latencies) / latencies.sum()) \
+            if latencies.sum() > 0 else float("inf")}
+
+
+def peak_memory(function):
+    """
+        peak_memory
+        Calls a function while tracing the memory allocations.
+
+        Parameters
+        ----------
+        function: function().
+
+        Returns
+        ----------
+        res: object.
+            The result of the function.
+        peak: int.
+            Peak of the memory allocated during the call, in bytes
+            (NumPy arrays included).
+    """
+    tracemalloc.start()
+    try:
+        res = function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return res, peak
+
+
+def _timed_parses(parser, sentences):
+    # Latency of each parse, and number of sentences not parsed
+    latencies = []
+    n_failed = 0
+    for test_s in sentences:
+        start = time.perf_counter()
+        res = parser.parse(test_s)
+        latencies.append(time.perf_counter() - start)
+        if res is None:
+            n_failed += 1
+    return latencies, n_failed
+
+
+def run_benchmark(parser_class, n_sentences=2000, lengths=range(5, 61, 5), \
+        per_length=10, n_unknown=200, max_depth=4, max_branching=3, \
+        vocabulary_size=1000, seed=0, workers=1, memory=True):
+    """
+        run_benchmark
+        Trains a PCFG on a synthetic treebank and times the parses of
+        synthetic sentences.
+
+        Parameters
+        ----------
+        parser_class: class.
+            CYK_Parser or one of its subclasses.
+        n_sentences=2000: int.
+            Optional. Size of the training treebank.
+        lengths=range(5, 61, 5): iterable(int).
+            Optional. Lengths of the parsed sentences.
+        per_length=10: int.
+            Optional. Number of parsed sentences of each length.
+        n_unknown=200: int.
+            Optional. Number of unknown words looked up.
+        max_depth=4, max_branching=3, vocabulary_size=1000, seed=0:
+            Optional. Generator of the treebank (see Treebank_Generator).
+        workers=1: int.
+            Optional. Number of worker processes of the training.
+        memory=True: bool.
+            Optional. Measures the peak memory of the training and of the
+            parse of the longest sentences (in separate runs, as tracing
+            the allocations slows them down).
+
+        Returns
+        ----------
+        results: dict.
+            JSON serializable results: "config", "environment", "train",
+            "parse" (by length, and "all"), "unknown_words" and "memory".
+    """
+    lengths = list(lengths)
+    config = {"parser": parser_class.__name__, "n_sentences": n_sentences, \
+        "lengths": lengths, "per_length": per_length, \
+        "n_unknown": n_unknown, "max_depth": max_depth, \
+        "max_branching": max_branching, \
+        "vocabulary_size": vocabulary_size, "seed": seed, \
+        "workers": workers}
+    generator = Treebank_Generator(max_depth, max_branching, \
+        vocabulary_size, seed)
+    treebank = generator.treebank(n_sentences)
+    sentences = dict((length, [generator.sentence(length) \
+        for i in range(per_length)]) for length in lengths)
+    unknown_words = [generator.unknown_word() for i in range(n_unknown)]
+    root_symbol = GSymbol("SENT", GSymbol.NON_TERMINAL)
+    results = {"version": RESULTS_VERSION, "config": config, \
+        "environment": {"python": platform.python_version(), \
+        "numpy": np.__version__, "platform": platform.platform()}}
+
+    # The parsers report unknown words and failures on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        pcfg = PCFG(treebank, chomsky_normalize=True, workers=workers)
+        train_s = time.perf_counter() - start
+        start = time.perf_counter()
+        parser = parser_class(pcfg, root_symbol)
+        results["train"] = {"train_s": train_s, \
+            "parser_init_s": time.perf_counter() - start, \
+            "n_non_terminals": len(pcfg.nt_symbs()), \
+            "n_words": len(pcfg.lexicon())}
+
+        # The first unknown word builds the index of the lexicon
+        start = time.perf_counter()
+        parser._resolve_word(unknown_words[0])
+        index_s = time.perf_counter() - start
+
+        # Warm up (compiled grammar, first allocations)
+        parser.parse(sentences[lengths[0]][0])
+        results["parse"] = {}
+        all_latencies = []
+        n_words = 0
+        for length in lengths:
+            latencies, n_failed = _timed_parses(parser, sentences[length])
+            stats = latency_stats(latencies)
+            stats["failed"] = n_failed
+            stats["words_per_s"] = stats["sentences_per_s"] * length
+            results["parse"][str(length)] = stats
+            all_latencies += latencies
+            n_words += length * len(latencies)
+        stats = latency_stats(all_latencies)
+        stats["words_per_s"] = n_words / sum(all_latencies)
+        results["parse"]["all"] = stats
+
+        latencies = []
+        n_replaced = 0
+        for word in unknown_words:
+            start = time.perf_counter()
+            n_replaced += parser._replace_word(word) is not None
+            latencies.append(time.perf_counter() - start)
+        stats = latency_stats(latencies)
+        del stats["sentences_per_s"]
+        stats["index_s"] = index_s
+        stats["replaced"] = n_replaced
+        results["unknown_words"] = stats
+
+        if memory:
+            results["memory"] = {"train_peak_bytes": peak_memory( \
+                lambda: PCFG(treebank, chomsky_normalize=True))[1], \
+                "parse_peak_bytes": peak_memory(lambda: _timed_parses( \
+                parser, sentences[max(lengths)]))[1]}
+        else:
+            results["memory"] = {}
+        # Kilobytes on Linux, bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["memory"]["max_rss_bytes"] = max_rss if \
+            sys.platform == "darwin" else max_rss * 1024
+    return results
+
+
+def _flatten(results, prefix=""):
+    # Numeric metrics of the results as {"parse.5.p50_ms": value}
+    res = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            res.update(_flatten(value, prefix + key + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            res[prefix + key] = value
+    return res
+
+
+def compare_results(base, new, tolerance=0.1):
+    """
+        compare_results
+        Compares the metrics (times, latencies, memory and throughputs) of
+        two benchmark runs.
+
+        Parameters
+        ----------
+        base: dict.
+            Results of the reference run.
+        new: dict.
+            Results of the run to be checked.
+        tolerance=0.1: float.
+            Optional. Relative change above which a slower (or bigger) new
+            metric is a regression.
+
+        Returns
+        ----------
+        res: list(tuple(string, float, float, float, bool)).
+            (metric, base value, new value, relative change, regression),
+            for the metrics of both runs. The relative change is positive
+            when the new run is worse.
+    """
+    if base.get("config") != new.get("config"):
+        print("Warning: the benchmarks were run with different settings.")
+    base_metrics = _flatten(base)
+    new_metrics = _flatten(new)
+    res = []
+    for name in sorted(base_metrics.keys()):
+        if name not in new_metrics or name.startswith("config."):
+            continue
+        higher_is_better = None
+        for suffix, higher in _COMPARED_METRICS:
+            if name.endswith(suffix):
+                higher_is_better = higher
+                break
+        if higher_is_better is None:
+            continue
+        base_value = base_metrics[name]
+        new_value = new_metrics[name]
+        if base_value == 0:
+            continue
+        change = (new_value - base_value) / base_value
+        if higher_is_better:
+            change = -change
+        res.append((name, base_value, new_value, change, change > tolerance))
+    return res
+
+
+def save_results(results, path):
+    """
+        save_results
+        Saves benchmark results as JSON.
+
+        Parameters
+        ----------
+        results: dict.
+        path: string.
+    """
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    """
+        load_results
+        Loads benchmark results saved with save_results.
+
+        Parameters
+        ----------
+        path: string.
+
+        Returns
+        ----------
+        results: dict.
+    """
+    with open(path, "r") as f:
+        results = json.load(f)
+    if results.get("version") != RESULTS_VERSION:
+        raise Exception("Unsupported benchmark results version: " + \
+            str(results.get("version")))
+    return results
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Thin client of the parser service (see server.py): it only sends the
+sentences and reads the parses, without loading any grammar.
+"""
+
+
+import json
+import socket
+
+
+def parse_address(address):
+    """
+        parse_address
+        Reads the address of a parser service: "HOST:PORT" for TCP, else
+        the path of a Unix socket.
+
+        Parameters
+        ----------
+        address: string.
+
+        Returns
+        ----------
+        path: string or None.
+        host: string or None.
+        port: int or None.
+    """
+    host, sep, port = address.rpartition(":")
+    if sep != "" and port.isdigit() and "/" not in address:
+        return None, host if host != "" else "127.0.0.1", int(port)
+    return address, None, None
+
+
+def connect(address, timeout=None):
+    """
+        connect
+        Opens a connection to a parser service.
+
+        Parameters
+        ----------
+        address: string.
+            "HOST:PORT" or the path of a Unix socket.
+        timeout=None: float.
+            Optional. Socket timeout in seconds.
+
+        Returns
+        ----------
+        sock: socket.socket.
+    """
+    path, host, port = parse_address(address)
+    if path is not None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(path)
+    else:
+        sock = socket.create_connection((host, port), timeout)
+    return sock
+
+
+def parse_remote(sentences, address, timeout=None):
+    """
+        parse_remote
+        Parses sentences with a parser service. All the requests are sent
+        on one connection, and the responses come back in the same order.
+
+        Parameters
+        ----------
+        sentences: list(string).
+            Tokenized sentences, words separated by a white space.
+        address: string.
+            "HOST:PORT" or the path of a Unix socket.
+        timeout=None: float.
+            Optional. Timeout of each request in seconds (the default of the
+            service if None).
+
+        Returns
+        ----------
+        res: list(string or None).
+            The parses, None if a sentence could not be parsed.
+    """
+    sock = connect(address)
+    try:
+        stream = sock.makefile("rwb")
+        for i, test_s in enumerate(sentences):
+            request = {"id": i, "sentence": test_s}
+            if timeout is not None:
+                request["timeout"] = timeout
+            stream.write(json.dumps(request, ensure_ascii=False).encode( \
+                "utf-8") + b"\n")
+        stream.flush()
+        sock.shutdown(socket.SHUT_WR)
+
+        res = []
+        for i in range(len(sentences)):
+            line = stream.readline()
+            if not line:
+                raise Exception("Connection closed by the parser service")
+            response = json.loads(line.decode("utf-8"))
+            if response.get("id") != i:
+                raise Exception("Unexpected response: " + line.decode( \
+                    "utf-8").strip())
+            if "error" in response:
+                print("Parser service error: " + response["error"])
+                res.append(None)
+            else:
+                res.append(response["parse"])
+        return res
+    finally:
+        sock.close()
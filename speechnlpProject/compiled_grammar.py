@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+"""
+Immutable, array-backed form of a PCFG in Chomsky normal form, as produced
+by PCFG.compile().
+"""
+
+
+from speechnlpProject.grammar import *
+import numpy as np
+
+
+def _csr_index(keys, n_keys):
+    """
+        _csr_index
+        Builds a CSR-style index of the positions of an array of keys.
+
+        Parameters
+        ----------
+        keys: np.array(int).
+            The key of each entry.
+        n_keys: int.
+            The number of possible keys.
+
+        Returns
+        ----------
+        ptr: np.array(int) of length n_keys+1.
+            The entries with key a are entries[ptr[a]:ptr[a+1]].
+        entries: np.array(int).
+            The positions of the entries, grouped by key (stable order).
+    """
+    entries = np.argsort(keys, kind="stable").astype(np.int32)
+    ptr = np.zeros(n_keys+1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n_keys), out=ptr[1:])
+    return ptr, entries
+
+
+def _concat_ranges(starts, ends):
+    """
+        _concat_ranges
+        Concatenates the ranges [starts[i], ends[i]).
+
+        Parameters
+        ----------
+        starts, ends: np.array(int).
+
+        Returns
+        ----------
+        positions: np.array(int).
+    """
+    counts = ends - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(total)
+
+
+# Coarse categories of the labels of the French treebank (without function
+# tags), the root SENT being kept
+_COARSE_CATEGORIES = {
+    "SENT": "SENT",
+    "Sint": "S", "Srel": "S", "Ssub": "S", "VPinf": "S", "VPpart": "S",
+    "NP": "N", "NC": "N", "NPP": "N", "PRO": "N", "PROREL": "N", \
+        "PROWH": "N", "CLS": "N", "CLO": "N", "CLR": "N", "DET": "N", \
+        "DETWH": "N", "ET": "N",
+    "VN": "V", "V": "V", "VINF": "V", "VPP": "V", "VPR": "V", "VS": "V", \
+        "VIMP": "V",
+    "PP": "P", "P": "P", "P+D": "P", "P+PRO": "P",
+    "AP": "A", "ADJ": "A", "ADJWH": "A", "AdP": "A", "ADV": "A", \
+        "ADVWH": "A",
+    "COORD": "C", "CC": "C", "CS": "C",
+}
+
+
+def default_projection(gsymb, symbol_table=None):
+    """
+        default_projection
+        Projects a non-terminal on a coarse category: all the symbols t[...]
+        on "T", the root "SENT" on itself, and the labels of the treebank
+        (function tags removed) on a few phrase types: "S" (embedded
+        clauses), "N" (nominal), "V" (verbal), "P" (prepositional), "A"
+        (adjectival and adverbial), "C" (coordination and subordination)
+        and "O" (any other label, e.g. PONCT). A symbol X*** created by the
+        Chomsky normalization is projected on "X" + the category of the
+        first label of the sequence it replaces (e.g. "XN" for NP_PONCT),
+        or on "X" if its long name is not in the symbol table.
+
+        Parameters
+        ----------
+        gsymb: GSymbol.
+        symbol_table=None: SymbolTable.
+            Optional. The symbol table of the grammar, with the long names
+            of the X*** symbols.
+
+        Returns
+        ----------
+        name: string. The name of the coarse category.
+    """
+    name = gsymb.ssymb()
+    if len(name) > 1 and name[0] == "X" and name[1].isdigit():
+        long_name = None
+        if symbol_table is not None:
+            long_name = symbol_table.long_name(name)
+        if long_name is None:
+            return "X"
+        # The first label is a symbol of the treebank or a t[...] symbol
+        # (whose word may hold "_")
+        if long_name.startswith("t["):
+            return "XT"
+        return "X" + _COARSE_CATEGORIES.get(\
+            long_name.split("_", 1)[0].split("-", 1)[0], "O")
+    if name.startswith("t["):
+        return "T"
+    return _COARSE_CATEGORIES.get(name.split("-", 1)[0], "O")
+
+
+def _read_only(*arrays):
+    for array in arrays:
+        array.flags.writeable = False
+
+
+class CompiledPCFG:
+    """
+        CompiledPCFG
+        Implements an immutable, array-backed PCFG: non-terminals and words
+        are interned to dense ints, log-probabilities are computed once, and
+        binary rules are indexed by parent, left child and right child.
+    """
+
+
+    def __init__(self, pcfg):
+        """
+            CompiledPCFG.__init__
+            Compiles a PCFG. Only the binary rules A -> B C and the lexical
+            rules A -> word are kept (i.e. the rules used by CYK).
+
+            Parameters
+            ----------
+            pcfg: PCFG.
+        """
+
+        # Intern non-terminals: id -> GSymbol and GSymbol -> id
+        nt_symbs = list(pcfg.nt_symbs())
+        nt_index = {gsymb: a for a, gsymb in enumerate(nt_symbs)}
+        def intern(gsymb):
+            if gsymb not in nt_index.keys():
+                nt_index[gsymb] = len(nt_symbs)
+                nt_symbs.append(gsymb)
+            return nt_index[gsymb]
+
+        binary_rules = []
+        lexical_rules = []
+        words = []
+        word_index = {}
+        for gsymb in list(nt_symbs):
+            for trans, value in pcfg.root_to_trans(gsymb).items():
+                res_symb = trans.res_symb()
+                if len(res_symb) == 2 and \
+                        res_symb[0].stype() == GSymbol.NON_TERMINAL and \
+                        res_symb[1].stype() == GSymbol.NON_TERMINAL:
+                    binary_rules.append((intern(gsymb), \
+                        intern(res_symb[0]), intern(res_symb[1]), \
+                        np.log(value)))
+                elif len(res_symb) == 1 and \
+                        res_symb[0].stype() == GSymbol.TERMINAL:
+                    word = res_symb[0].ssymb()
+                    if word not in word_index.keys():
+                        word_index[word] = len(words)
+                        words.append(word)
+                    lexical_rules.append((word_index[word], intern(gsymb), \
+                        np.log(value)))
+
+        word_frequency = np.array([pcfg.get_frequency(word) \
+            for word in words], dtype=np.float64)
+        self._index(nt_symbs, words, binary_rules, lexical_rules, \
+            word_frequency)
+
+
+    def _index(self, nt_symbs, words, binary_rules, lexical_rules, \
+            word_frequency):
+        """
+            CompiledPCFG._index
+            Builds the arrays and indexes of the grammar.
+
+            Parameters
+            ----------
+            nt_symbs: list(GSymbol).
+                The non-terminals, indexed by id.
+            words: list(string).
+                The words, indexed by id.
+            binary_rules: list(tuple).
+                The rules (parent id, left id, right id, log-probability).
+            lexical_rules: list(tuple).
+                The rules (word id, non-terminal id, log-probability).
+            word_frequency: np.array(float).
+                The frequency of the words.
+        """
+        self._nt_symbs = tuple(nt_symbs)
+        self._nt_index = {gsymb: a for a, gsymb in enumerate(nt_symbs)}
+        self._words = tuple(words)
+        self._word_index = {word: w for w, word in enumerate(words)}
+        n_nt = len(self._nt_symbs)
+
+        # Binary rules sorted by (parent, left child, right child): the
+        # rules of a given parent are contiguous
+        binary_rules = sorted(binary_rules)
+        self._rule_parent = np.array([r[0] for r in binary_rules], \
+            dtype=np.int32)
+        self._rule_left = np.array([r[1] for r in binary_rules], \
+            dtype=np.int32)
+        self._rule_right = np.array([r[2] for r in binary_rules], \
+            dtype=np.int32)
+        self._rule_logp = np.array([r[3] for r in binary_rules], \
+            dtype=np.float64)
+
+        self._parent_ptr, _ = _csr_index(self._rule_parent, n_nt)
+        self._left_ptr, self._left_rules = \
+            _csr_index(self._rule_left, n_nt)
+        self._right_ptr, self._right_rules = \
+            _csr_index(self._rule_right, n_nt)
+
+        # Lexical rules grouped by word id
+        lexical_rules = sorted(lexical_rules)
+        lex_word = np.array([r[0] for r in lexical_rules], dtype=np.int32)
+        self._lex_nt = np.array([r[1] for r in lexical_rules], dtype=np.int32)
+        self._lex_logp = np.array([r[2] for r in lexical_rules], \
+            dtype=np.float64)
+        self._lex_ptr, _ = _csr_index(lex_word, len(self._words))
+
+        self._word_frequency = np.asarray(word_frequency, dtype=np.float64)
+
+        # Symbols X*** created by the Chomsky normalization
+        self._hidden = np.array([len(gsymb.ssymb()) > 1 and \
+            gsymb.ssymb()[0] == "X" and gsymb.ssymb()[1].isdigit() \
+            for gsymb in self._nt_symbs], dtype=bool)
+
+        _read_only(self._rule_parent, self._rule_left, self._rule_right, \
+            self._rule_logp, self._parent_ptr, self._left_ptr, \
+            self._left_rules, self._right_ptr, self._right_rules, \
+            self._lex_nt, self._lex_logp, self._lex_ptr, \
+            self._word_frequency, self._hidden)
+
+
+    def __repr__(self):
+        """
+            CompiledPCFG.__repr__
+
+            res: string.
+        """
+        return "CompiledPCFG(" + str(self.n_nt()) + " non-terminals, " + \
+            str(len(self._words)) + " words, " + \
+            str(self.n_binary_rules()) + " binary rules)"
+
+
+    def n_nt(self):
+        """
+            CompiledPCFG.n_nt
+            Get the number of non-terminals.
+
+            Returns
+            ----------
+            n: int.
+        """
+        return len(self._nt_symbs)
+
+
+    def n_binary_rules(self):
+        """
+            CompiledPCFG.n_binary_rules
+            Get the number of binary rules.
+
+            Returns
+            ----------
+            n: int.
+        """
+        return len(self._rule_parent)
+
+
+    def nt_symbs(self):
+        """
+            CompiledPCFG.nt_symbs
+            Get the non-terminal symbols, indexed by id.
+
+            Returns
+            ----------
+            nt_symbs: tuple(GSymbol).
+        """
+        return self._nt_symbs
+
+
+    def nt_id(self, gsymb):
+        """
+            CompiledPCFG.nt_id
+            Get the id of a non-terminal symbol.
+
+            Parameters
+            ----------
+            gsymb: GSymbol.
+
+            Returns
+            ----------
+            a: int or None if the symbol is not in the grammar.
+        """
+        return self._nt_index.get(gsymb)
+
+
+    def words(self):
+        """
+            CompiledPCFG.words
+            Get the words of the lexicon, indexed by id.
+
+            Returns
+            ----------
+            words: tuple(string).
+        """
+        return self._words
+
+
+    def word_id(self, word):
+        """
+            CompiledPCFG.word_id
+            Get the id of a word.
+
+            Parameters
+            ----------
+            word: string.
+
+            Returns
+            ----------
+            w: int or None if the word is not in the lexicon.
+        """
+        return self._word_index.get(word)
+
+
+    def word_frequencies(self):
+        """
+            CompiledPCFG.word_frequencies
+            Get the frequency of the words in the lexicon, indexed by id.
+
+            Returns
+            ----------
+            frequencies: np.array(float).
+        """
+        return self._word_frequency
+
+
+    def hidden(self):
+        """
+            CompiledPCFG.hidden
+            Get the mask of the non-terminals X*** created by the Chomsky
+            normalization (which are not printed in parses).
+
+            Returns
+            ----------
+            hidden: np.array(bool).
+        """
+        return self._hidden
+
+
+    def binary_rules(self):
+        """
+            CompiledPCFG.binary_rules
+            Get the binary rules A -> B C, sorted by (A, B, C).
+
+            Returns
+            ----------
+            parent, left, right: np.array(int).
+            logp: np.array(float). The log-probabilities of the rules.
+        """
+        return self._rule_parent, self._rule_left, self._rule_right, \
+            self._rule_logp
+
+
+    def rules_by_parent(self):
+        """
+            CompiledPCFG.rules_by_parent
+            Get the CSR index of the binary rules by parent. As rules are
+            sorted by parent, the rules of A are range(ptr[A], ptr[A+1]).
+
+            Returns
+            ----------
+            ptr: np.array(int).
+        """
+        return self._parent_ptr
+
+
+    def rules_by_left(self):
+        """
+            CompiledPCFG.rules_by_left
+            Get the CSR index of the binary rules by left child: the rules
+            with left child B are rules[ptr[B]:ptr[B+1]].
+
+            Returns
+            ----------
+            ptr: np.array(int).
+            rules: np.array(int).
+        """
+        return self._left_ptr, self._left_rules
+
+
+    def rules_by_right(self):
+        """
+            CompiledPCFG.rules_by_right
+            Get the CSR index of the binary rules by right child: the rules
+            with right child C are rules[ptr[C]:ptr[C+1]].
+
+            Returns
+            ----------
+            ptr: np.array(int).
+            rules: np.array(int).
+        """
+        return self._right_ptr, self._right_rules
+
+
+    def lexical_rules(self, word_id):
+        """
+            CompiledPCFG.lexical_rules
+            Get the lexical rules A -> word of a word.
+
+            Parameters
+            ----------
+            word_id: int.
+
+            Returns
+            ----------
+            nt_ids: np.array(int). The non-terminals A.
+            logp: np.array(float). The log-probabilities of A -> word.
+        """
+        start = self._lex_ptr[word_id]
+        end = self._lex_ptr[word_id+1]
+        return self._lex_nt[start:end], self._lex_logp[start:end]
+
+
+    def rules_with_left(self, nt_ids):
+        """
+            CompiledPCFG.rules_with_left
+            Get the binary rules whose left child is in the provided set.
+
+            Parameters
+            ----------
+            nt_ids: np.array(int).
+                Distinct non-terminal ids.
+
+            Returns
+            ----------
+            rules: np.array(int).
+                Sorted rule indexes (hence sorted by parent).
+        """
+        positions = _concat_ranges(self._left_ptr[nt_ids], \
+            self._left_ptr[nt_ids+1])
+        return np.sort(self._left_rules[positions])
+
+
+    def rules_with_parent(self, nt_ids):
+        """
+            CompiledPCFG.rules_with_parent
+            Get the binary rules whose parent is in the provided set.
+
+            Parameters
+            ----------
+            nt_ids: np.array(int).
+                Sorted distinct non-terminal ids.
+
+            Returns
+            ----------
+            rules: np.array(int).
+                Sorted rule indexes.
+        """
+        return _concat_ranges(self._parent_ptr[nt_ids], \
+            self._parent_ptr[nt_ids+1])
+
+
+    def project(self, projection=default_projection, symbol_table=None):
+        """
+            CompiledPCFG.project
+            Builds a coarse grammar by projecting the non-terminals on
+            coarse categories. The probability of a coarse rule is the sum
+            of the probabilities of the rules projected on it, averaged over
+            the non-terminals projected on its parent.
+
+            Parameters
+            ----------
+            projection=default_projection: function(GSymbol, SymbolTable)
+                    -> string.
+                Optional. The name of the coarse category of a non-terminal.
+            symbol_table=None: SymbolTable.
+                Optional. Passed to the projection (the long names of the
+                symbols created by the Chomsky normalization).
+
+            Returns
+            ----------
+            coarse: CompiledPCFG.
+                The coarse grammar (same words and word ids).
+            nt_map: np.array(int).
+                The coarse non-terminal id of each non-terminal id.
+        """
+        coarse_symbs = []
+        coarse_index = {}
+        nt_map = np.zeros(self.n_nt(), dtype=np.int32)
+        for a, gsymb in enumerate(self._nt_symbs):
+            coarse_gsymb = GSymbol(projection(gsymb, symbol_table), \
+                GSymbol.NON_TERMINAL)
+            if coarse_gsymb not in coarse_index.keys():
+                coarse_index[coarse_gsymb] = len(coarse_symbs)
+                coarse_symbs.append(coarse_gsymb)
+            nt_map[a] = coarse_index[coarse_gsymb]
+        n_members = np.bincount(nt_map, minlength=len(coarse_symbs))
+
+        def project_rules(keys, logp):
+            # Sum the probabilities of the rules with the same coarse keys,
+            # averaged over the parent (last key)
+            if len(logp) == 0:
+                return []
+            unique_keys, inverse = np.unique(keys, axis=0, \
+                return_inverse=True)
+            proba = np.bincount(inverse.ravel(), weights=np.exp(logp), \
+                minlength=len(unique_keys)) / n_members[unique_keys[:, -1]]
+            return [tuple(key) + (np.log(value),) for key, value in \
+                zip(unique_keys.tolist(), proba.tolist())]
+
+        binary_rules = [(r[2], r[0], r[1], r[3]) for r in project_rules(\
+            np.stack([nt_map[self._rule_left], nt_map[self._rule_right], \
+                nt_map[self._rule_parent]], axis=1), self._rule_logp)]
+        lex_word = np.repeat(np.arange(len(self._words)), \
+            np.diff(self._lex_ptr))
+        lexical_rules = project_rules(np.stack([lex_word, \
+            nt_map[self._lex_nt]], axis=1), self._lex_logp)
+
+        coarse = CompiledPCFG.__new__(CompiledPCFG)
+        coarse._index(coarse_symbs, self._words, binary_rules, \
+            lexical_rules, self._word_frequency)
+        return coarse, nt_map
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming reader of treebanks in the bracketed format, e.g.
+    ( (SENT (NP-SUJ (DET la) (NC maison)) (VN (V voit)) (PONCT .)))
+The trees are read one at a time from plain or compressed files (.gz, .bz2,
+.xz), whatever their line breaks, and the train/dev/test splits are streamed
+as well, so that a treebank never has to fit in memory.
+"""
+
+
+import bz2
+import gzip
+import hashlib
+import lzma
+
+
+# Openers of the compressed files, by extension
+_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+SPLITS = ("train", "dev", "test")
+
+
+def open_corpus(path):
+    """
+        open_corpus
+        Opens a corpus file as UTF-8 text, decompressed according to its
+        extension (.gz, .bz2 or .xz).
+
+        Parameters
+        ----------
+        path: string.
+
+        Returns
+        ----------
+        f: file-like.
+    """
+    for extension, opener in _OPENERS.items():
+        if path.endswith(extension):
+            return opener(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def read_trees(lines):
+    """
+        read_trees
+        Reads the bracketed trees of a text, one tree at a time: a tree
+        ends where its parenthesis are balanced, so that it can span
+        several lines (joined by a white space) and blank lines are
+        skipped.
+
+        Parameters
+        ----------
+        lines: iterable(string).
+            Lines of the text, e.g. an open file.
+
+        Yields
+        ----------
+        tree: string.
+            A bracketed tree.
+    """
+    parts = []
+    depth = 0
+    for line in lines:
+        line = line.strip()
+        if line == "":
+            continue
+        parts.append(line)
+        depth += line.count("(") - line.count(")")
+        if depth <= 0:
+            if depth < 0:
+                raise Exception("Unbalanced parenthesis in: " + \
+                    " ".join(parts))
+            yield " ".join(parts)
+            parts = []
+            depth = 0
+    if len(parts) > 0:
+        if depth > 0:
+            raise Exception("Unbalanced parenthesis at the end of the " \
+                "corpus: " + " ".join(parts))
+        yield " ".join(parts)
+
+
+def split_of(index, tree, n_trees=None, method="contiguous"):
+    """
+        split_of
+        Get the split of a tree of a corpus (80 % train, 10 % dev, 10 %
+        test).
+
+        Parameters
+        ----------
+        index: int.
+            Position of the tree in the corpus.
+        tree: string.
+        n_trees=None: int.
+            Number of trees of the corpus (needed by "contiguous").
+        method="contiguous": string.
+            Optional. "contiguous": the first 80 % of the corpus, then the
+            next 10 %, then the rest. "index": by the position modulo 10
+            (0-7, 8, 9). "hash": by a hash of the tree, so that a tree stays
+            in its split when the corpus is reordered or extended.
+
+        Returns
+        ----------
+        res: string.
+            "train", "dev" or "test".
+    """
+    if method == "contiguous":
+        n_train = int(n_trees * 0.8)
+        n_dev = (n_trees - n_train) // 2
+        if index < n_train:
+            return "train"
+        return "dev" if index < n_train + n_dev else "test"
+    if method == "index":
+        bucket = index % 10
+    elif method == "hash":
+        bucket = int(hashlib.md5(tree.encode("utf-8")).hexdigest()[:8], \
+            16) % 10
+    else:
+        raise Exception("Unknown split method: " + method)
+    if bucket < 8:
+        return "train"
+    return "dev" if bucket == 8 else "test"
+
+
+class Treebank_File:
+    """
+        Treebank_File
+        A treebank file, iterated over its trees (see read_trees) as many
+        times as needed, each iteration reading the file again.
+    """
+
+
+    def __init__(self, path):
+        """
+            Treebank_File.__init__
+
+            Parameters
+            ----------
+            path: string.
+                Plain or compressed (.gz, .bz2, .xz) file.
+        """
+        self._path = path
+        # Counted on the first call of __len__
+        self._n_trees = None
+
+
+    def __iter__(self):
+        with open_corpus(self._path) as f:
+            for tree in read_trees(f):
+                yield tree
+
+
+    def __len__(self):
+        """
+            Treebank_File.__len__
+            Get the number of trees (counted by reading the file once).
+
+            Returns
+            ----------
+            res: int.
+        """
+        if self._n_trees is None:
+            self._n_trees = sum(1 for tree in self)
+        return self._n_trees
+
+
+    def split(self, name, method="contiguous"):
+        """
+            Treebank_File.split
+            Get a split of the treebank (see split_of).
+
+            Parameters
+            ----------
+            name: string.
+                "train", "dev" or "test".
+            method="contiguous": string.
+                Optional. "contiguous", "index" or "hash".
+
+            Returns
+            ----------
+            res: Corpus_Split.
+        """
+        return Corpus_Split(self, name, method)
+
+
+class Corpus_Split:
+    """
+        Corpus_Split
+        The trees of a split of a treebank, streamed from it at each
+        iteration.
+    """
+
+
+    def __init__(self, corpus, name, method="contiguous"):
+        """
+            Corpus_Split.__init__
+
+            Parameters
+            ----------
+            corpus: Treebank_File or list(string).
+                Iterable over the trees, as many times as needed ("contiguous"
+                also needs its len).
+            name: string.
+                "train", "dev" or "test".
+            method="contiguous": string.
+                Optional. "contiguous", "index" or "hash" (see split_of).
+        """
+        if name not in SPLITS:
+            raise Exception("Unknown split: " + name)
+        self._corpus = corpus
+        self._name = name
+        self._method = method
+
+
+    def __iter__(self):
+        n_trees = len(self._corpus) if self._method == "contiguous" \
+            else None
+        for index, tree in enumerate(self._corpus):
+            if split_of(index, tree, n_trees, self._method) == self._name:
+                yield tree
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Evaluation of a parser on gold trees of the treebank: labelled bracket
+precision, recall and F1 (PARSEVAL, without the preterminals), tagging
+accuracy, coverage and parse latency by sentence length, the sentences
+being parsed in a pool of worker processes.
+"""
+
+
+from speechnlpProject.grammar import read_tree, recursive_parsed_to_token
+from speechnlpProject.tree import ParseTree
+from speechnlpProject.benchmark import latency_stats
+from collections import Counter
+import contextlib
+import io
+import time
+
+
+def _evaluate_sentence(parser, gold):
+    """
+        _evaluate_sentence
+        Parses the sentence of a gold tree and compares the parse with it.
+
+        Parameters
+        ----------
+        parser: CYK_Parser.
+        gold: string.
+            The bracketed gold tree.
+
+        Returns
+        ----------
+        res: tuple.
+            (number of words, latency in seconds, status of the parse,
+            whether it has a tree, matched brackets, parsed brackets, gold
+            brackets, correct tags).
+    """
+    gold_tree = ParseTree.from_tuple(read_tree(gold, to_lower_case=True))
+    test_s = recursive_parsed_to_token(gold, True)
+    tokens = test_s.split(' ')
+    gold_brackets = Counter(gold_tree.spans(preterminals=False))
+
+    # The parser reports the unknown words and the failures
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        tree = parser.parse_tree(test_s)
+        latency = time.perf_counter() - start
+        if tree is None:
+            return (len(tokens), latency, parser.parse_status(), False, \
+                0, 0, sum(gold_brackets.values()), 0)
+        # Positions of the words kept by the parser (unknown words without
+        # replacement are skipped)
+        kept = [i for i, w in enumerate(tokens) \
+            if parser._resolve_word(w) is not None]
+
+    # Spans of the parse on the positions of the sentence
+    brackets = Counter((label, kept[start], kept[end-1] + 1) \
+        for label, start, end in tree.spans(preterminals=False))
+    gold_tags = _tags(gold_tree, len(tokens))
+    correct_tags = sum(tag is not None and tag == gold_tags[kept[i]] \
+        for i, tag in enumerate(_tags(tree, len(kept))))
+    return (len(tokens), latency, parser.parse_status(), True, \
+        sum((brackets & gold_brackets).values()), sum(brackets.values()), \
+        sum(gold_brackets.values()), correct_tags)
+
+
+def _tags(tree, n_words):
+    # Tag of each word: label of the deepest node spanning only this word,
+    # None for a word left without its own node (e.g. a word of a fragment
+    # attached to a node of several words)
+    tags = [None] * n_words
+    # In pre-order, the deeper nodes come after the ones above them
+    for label, start, end in tree.spans(preterminals=True):
+        if end - start == 1:
+            tags[start] = label
+    return tags
+
+
+def evaluate(parser, gold_trees, workers=1, chunksize=4, bucket_size=10):
+    """
+        evaluate
+        Parses the sentences of gold trees and evaluates the parses.
+
+        Parameters
+        ----------
+        parser: CYK_Parser.
+        gold_trees: iterable(string).
+            Bracketed gold trees, e.g. a split of the corpus (blank lines
+            are skipped).
+        workers=1: int.
+            Optional. Number of worker processes.
+        chunksize=4: int.
+            Optional. Number of sentences sent at once to a worker.
+        bucket_size=10: int.
+            Optional. Width of the sentence length buckets of the latency.
+
+        Returns
+        ----------
+        report: dict.
+            "sentences", "parsed", "coverage" (share of the sentences with
+            a parse), "precision", "recall" and "f1" of the labelled
+            brackets (a failed sentence having no bracket),
+            "parsed_f1" (F1 on the parsed sentences only),
+            "tagging_accuracy" (on the parsed sentences, a skipped
+            unknown word or a word without its own node being a wrong
+            tag), "status"
+            (number of parses of each parse_status), "latency" (by length
+            bucket, e.g. "1-10", and "all", see latency_stats), "workers"
+            and "wall_s".
+    """
+    gold_trees = [gold for gold in gold_trees if gold.strip() != ""]
+    start = time.perf_counter()
+    results = parser.map_pool(_evaluate_sentence, gold_trees, workers, \
+        chunksize)
+    wall_s = time.perf_counter() - start
+
+    n_parsed = 0
+    matched = parsed = gold = 0
+    parsed_gold = 0
+    correct_tags = n_tags = 0
+    status = Counter()
+    latencies = {}
+    for n_words, latency, parse_status, has_tree, n_matched, \
+            n_parsed_brackets, n_gold, n_correct_tags in results:
+        status[parse_status] += 1
+        matched += n_matched
+        parsed += n_parsed_brackets
+        gold += n_gold
+        if has_tree:
+            n_parsed += 1
+            parsed_gold += n_gold
+            correct_tags += n_correct_tags
+            n_tags += n_words
+        bucket = (n_words - 1) // bucket_size
+        latencies.setdefault(bucket, []).append(latency)
+
+    precision = matched / parsed if parsed > 0 else 0.0
+    recall = matched / gold if gold > 0 else 0.0
+    parsed_recall = matched / parsed_gold if parsed_gold > 0 else 0.0
+    report = {"sentences": len(results), "parsed": n_parsed, \
+        "coverage": n_parsed / len(results) if len(results) > 0 else 0.0, \
+        "precision": precision, "recall": recall, \
+        "f1": _f1(precision, recall), \
+        "parsed_f1": _f1(precision, parsed_recall), \
+        "tagging_accuracy": correct_tags / n_tags if n_tags > 0 else 0.0, \
+        "status": dict(status), "latency": {}, "workers": workers, \
+        "wall_s": wall_s}
+    for bucket in sorted(latencies.keys()):
+        report["latency"]["%d-%d" % (bucket * bucket_size + 1, \
+            (bucket+1) * bucket_size)] = latency_stats(latencies[bucket])
+    if len(results) > 0:
+        report["latency"]["all"] = latency_stats([latency for bucket \
+            in latencies.values() for latency in bucket])
+    return report
+
+
+def _f1(precision, recall):
+    if precision + recall == 0:
+        return 0.0
+    return 2 * precision * recall / (precision + recall)
+
+
+def format_report(report):
+    """
+        format_report
+        Formats an evaluation report as text.
+
+        Parameters
+        ----------
+        report: dict.
+            Result of evaluate.
+
+        Returns
+        ----------
+        res: string.
+    """
+    lines = ["sentences: %d, parsed: %d, coverage: %.2f%%" \
+        % (report["sentences"], report["parsed"], 100 * report["coverage"]), \
+        "precision: %.2f%%, recall: %.2f%%, F1: %.2f%% (parsed only: " \
+        "%.2f%%)" % (100 * report["precision"], 100 * report["recall"], \
+        100 * report["f1"], 100 * report["parsed_f1"]), \
+        "tagging accuracy: %.2f%%" % (100 * report["tagging_accuracy"]), \
+        "status: " + ", ".join("%s %d" % (status, n) for status, n \
+        in sorted(report["status"].items())), \
+        "%8s %6s %10s %10s %10s %10s" % ("length", "n", "p50 ms", \
+        "p95 ms", "p99 ms", "mean ms")]
+    for bucket, stats in report["latency"].items():
+        lines.append("%8s %6d %10.2f %10.2f %10.2f %10.2f" % (bucket, \
+            stats["n"], stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], \
+            stats["mean_ms"]))
+    lines.append("wall time: %.2fs with %d worker(s)" % (report["wall_s"], \
+        report["workers"]))
+    return "\n".join(lines)
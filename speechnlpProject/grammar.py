@@ -5,19 +5,28 @@ Created on Fri Feb 23 11:58:06 2018
 @author: Quentin
 """
 
-from collections import Counter
+from speechnlpProject.metrics import Call_Stats, process_metrics
+from collections import Counter, deque
+import hashlib
+import itertools
+import multiprocessing
+import re
+import time
 
 
 class GSymbol:
     """
         GSymbol
-        Implements grammatical symbol.
+        Implements grammatical symbol. Symbols are immutable and their hash
+        is computed once; the symbols of a grammar are interned by its
+        SymbolTable, so that they are mostly compared by identity.
     """
     
     
     NON_TERMINAL = 0
     TERMINAL = 1
     
+    __slots__ = ("_ssymb", "_stype", "_hash")
     
     
     def __init__(self, ssymb, stype):
@@ -36,11 +45,12 @@ class GSymbol:
         if stype not in [self.NON_TERMINAL, self.TERMINAL]:
             raise Exception("Unrecognized symbol type")
         self._stype = stype
+        self._hash = hash((ssymb, stype))
 
     
     def __eq__(self, gsymb):
-        return self._ssymb == gsymb._ssymb and \
-            self._stype == gsymb._stype
+        return self is gsymb or (self._hash == gsymb._hash and \
+            self._ssymb == gsymb._ssymb and self._stype == gsymb._stype)
     
     
     def __lt__(self, a):
@@ -58,7 +68,12 @@ class GSymbol:
 
 
     def __hash__(self):
-        return hash((self._ssymb, self._stype))
+        return self._hash
+    
+    
+    def __reduce__(self):
+        # The hash of strings differs between processes: rebuild it
+        return (GSymbol, (self._ssymb, self._stype))
 
     
     def ssymb(self):
@@ -86,19 +101,232 @@ class GSymbol:
 
 
 
+class SymbolTable:
+    """
+        SymbolTable
+        Implements the table of the symbols of a grammar: it interns the
+        GSymbol and GTransition (a single instance for each symbol and
+        transition), and records the symbols created by the Chomsky
+        normalization.
+        The name of the symbol merging A and B only depends on A and B:
+        either "A_B", or a short name "X" + a decimal hash of "A_B". Hence
+        the same symbols are created whatever the order of the
+        normalization, the process, or the other grammars built before.
+    """
+    
+    
+    def __init__(self):
+        """
+            SymbolTable.__init__
+            Builds an empty table.
+        """
+        # Map very long names like NP_PONCT_NP_PONCT_VN_NP to short names
+        # like X1873... and back. Useful to avoid duplicate variables.
+        self._short_names = {}
+        self._long_names = {}
+        
+        # Interned symbols by type and name, and transitions by symbols
+        self._symbols = ({}, {})
+        self._transitions = {}
+    
+    
+    def __len__(self):
+        return len(self._short_names)
+    
+    
+    def symbol(self, ssymb, stype):
+        """
+            SymbolTable.symbol
+            Get the interned symbol of a given name and type.
+            
+            Parameters
+            ----------
+            ssymb: string.
+            stype: int (NON_TERMINAL or TERMINAL).
+            
+            Returns
+            ----------
+            gsymb: GSymbol.
+        """
+        if stype != GSymbol.NON_TERMINAL and stype != GSymbol.TERMINAL:
+            raise Exception("Unrecognized symbol type")
+        symbols = self._symbols[stype]
+        gsymb = symbols.get(ssymb)
+        if gsymb is None:
+            gsymb = GSymbol(ssymb, stype)
+            symbols[ssymb] = gsymb
+        return gsymb
+    
+    
+    def intern(self, gsymb):
+        """
+            SymbolTable.intern
+            Get the interned symbol equal to a given symbol.
+            
+            Parameters
+            ----------
+            gsymb: GSymbol.
+            
+            Returns
+            ----------
+            gsymb: GSymbol.
+        """
+        symbols = self._symbols[gsymb._stype]
+        res = symbols.get(gsymb._ssymb)
+        if res is None:
+            symbols[gsymb._ssymb] = gsymb
+            return gsymb
+        return res
+    
+    
+    def transition(self, gsymb, tgsymb):
+        """
+            SymbolTable.transition
+            Get the interned transition of given symbols.
+            
+            Parameters
+            ----------
+            gsymb: GSymbol. 
+                The root symbol of the transition.
+            tgsymb: list(GSymbol).
+                An ordered list of the symbols of the result of the
+                transition.
+            
+            Returns
+            ----------
+            gtrans: GTransition.
+        """
+        key = (self.intern(gsymb), tuple([self.intern(res_gsymb) \
+            for res_gsymb in tgsymb]))
+        gtrans = self._transitions.get(key)
+        if gtrans is None:
+            gtrans = GTransition(key[0], key[1])
+            self._transitions[key] = gtrans
+        return gtrans
+    
+    
+    def intern_transition(self, gtrans):
+        """
+            SymbolTable.intern_transition
+            Get the interned transition equal to a given transition.
+            
+            Parameters
+            ----------
+            gtrans: GTransition.
+            
+            Returns
+            ----------
+            gtrans: GTransition.
+        """
+        return self.transition(gtrans._gsymb, gtrans._tgsymb)
+    
+    
+    @staticmethod
+    def short_name(long_name):
+        """
+            SymbolTable.short_name
+            Get the short name of a symbol (X followed by digits, so that
+            the symbol is not printed in parses).
+            
+            Parameters
+            ----------
+            long_name: string. E.g. "NP_PONCT".
+            
+            Returns
+            ----------
+            short_name: string.
+        """
+        digest = hashlib.sha1(long_name.encode("utf-8")).hexdigest()
+        return "X" + str(int(digest[:13], 16))
+    
+    
+    def binarization_symbol(self, gsymb1, gsymb2, short_name=True):
+        """
+            SymbolTable.binarization_symbol
+            Get the symbol replacing the sequence of symbols gsymb1 gsymb2.
+            
+            Parameters
+            ----------
+            gsymb1: GSymbol.
+            gsymb2: GSymbol.
+            short_name=True: bool.
+                Optional. Use a short name like "X1873..." instead of
+                "NP_PONCT".
+            
+            Returns
+            ----------
+            gsymb: GSymbol(Non-Terminal).
+        """
+        # This is a unique key for the current transition (for instance,
+        # "NP_PONCT_NP_PONCT_VN_NP"), but very long..
+        long_name = gsymb1.ssymb() + "_" + gsymb2.ssymb()
+        if not short_name:
+            return self.symbol(long_name, GSymbol.NON_TERMINAL)
+        
+        if long_name not in self._short_names.keys():
+            self.add_long_name(SymbolTable.short_name(long_name), long_name)
+        return self.symbol(self._short_names[long_name], GSymbol.NON_TERMINAL)
+    
+    
+    def add_long_name(self, name, long_name):
+        """
+            SymbolTable.add_long_name
+            Records the sequence of symbols replaced by a short name symbol
+            (e.g. when a grammar is loaded).
+            
+            Parameters
+            ----------
+            name: string. E.g. "X1873...".
+            long_name: string. E.g. "NP_PONCT".
+        """
+        if name in self._long_names.keys() and \
+                self._long_names[name] != long_name:
+            raise Exception("Symbol name collision: " + long_name + \
+                " and " + self._long_names[name])
+        self._short_names[long_name] = name
+        self._long_names[name] = long_name
+    
+    
+    def long_name(self, name):
+        """
+            SymbolTable.long_name
+            Get the sequence of symbols replaced by a short name symbol.
+            
+            Parameters
+            ----------
+            name: string. E.g. "X1873...".
+            
+            Returns
+            ----------
+            long_name: string or None if unknown.
+        """
+        return self._long_names.get(name)
+    
+    
+    def long_names(self):
+        """
+            SymbolTable.long_names
+            Get the short name symbols and the sequences they replace.
+            
+            Returns
+            ----------
+            long_names: list((string, string)).
+                The short names and long names, e.g. ("X1873...",
+                "NP_PONCT").
+        """
+        return list(self._long_names.items())
+
+
+
 class GTransition:
     """
         GTransition
-        Implements grammatical transition.
+        Implements grammatical transition. Like GSymbol, transitions are
+        immutable, hashed once and interned by the SymbolTable of their
+        grammar.
     """
     
-    # Index statically used to name new variables created by the
-    # Chomsky normalization process
-    _chomsky_variable_index = 1
-    
-    # Map very long names like NP_PONCT_NP_PONCT_VN_NP to short names 
-    # like X53. Useful to avoid duplicate variables.
-    _transition_name_mapper = {}
+    __slots__ = ("_gsymb", "_tgsymb", "_hash")
     
     
     def __init__(self, gsymb, tgsymb):
@@ -120,18 +348,12 @@ class GTransition:
         
         self._gsymb = gsymb
         self._tgsymb = tuple(tgsymb)
+        self._hash = hash((self._gsymb, self._tgsymb))
         
     
     def __eq__(self, gtrans):
-        
-        if self._gsymb != gtrans._gsymb:
-            return False
-        if len(self._tgsymb) != len(gtrans._tgsymb):
-            return False
-        for i in range(len(self._tgsymb)):
-            if self._tgsymb[i] != gtrans._tgsymb[i]:
-                return False
-        return True
+        return self is gtrans or (self._hash == gtrans._hash and \
+            self._gsymb == gtrans._gsymb and self._tgsymb == gtrans._tgsymb)
     
     
     def __repr__(self):
@@ -148,8 +370,12 @@ class GTransition:
     
     
     def __hash__(self):
-        
-        return hash(((self._gsymb), tuple(self._tgsymb)))
+        return self._hash
+    
+    
+    def __reduce__(self):
+        # The hash of strings differs between processes: rebuild it
+        return (GTransition, (self._gsymb, self._tgsymb))
     
     
     def symb(self):
@@ -206,13 +432,23 @@ class GTransition:
         return True
     
     
-    def reduce_to_2_or_less(self, short_name=True):
+    def reduce_to_2_or_less(self, short_name=True, symbol_table=None):
         """
             GTransition.reduce_to_2_or_less
-            Transforms the transition in a Chomsky normal form.
+            Transforms the transition in a Chomsky normal form (the
+            transition itself is not modified).
             Creates substitutes GSymbols in order to make intermediate
             transitions.
             
+            Parameters
+            ----------
+            short_name=True: bool.
+                Optional. Use short names like "X451..." instead of
+                "NP_PONCT_NP_PONCT_VN_NP" for intermediate symbols.
+            symbol_table=None: SymbolTable.
+                Optional. The table of the grammar recording the
+                intermediate symbols and interning the new transitions.
+            
             Returns
             ----------
             new_trans_list: list(GTransition).
@@ -226,246 +462,214 @@ class GTransition:
         
         else:
             
+            if symbol_table is None:
+                # Names do not depend on the table, which only records them
+                symbol_table = SymbolTable()
+            
+            # The transition is immutable: its first transition is rebuilt
+            # from a copy of its symbols
+            tgsymb = list(self._tgsymb)
+            
             # Assume transitions NT -> NT do not exist... at least in the
             # Sequoia Treebank
             
             # Replace T by NT
-            for i in range(len(self._tgsymb)):
-                if self._tgsymb[i].stype() == GSymbol.TERMINAL:
+            for i in range(len(tgsymb)):
+                if tgsymb[i].stype() == GSymbol.TERMINAL:
                     # Make new symbol
                     #~ new_symb = GSymbol(\
                         #~ "X" + str(_chomsky_variable_index), \
                         #~ GSymbol.NON_TERMINAL\
                         #~ )
                     #~ GTransition._chomsky_variable_index += 1
-                    new_symb = GSymbol(\
-                        "t[" + self._tgsymb[i].ssymb() + "]", \
+                    new_symb = symbol_table.symbol(\
+                        "t[" + tgsymb[i].ssymb() + "]", \
                         GSymbol.NON_TERMINAL\
                         )
                     # Make new transition
-                    new_trans = GTransition(\
+                    new_trans = symbol_table.transition(\
                         new_symb,\
-                        [self._tgsymb[i]]\
+                        [tgsymb[i]]\
                         )
                     # Replace old terminal by new non-terminal
-                    self._tgsymb[i] = new_symb
+                    tgsymb[i] = new_symb
                     # Append new transition
                     new_trans_list.append(new_trans)
             
             # Each transition should lead to at most 2 NT
             # Begin from the end
-            current_index = len(self._tgsymb) - 1
+            current_index = len(tgsymb) - 1
             while current_index > 1: # Stop when there are 2 NTs left
                 
                 # Get current and previous NTs and merge them into one
                 # combined NT
                 # Make new symbol
                 
-                # This is a unique key for the current transition (for
-                # instance, "NP_PONCT_NP_PONCT_VN_NP"), but very long..
-                transition_key = \
-                    self._tgsymb[current_index - 1].ssymb() + "_" + \
-                    self._tgsymb[current_index].ssymb()
-                
-                if short_name:
-                    # Create a short key if no existent key
-                    if transition_key not in GTransition._transition_name_mapper.keys():
-                        GTransition._transition_name_mapper[transition_key] = \
-                            "X" + str(GTransition._chomsky_variable_index)
-                        GTransition._chomsky_variable_index += 1
-                    
-                    new_symb = GSymbol(\
-                            GTransition._transition_name_mapper[transition_key], \
-                            GSymbol.NON_TERMINAL\
-                            )
-                else:
-                    new_symb = GSymbol(\
-                            self._tgsymb[current_index - 1].ssymb() + "_" + 
-                            self._tgsymb[current_index].ssymb(), \
-                            GSymbol.NON_TERMINAL\
-                            )
+                # The new symbol only depends on the pair of merged symbols
+                new_symb = symbol_table.binarization_symbol(\
+                        tgsymb[current_index - 1], \
+                        tgsymb[current_index], \
+                        short_name)
                 # Make new transition
-                new_trans = GTransition(\
+                new_trans = symbol_table.transition(\
                         new_symb,\
-                        [self._tgsymb[current_index-1], self._tgsymb[current_index]]\
+                        [tgsymb[current_index-1], tgsymb[current_index]]\
                         )
                 # Replace NTs into base transition
-                new_tgsymb = list(self._tgsymb)
-                new_tgsymb.pop(-1)
-                new_tgsymb[-1] = new_symb
-                self._tgsymb = tuple(new_tgsymb)
+                tgsymb.pop(-1)
+                tgsymb[-1] = new_symb
                 # Add the newly created transition
                 new_trans_list.append(new_trans)
                 
                 current_index -= 1
             
+            new_trans_list[0] = symbol_table.transition(self._gsymb, tgsymb)
             
             return new_trans_list
 
 
-def parse_parenthesis_blocks(test_s):
+# Tokens of a bracketed tree: parenthesis or symbol/word
+_TREE_TOKEN = re.compile(r"[()]|[^ \t\r\n()]+")
+
+
+def read_tree(test_s, to_lower_case=False):
     """
-        parse_parenthesis_blocks
-        Parse the first level of parenthesis blocks in the provided string.
+        read_tree
+        Reads a bracketed tree in one pass over the string and returns a
+        compact tree of nested tuples:
+            (symbol, word) for a pre-terminal node,
+            (symbol, (child1, child2, ...)) for any other node.
+        Function tags are removed from symbols (NP-SUJ -> NP), and unused
+        outer parenthesis are skipped, as in parse_transitions.
         E.g. on
-            "((1, a) (2, b))"
-        will return:
-            ["(1, a) (2, b)"]
-        but on
-            "(1, a) (2, b)"
+            "( (NP-SUJ (DET Cette) (NC exposition)))"
+        or
+            "NP-SUJ (DET Cette) (NC exposition)"
         will return:
-            ["(1, a)", "(2, b)"]
+            ("NP", (("DET", "Cette"), ("NC", "exposition")))
         
         Parameters
         ----------
         test_s: string. 
             The string to be parsed.
+        to_lower_case=False: bool.
+            Optional. Puts or not the terminals to lower case.
         
         Returns
         ----------
-        parsed: list(string). 
-            A list of parsed parenthesis blocks.
+        tree: tuple.
     """
-    parsed = []
-    n_opened = 0
-    i_opened = 0
     
-    for cursor in range(len(test_s)):
-        if test_s[cursor] == "(":
-            if n_opened == 0:
-                i_opened = cursor
-            n_opened += 1
-            
-        elif test_s[cursor] == ")":
-            n_opened -= 1
-            if n_opened == 0:
-                #print(i_opened+1, cursor)
-                parsed.append(test_s[i_opened+1:cursor])
+    # Each open node is the list of its tokens: symbols/words as strings,
+    # children as lists
+    stack = [[]]
+    for token in _TREE_TOKEN.findall(test_s):
+        if token == "(":
+            node = []
+            stack[-1].append(node)
+            stack.append(node)
+        elif token == ")":
+            if len(stack) == 1:
+                raise Exception("Unbalanced parenthesis in: " + test_s)
+            stack.pop()
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1:
+        raise Exception("Unbalanced parenthesis in: " + test_s)
+    
+    # Remove unused parenthesis
+    root = stack[0]
+    while len(root) > 0 and isinstance(root[0], list):
+        root = root[0]
+    if len(root) == 0:
+        raise Exception("Empty tree: " + test_s)
+    
+    # Build the tuples bottom-up (post-order, without recursion)
+    built = {}
+    to_visit = [(root, False)]
+    while len(to_visit) > 0:
+        node, visited = to_visit.pop()
+        children = [child for child in node[1:] if isinstance(child, list)]
+        if not visited and len(children) > 0:
+            to_visit.append((node, True))
+            for child in reversed(children):
+                to_visit.append((child, False))
+            continue
+        
+        # Suppose the first token is the non-terminal symbol
+        nts = node[0] if isinstance(node[0], str) else ""
+        nts = nts.split('-', 1)[0]
+        if len(children) > 0:
+            built[id(node)] = (nts, tuple(built.pop(id(child)) \
+                for child in children))
+        else:
+            # Get terminal symbol
+            sym = node[1]
+            if to_lower_case:
+                sym = sym.lower()
+            built[id(node)] = (nts, sym)
     
-    return parsed
+    return built[id(root)]
 
 
-def parse_transition_level(test_s):
+def tree_transitions(tree, symbol_table=None):
     """
-        parse_transition_level
-        Parse the next level of transitions.
-        E.g. on
-            "((1, a) (2, b))"
-        will return:
-            ["(1, a) (2, b)"]
-        but on
-            "(1, a) (2, b)"
-        will return:
-            ["(1, a)", "(2, b)"]
-        Suppose no terminal is left alone without any non-terminal wrapping,
-        i.e. a terminal will always look like: (TER terminal).
+        tree_transitions
+        Get the transitions of a tree read by read_tree, in pre-order.
         
         Parameters
         ----------
-        test_s: string. 
-            The formatted string to be parsed. E.g.:
-                "NP-SUJ (DET Cette) (NC exposition)"
+        tree: tuple.
+        symbol_table=None: SymbolTable.
+            Optional. The table interning the symbols and transitions.
         
         Returns
         ----------
-        nts: GTransition.
-            The current transition.
-        s_next_level: list(string).
-            A list of strings corresponding to the next levels, for further
-            investigation.
+        l_gtrans: list(GTransition).
+            List of transitions in the tree (with multiplicities).
     """
-    
-    # Suppose the first token is the non-terminal symbol
-    nts = test_s.split(' ', 1)[0]
-    nts = nts.split('-', 1)[0]
-    nts = GSymbol(nts, GSymbol.NON_TERMINAL)
-    
-    # Parse parenthesis blocks
-    syms_next_level = []
-    s_next_level = parse_parenthesis_blocks(test_s)
-    
-    if len(s_next_level) > 0:
-        # Get non-terminal symbols
-        next_nts = []
-        for s_next in s_next_level:
-            sym = s_next.split(' ', 1)[0]
-            sym = sym.split('-', 1)[0]
-            syms_next_level.append(GSymbol(sym, GSymbol.NON_TERMINAL))
-    else:
-        # Get terminal symbol
-        sym = test_s.split(' ', 2)[1]
-        syms_next_level.append(GSymbol(sym, GSymbol.TERMINAL))
-    
-    ntr = GTransition(nts, syms_next_level)
-    
-    return ntr, s_next_level
+    if symbol_table is None:
+        symbol_table = SymbolTable()
+    symbol = symbol_table.symbol
+    
+    l_gtrans = []
+    to_visit = [tree]
+    while len(to_visit) > 0:
+        nts, children = to_visit.pop()
+        gsymb = symbol(nts, GSymbol.NON_TERMINAL)
+        if isinstance(children, str):
+            l_gtrans.append(symbol_table.transition(gsymb, \
+                [symbol(children, GSymbol.TERMINAL)]))
+        else:
+            l_gtrans.append(symbol_table.transition(gsymb, \
+                [symbol(child[0], GSymbol.NON_TERMINAL) \
+                    for child in children]))
+            to_visit.extend(reversed(children))
+    return l_gtrans
 
 
-def _recursive_parse_transition_level(test_s, to_lower_case=False):
+def tree_tokens(tree):
     """
-        _recursive_parse_transition_level
-        Parse the next level of transitions recursively.
-        E.g. on
-            "((1, a) (2, b))"
-        will return:
-            ["(1, a) (2, b)"]
-        but on
-            "(1, a) (2, b)"
-        will return:
-            ["(1, a)", "(2, b)"]
-        Suppose no terminal is left alone without any non-terminal wrapping,
-        i.e. a terminal will always look like: (TER terminal).
-        RECURSIVE VERSION
+        tree_tokens
+        Get the terminals of a tree read by read_tree.
         
         Parameters
         ----------
-        test_s: string. 
-            The formatted string to be parsed. E.g.:
-                "NP-SUJ (DET Cette) (NC exposition)"
-        to_lower_case=False: bool.
-            Optional. Puts or not the input string to lower before process.
+        tree: tuple.
         
         Returns
         ----------
-        nts: list(GTransition).
-            List of transitions in test_s (with multiplicities).
+        tokens: list(string).
     """
-    
-    # Suppose the first token is the non-terminal symbol
-    nts = test_s.split(' ', 1)[0]
-    nts = nts.split('-', 1)[0]
-    nts = GSymbol(nts, GSymbol.NON_TERMINAL)
-    
-    # Parse parenthesis blocks
-    syms_next_level = []
-    s_next_level = parse_parenthesis_blocks(test_s)
-    
-    if len(s_next_level) > 0:
-        # Get non-terminal symbols
-        next_nts = []
-        for s_next in s_next_level:
-            sym = s_next.split(' ', 1)[0]
-            sym = sym.split('-', 1)[0]
-            syms_next_level.append(GSymbol(sym, GSymbol.NON_TERMINAL))
-        
-        res = [GTransition(nts, syms_next_level)]
-        for _test_s in s_next_level:
-            res += _recursive_parse_transition_level(_test_s, to_lower_case)
-        
-        return res
-        
-    else:
-        # Get terminal symbol
-        sym = test_s.split(' ', 2)[1]
-        
-        if to_lower_case:
-            sym = sym.lower()
-
-        syms_next_level.append(GSymbol(sym, GSymbol.TERMINAL))
-        
-        res = [GTransition(nts, syms_next_level)]
-        
-        return res
+    tokens = []
+    to_visit = [tree]
+    while len(to_visit) > 0:
+        nts, children = to_visit.pop()
+        if isinstance(children, str):
+            tokens.append(children)
+        else:
+            to_visit.extend(reversed(children))
+    return tokens
 
 
 def recursive_parsed_to_token(test_s, to_lower_case=False):
@@ -488,42 +692,25 @@ def recursive_parsed_to_token(test_s, to_lower_case=False):
                 "cette exposition"
     """
     
-    # Suppose the first token is the non-terminal symbol
-    nts = test_s.split(' ', 1)[0]
-    nts = nts.split('-', 1)[0]
-    nts = GSymbol(nts, GSymbol.NON_TERMINAL)
-    
-    # Parse parenthesis blocks
-    s_next_level = parse_parenthesis_blocks(test_s)
-    
-    if len(s_next_level) > 0:
-        
-        res = ""
-        for _test_s in s_next_level:
-            res += recursive_parsed_to_token(_test_s, to_lower_case) + " "
-        
-        return res[:len(res)-1]
-        
-    else:
-        # Get terminal symbol
-        sym = test_s.split(' ', 2)[1]
-        
-        if to_lower_case:
-            sym = sym.lower()
-        
-        return sym
+    return " ".join(tree_tokens(read_tree(test_s, to_lower_case)))
 
 
-def remove_nt_to_nt(l_gtrans):
+def remove_nt_to_nt(l_gtrans, symbol_table=None):
     """
         remove_nt_to_nt
         Maps transitions A->B->C->...Z to A->Z, B->Z, C->Z (with Z terminal
         or non-terminal with cardinal > 1)
+        The transitions are expected in pre-order (as returned by
+        tree_transitions), so that the transition following a unary
+        transition A->B is the one of its B child: each chain is collapsed
+        within its own subtree, in linear time.
         
         Parameters
         ----------
         l_gtrans: list(GTransition). 
-            Initial list of transitions (with multiplicities).
+            Initial list of transitions (with multiplicities), in pre-order.
+        symbol_table=None: SymbolTable.
+            Optional. The table interning the new transitions.
         
         Returns
         ----------
@@ -531,23 +718,47 @@ def remove_nt_to_nt(l_gtrans):
             Result list of transitions (with multiplicities).
     """
     
+    if symbol_table is None:
+        symbol_table = SymbolTable()
+    
+    n = len(l_gtrans)
+    
+    # Result symbols at the bottom of the chain of each transition, from
+    # the last transition to the first one
+    bottom_res_symb = [None] * n
+    for i in range(n-1, -1, -1):
+        res_symb = l_gtrans[i].res_symb()
+        if len(res_symb) == 1 and res_symb[0].stype() == GSymbol.NON_TERMINAL:
+            if i+1 == n or l_gtrans[i+1].symb() != res_symb[0]:
+                raise Exception("Transitions not in pre-order, after: " + \
+                    str(l_gtrans[i]))
+            res_symb = bottom_res_symb[i+1]
+        bottom_res_symb[i] = res_symb
+    
     l_gtrans2 = list()
     map_nt_to_nt = {}
     
-    # For each GTransition
-    for gtrans in l_gtrans:
-        new_res_symb = gtrans.res_symb()
-        while len(new_res_symb) == 1 and \
-            new_res_symb[0].stype() == GSymbol.NON_TERMINAL:
-            # Dig until find a terminal or more than 2 non-terminals
-            for gtrans2 in l_gtrans:
-                if gtrans2.symb() == new_res_symb[0]:
-                    if gtrans2.symb() not in map_nt_to_nt.keys():
-                        map_nt_to_nt[gtrans2.symb()] = set()
-                    map_nt_to_nt[gtrans2.symb()].add(gtrans.symb())
-                    new_res_symb = gtrans2.res_symb()
-                    break
-        l_gtrans2.append(GTransition(gtrans.symb(), new_res_symb))
+    # For each GTransition, the symbols above it in its unary chain
+    chain = []
+    for i in range(n):
+        gtrans = l_gtrans[i]
+        if len(chain) > 0:
+            if gtrans.symb() not in map_nt_to_nt.keys():
+                map_nt_to_nt[gtrans.symb()] = {}
+            for gsymb in chain:
+                map_nt_to_nt[gtrans.symb()][gsymb] = None
+        if bottom_res_symb[i] is gtrans.res_symb():
+            l_gtrans2.append(gtrans)
+        else:
+            l_gtrans2.append(symbol_table.transition(gtrans.symb(), \
+                bottom_res_symb[i]))
+        
+        # The next transition is the child of a unary transition
+        res_symb = gtrans.res_symb()
+        if len(res_symb) == 1 and res_symb[0].stype() == GSymbol.NON_TERMINAL:
+            chain.append(gtrans.symb())
+        else:
+            chain = []
     
     # Append all missing GTransitions
     # Initial length of the list
@@ -556,13 +767,13 @@ def remove_nt_to_nt(l_gtrans):
         symbol_to_map = l_gtrans2[i].symb()
         if symbol_to_map in map_nt_to_nt.keys():
             for gsymb in map_nt_to_nt[symbol_to_map]:
-                l_gtrans2.append(GTransition(gsymb, l_gtrans2[i].res_symb()))
-    #~ print(map_nt_to_nt)
+                l_gtrans2.append(symbol_table.transition(gsymb, \
+                    l_gtrans2[i].res_symb()))
     
     return l_gtrans2
 
 
-def parse_transitions(test_s, to_lower_case=False):
+def parse_transitions(test_s, to_lower_case=False, symbol_table=None):
     """
         parse_transitions
         Parse and count transitions in the provided string.
@@ -574,6 +785,10 @@ def parse_transitions(test_s, to_lower_case=False):
                 "(NP-SUJ (DET Cette) (NC exposition))"
             or:
                 "NP-SUJ (DET Cette) (NC exposition)"
+        to_lower_case=False: bool.
+            Optional. Puts or not the terminals to lower case.
+        symbol_table=None: SymbolTable.
+            Optional. The table interning the symbols and transitions.
 
         Returns
         ----------
@@ -581,17 +796,91 @@ def parse_transitions(test_s, to_lower_case=False):
             Counter of different transitions.
     """
     
-    # Remove unused parenthesis
-    while test_s.lstrip()[0] == "(":
-        test_s = parse_parenthesis_blocks(test_s)[0]
-    
-    parsed_transitions = _recursive_parse_transition_level(test_s, to_lower_case)
-    parsed_transitions = remove_nt_to_nt(parsed_transitions)
+    if symbol_table is None:
+        symbol_table = SymbolTable()
+    parsed_transitions = tree_transitions(read_tree(test_s, to_lower_case), \
+        symbol_table)
+    parsed_transitions = remove_nt_to_nt(parsed_transitions, symbol_table)
     
     return Counter(parsed_transitions)
 
 
 
+def _count_shard(args, symbol_table=None):
+    """
+        _count_shard
+        Counts the transitions of a shard of the corpus (worker of
+        count_transitions).
+    """
+    cfg_corpus_shard, to_lower_case = args
+    if symbol_table is None:
+        symbol_table = SymbolTable()
+    counter_gtrans = Counter()
+    for test_s in cfg_corpus_shard:
+        counter_gtrans.update(parse_transitions(test_s, to_lower_case, \
+            symbol_table))
+    return counter_gtrans
+
+
+def count_transitions(cfg_corpus, to_lower_case=False, workers=1, \
+                            shard_size=256, symbol_table=None):
+    """
+        count_transitions
+        Parse and count transitions in a corpus, streamed: only the counts
+        (and a few shards) are held in memory. The corpus is split in
+        shards which are counted in worker processes, then the counts are
+        merged in the order of the corpus (hence the order of the keys does
+        not depend on the number of workers).
+        
+        Parameters
+        ----------
+        cfg_corpus: iterable(string). 
+            The training corpus strings, e.g. a list, a generator or a
+            corpus.Treebank_File.
+        to_lower_case=False: bool.
+            Optional. Puts or not the terminals to lower case.
+        workers=1: int.
+            Optional. Number of worker processes (1 counts in the current
+            process).
+        shard_size=256: int.
+            Optional. Number of corpus strings per shard.
+        symbol_table=None: SymbolTable.
+            Optional. The table interning the symbols and transitions (the
+            ones counted in worker processes are interned when merged).
+        
+        Returns
+        ----------
+        counter_gtrans: Counter({GTransition : n}).
+    """
+    if symbol_table is None:
+        symbol_table = SymbolTable()
+    if workers <= 1:
+        return _count_shard((cfg_corpus, to_lower_case), symbol_table)
+    
+    counter_gtrans = Counter()
+    
+    def merge(shard_counter):
+        for gtrans, value in shard_counter.items():
+            counter_gtrans[symbol_table.intern_transition(gtrans)] += value
+    
+    # At most 2 shards per worker are read ahead (Pool.imap would read the
+    # whole corpus)
+    pending = deque()
+    corpus = iter(cfg_corpus)
+    with multiprocessing.Pool(workers) as pool:
+        while True:
+            shard = list(itertools.islice(corpus, shard_size))
+            if len(shard) == 0:
+                break
+            pending.append(pool.apply_async(_count_shard, \
+                ((shard, to_lower_case),)))
+            if len(pending) >= 2 * workers:
+                merge(pending.popleft().get())
+        while len(pending) > 0:
+            merge(pending.popleft().get())
+    return counter_gtrans
+
+
 class PCFG:
     """
         PCFG
@@ -600,95 +889,327 @@ class PCFG:
     
     
     def __init__(self, cfg_corpus_train, chomsky_normalize=False, \
-                            short_name=True, to_lower_case=True):
+                            short_name=True, to_lower_case=True, workers=1, \
+                            collect_stats=False):
         """
             PCFG.__init__
             Build a PCFG model (a map {NT GSymbol, {GTransition, proba}}
 
             Parameters
             ----------
-            cfg_corpus_train: list(string). 
-                A list of training corpus strings.
+            cfg_corpus_train: iterable(string). 
+                The training corpus strings, e.g. a list, a generator or a
+                corpus.Treebank_File (read once, in a stream).
             chomsky_normalize=False: bool.
                 Optional. Performs or not a Chomsky normalization.
             short_name=True:bool.
                 Optional. Useful if Chomsky normalization: use short names like
                 "X451" instead of "NP_PONCT_NP_PONCT_VN_NP" for instance.
+            to_lower_case=True: bool.
+                Optional. Puts or not the terminals to lower case.
+            workers=1: int.
+                Optional. Number of worker processes used to count the
+                transitions of the corpus.
+            collect_stats=False: bool.
+                Optional. Collects the counters and timers of the training
+                (see train_stats), and adds them to process_metrics().
         """
+        stats = Call_Stats() if collect_stats else None
+        start = time.perf_counter()
+        self._train_stats = stats
         
         # Parse transitions in provided corpus
         # counter_gtrans is Counter(GTransition, int). 
         # A Counter of the GTransitions and their number of apparitions
         # in the parsed corpus.
-        counter_gtrans = Counter()
-
-        for i in range(len(cfg_corpus_train)):
-            counter_gtrans += parse_transitions(cfg_corpus_train[i], to_lower_case=to_lower_case)
+        # Symbols and transitions of the grammar, symbols created by the
+        # Chomsky normalization
+        self._symbol_table = SymbolTable()
         
+        counter_gtrans = count_transitions(cfg_corpus_train, \
+            to_lower_case=to_lower_case, workers=workers, \
+            symbol_table=self._symbol_table)
+        if stats is not None:
+            stats.add_time("count", time.perf_counter() - start)
+            stats.count("transitions", sum(counter_gtrans.values()))
+            stats.count("distinct_transitions", len(counter_gtrans))
+            step_start = time.perf_counter()
         
-        # If option selected
-        if chomsky_normalize:
-            
-            
-            # For each gtrans, reduce to transitions of length 2 or less
-            normalized_counter_gtrans = Counter()
-            for key, value in counter_gtrans.items():
-                if len(key.transition_symb()) <= 2:
-                    normalized_counter_gtrans[key] = value
-                else:
-                    normalized_form = key.reduce_to_2_or_less(short_name)
-                    for elt in normalized_form:
-                        if not elt in normalized_counter_gtrans.keys():
-                            normalized_counter_gtrans[elt] = 0
-                        normalized_counter_gtrans[elt] += value
-            
-        else:
-            normalized_counter_gtrans = counter_gtrans
-        
-        cfgmap = {}
+        # Options of the counting of new trees (see update)
+        self._to_lower_case = to_lower_case
+        self._chomsky_normalize = chomsky_normalize
+        self._short_name = short_name
+        self._version = 0
         
-        # Create map & lexicon
-        self._lexicon = {}
-        self._final_non_terminals = []
+        normalized_counter_gtrans = self._normalize_counts(counter_gtrans)
+        if stats is not None:
+            stats.add_time("normalize", time.perf_counter() - step_start)
+            step_start = time.perf_counter()
         
+        # Raw counts of the transitions, kept to update the probabilities
+        self._counts = {}
         for key, value in normalized_counter_gtrans.items():
             gsymb = key.symb()
-            if not gsymb in cfgmap.keys():
-                cfgmap[gsymb] = {}
-            cfgmap[gsymb][key] = value
-            
-            # Add terminal to the lexicon and non-terminal in the list
-            if len(key.transition_symb()) == 1 and \
-                    key.transition_symb()[0].stype() == GSymbol.TERMINAL:
-                if key.transition_symb()[0].ssymb() not in \
-                        self._lexicon.keys():
-                    self._lexicon[key.transition_symb()[0].ssymb()] = set()
-                self._lexicon[key.transition_symb()[0].ssymb()].add(key.symb())
-                self._final_non_terminals.append(key.symb())
-        
+            if not gsymb in self._counts.keys():
+                self._counts[gsymb] = {}
+            self._counts[gsymb][key] = value
         
         # Get a frequency map of words in overall lexicon
-        self._frequency_lexicon = {}
-        total_sum = 0
+        self._word_counts = {}
         for key, value in normalized_counter_gtrans.items():
             ssymb = key.transition_symb()[0].ssymb()
             if len(key.transition_symb()) == 1 and \
                     key.transition_symb()[0].stype() == GSymbol.TERMINAL:
-                if ssymb not in self._frequency_lexicon.keys():
-                    self._frequency_lexicon[ssymb] = 0
-                self._frequency_lexicon[ssymb] += value
-                total_sum += value
-        for key in self._frequency_lexicon.keys():
-            self._frequency_lexicon[key] = self._frequency_lexicon[key] / total_sum
+                if ssymb not in self._word_counts.keys():
+                    self._word_counts[ssymb] = 0
+                self._word_counts[ssymb] += value
+        total_sum = sum(self._word_counts.values())
+        frequency_lexicon = {}
+        for key, value in self._word_counts.items():
+            frequency_lexicon[key] = value / total_sum
             
         
         # Compute probabilities by key
-        for key, value in cfgmap.items():
+        cfgmap = {}
+        for key, value in self._counts.items():
             sum_counts = sum(value.values())
+            cfgmap[key] = {}
             for key2, value2 in value.items():
-                value[key2] = value2 / sum_counts
-                #~ print(value[key2])
+                cfgmap[key][key2] = value2 / sum_counts
+        
+        self._set_probabilities(cfgmap, frequency_lexicon)
+        if stats is not None:
+            end = time.perf_counter()
+            stats.add_time("probabilities", end - step_start)
+            stats.add_time("total", end - start)
+            stats.count("rules", len(normalized_counter_gtrans))
+            stats.count("non_terminals", len(self._cfgmap))
+            stats.count("words", len(self._lexicon))
+            process_metrics().record("train", stats)
+    
+    
+    def _normalize_counts(self, counter_gtrans):
+        """
+            PCFG._normalize_counts
+            Reduces counted transitions to the Chomsky normal form, if the
+            grammar is normalized.
+            
+            Parameters
+            ----------
+            counter_gtrans: Counter({GTransition : n}).
+            
+            Returns
+            ----------
+            normalized_counter_gtrans: Counter({GTransition : n}).
+        """
+        if not self._chomsky_normalize:
+            return counter_gtrans
+        
+        # For each gtrans, reduce to transitions of length 2 or less
+        normalized_counter_gtrans = Counter()
+        for key, value in counter_gtrans.items():
+            if len(key.transition_symb()) <= 2:
+                normalized_counter_gtrans[key] += value
+            else:
+                normalized_form = key.reduce_to_2_or_less(self._short_name, \
+                    self._symbol_table)
+                for elt in normalized_form:
+                    normalized_counter_gtrans[elt] += value
+        return normalized_counter_gtrans
+    
+    
+    def update(self, cfg_corpus, workers=1):
+        """
+            PCFG.update
+            Adds the transitions of new trees to the counts of the grammar,
+            and updates the probabilities of the affected non-terminals
+            only (as if the grammar was trained again with the new trees).
+            The parsers of the grammar take the update into account at
+            their next parse.
+            
+            Parameters
+            ----------
+            cfg_corpus: iterable(string).
+                The new training corpus strings.
+            workers=1: int.
+                Optional. Number of worker processes used to count the
+                transitions of the new trees.
+            
+            Raises an Exception if the grammar has no counts (loaded from a
+            model saved without them).
+        """
+        self._update_counts(cfg_corpus, 1, workers)
+    
+    
+    def remove(self, cfg_corpus, workers=1):
+        """
+            PCFG.remove
+            Removes the transitions of trees of the training corpus from
+            the counts of the grammar (see update). The rules and words
+            which are no longer counted are removed from the grammar.
+            
+            Parameters
+            ----------
+            cfg_corpus: iterable(string).
+                Training corpus strings counted before.
+            workers=1: int.
+                Optional. Number of worker processes used to count the
+                transitions of the trees.
+            
+            Raises an Exception if the grammar has no counts (see update),
+            or if a transition of the trees is not counted in the grammar.
+        """
+        self._update_counts(cfg_corpus, -1, workers)
+    
+    
+    def _update_counts(self, cfg_corpus, sign, workers):
+        """
+            PCFG._update_counts
+            Adds (sign 1) or subtracts (sign -1) the counts of the
+            transitions of trees, then patches the probabilities, the
+            inverse map, the lexicon and the word frequencies.
+            
+            Parameters
+            ----------
+            cfg_corpus: iterable(string).
+            sign: int.
+                1 or -1.
+            workers: int.
+        """
+        if self._counts is None:
+            raise Exception("The grammar has no counts of its rules, it can " \
+                "be used to parse but not updated (model saved in version 1 " \
+                "or without the counts): train it again from the corpus")
+        normalized_counter_gtrans = self._normalize_counts(count_transitions( \
+            cfg_corpus, to_lower_case=self._to_lower_case, workers=workers, \
+            symbol_table=self._symbol_table))
+        if sign < 0:
+            # Checked first: the grammar is left unchanged on error
+            for key, value in normalized_counter_gtrans.items():
+                if self._counts.get(key.symb(), {}).get(key, 0) < value:
+                    raise Exception("Transition not counted in the " \
+                        "grammar: " + str(key))
+        
+        changed = set()
+        for key, value in normalized_counter_gtrans.items():
+            gsymb = key.symb()
+            if gsymb not in self._counts.keys():
+                self._counts[gsymb] = {}
+            counts = self._counts[gsymb]
+            count = counts.get(key, 0) + sign * value
+            if count == 0:
+                del counts[key]
+            else:
+                counts[key] = count
+            changed.add(gsymb)
+            
+            if len(key.transition_symb()) == 1 and \
+                    key.transition_symb()[0].stype() == GSymbol.TERMINAL:
+                ssymb = key.transition_symb()[0].ssymb()
+                count = self._word_counts.get(ssymb, 0) + sign * value
+                if count == 0:
+                    del self._word_counts[ssymb]
+                else:
+                    self._word_counts[ssymb] = count
+        
+        for gsymb in changed:
+            old_proba = self._cfgmap.get(gsymb, {})
+            counts = self._counts[gsymb]
+            sum_counts = sum(counts.values())
+            new_proba = {}
+            for key, value in counts.items():
+                new_proba[key] = value / sum_counts
+            
+            for gtrans in old_proba.keys():
+                if gtrans in new_proba.keys():
+                    continue
+                res_symb = gtrans.res_symb()
+                del self._cfg_inversemap[res_symb][gtrans]
+                if len(self._cfg_inversemap[res_symb]) == 0:
+                    del self._cfg_inversemap[res_symb]
+                if len(res_symb) == 1 and \
+                        res_symb[0].stype() == GSymbol.TERMINAL:
+                    self._lexicon[res_symb[0].ssymb()].discard(gsymb)
+                    if len(self._lexicon[res_symb[0].ssymb()]) == 0:
+                        del self._lexicon[res_symb[0].ssymb()]
+                    self._final_non_terminals[gsymb] -= 1
+                    if self._final_non_terminals[gsymb] == 0:
+                        del self._final_non_terminals[gsymb]
+            for gtrans, proba in new_proba.items():
+                res_symb = gtrans.res_symb()
+                if res_symb not in self._cfg_inversemap.keys():
+                    self._cfg_inversemap[res_symb] = {}
+                self._cfg_inversemap[res_symb][gtrans] = proba
+                if gtrans not in old_proba.keys() and len(res_symb) == 1 \
+                        and res_symb[0].stype() == GSymbol.TERMINAL:
+                    if res_symb[0].ssymb() not in self._lexicon.keys():
+                        self._lexicon[res_symb[0].ssymb()] = set()
+                    self._lexicon[res_symb[0].ssymb()].add(gsymb)
+                    self._final_non_terminals[gsymb] += 1
+            
+            if len(new_proba) > 0:
+                self._cfgmap[gsymb] = new_proba
+            else:
+                del self._counts[gsymb]
+                self._cfgmap.pop(gsymb, None)
+        
+        # The frequencies of all the words depend on the total count
+        total_sum = sum(self._word_counts.values())
+        for word in list(self._frequency_lexicon.keys()):
+            if word not in self._word_counts.keys():
+                del self._frequency_lexicon[word]
+        for word, count in self._word_counts.items():
+            self._frequency_lexicon[word] = count / total_sum
+        
+        self._fingerprint = None
+        self._version += 1
+    
+    
+    def version(self):
+        """
+            PCFG.version
+            Get the number of updates of the grammar (see update and
+            remove), from which the parsers know that their compiled
+            grammar is out of date.
+            
+            Returns
+            ----------
+            version: int.
+        """
+        return self._version
+    
+    
+    def _set_probabilities(self, cfgmap, frequency_lexicon):
+        """
+            PCFG._set_probabilities
+            Sets the transition probabilities and word frequencies, and builds
+            the lexicon and the inverse map.
+            
+            Parameters
+            ----------
+            cfgmap: dict{GSymbol: dict{GTransition: probability}}.
+            frequency_lexicon: dict{string: frequency}.
+        """
         self._cfgmap = cfgmap
+        self._frequency_lexicon = frequency_lexicon
+        # Computed on the first call of fingerprint
+        self._fingerprint = None
+        
+        # Create lexicon, and count the lexical transitions of each
+        # non-terminal
+        self._lexicon = {}
+        self._final_non_terminals = Counter()
+        
+        for gtrans_proba in self._cfgmap.values():
+            for key in gtrans_proba.keys():
+                # Add terminal to the lexicon and non-terminal in the list
+                if len(key.transition_symb()) == 1 and \
+                        key.transition_symb()[0].stype() == GSymbol.TERMINAL:
+                    if key.transition_symb()[0].ssymb() not in \
+                            self._lexicon.keys():
+                        self._lexicon[key.transition_symb()[0].ssymb()] = set()
+                    self._lexicon[key.transition_symb()[0].ssymb()].add(key.symb())
+                    self._final_non_terminals[key.symb()] += 1
     
     
         # Build an inverse map result to transition
@@ -789,8 +1310,9 @@ class PCFG:
             Returns
             ----------
             nts: list(GSymbol(Non-Terminal)).
+                Distinct non-terminals.
         """
-        return self._final_non_terminals
+        return list(self._final_non_terminals.keys())
 
 
     def get_frequency(self, word):
@@ -807,3 +1329,113 @@ class PCFG:
             frequency: float.
         """
         return self._frequency_lexicon[word]
+
+
+    def symbol_table(self):
+        """
+            PCFG.symbol_table
+            Get the table of the symbols and transitions of the grammar
+            (including the symbols created by the Chomsky normalization).
+            
+            Returns
+            ----------
+            symbol_table: SymbolTable.
+        """
+        return self._symbol_table
+
+
+    def train_stats(self):
+        """
+            PCFG.train_stats
+            Get the counters and timers of the training (with
+            collect_stats=True): counters "transitions" (in the corpus),
+            "distinct_transitions", "rules", "non_terminals" and "words";
+            timers "count" (transitions of the corpus), "normalize" (Chomsky
+            normalization), "probabilities" and "total".
+            
+            Returns
+            ----------
+            stats: Call_Stats or None.
+                None if the stats were not collected.
+        """
+        return self._train_stats
+
+
+    def fingerprint(self):
+        """
+            PCFG.fingerprint
+            Get a digest of the rules, probabilities and word frequencies of
+            the grammar (computed on the first call): two grammars with the
+            same fingerprint give the same parses.
+            
+            Returns
+            ----------
+            fingerprint: string.
+                SHA-1 hexadecimal digest.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for gsymb in self.nt_symbs():
+                # Symbols with their type: a word can be named as a
+                # non-terminal
+                for line in sorted("\t".join([gsymb.ssymb()] + \
+                        [str(tgsymb.stype()) + tgsymb.ssymb() \
+                        for tgsymb in gtrans.transition_symb()] + \
+                        [repr(proba)]) \
+                        for gtrans, proba in self._cfgmap[gsymb].items()):
+                    digest.update((line + "\n").encode("utf-8"))
+            for word in sorted(self._frequency_lexicon.keys()):
+                digest.update((word + "\t" + \
+                    repr(self._frequency_lexicon[word]) + "\n").encode( \
+                    "utf-8"))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+
+    def compile(self):
+        """
+            PCFG.compile
+            Build an immutable, array-backed version of the grammar (int
+            symbol tables, log-probabilities and rule indexes), as used by
+            Vectorized_CYK_Parser.
+
+            Returns
+            ----------
+            compiled: CompiledPCFG.
+        """
+        from speechnlpProject.compiled_grammar import CompiledPCFG
+        return CompiledPCFG(self)
+
+
+    def save(self, path, compressed=False):
+        """
+            PCFG.save
+            Saves the trained grammar in a versioned binary file (NumPy .npz
+            arrays plus a string table), to be reloaded with PCFG.load.
+            
+            Parameters
+            ----------
+            path: string.
+            compressed=False: bool.
+                Optional. Compresses the arrays (smaller file, slower load).
+        """
+        from speechnlpProject.model_io import save_pcfg
+        save_pcfg(self, path, compressed)
+
+
+    @staticmethod
+    def load(path):
+        """
+            PCFG.load
+            Loads a grammar saved with PCFG.save.
+            
+            Parameters
+            ----------
+            path: string.
+            
+            Returns
+            ----------
+            pcfg: PCFG.
+        """
+        from speechnlpProject.model_io import load_pcfg
+        return load_pcfg(path)
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Inside-outside algorithm (sum-product in log space) on a compiled grammar,
+sharing its rule indexes with the Viterbi parsers. Sentences of the same
+length are processed in batches: every chart operation is applied to the
+whole batch at once.
+Charts are dense arrays (n_cells, n_nt), the row of the cell (lev, k)
+covering the words k..k+lev being span_offsets(n)[lev] + k.
+"""
+
+
+from speechnlpProject.grammar import *
+from speechnlpProject.compiled_grammar import _concat_ranges
+import numpy as np
+
+
+def span_offsets(n):
+    """
+        span_offsets
+        Get the first row of each level in the dense charts of a sentence.
+
+        Parameters
+        ----------
+        n: int. The number of words.
+
+        Returns
+        ----------
+        offset: np.array(int) of length n+1.
+            The cell (lev, k) is the row offset[lev]+k, and there are
+            offset[n] cells.
+    """
+    offset = np.zeros(n+1, dtype=np.int64)
+    np.cumsum(np.arange(n, 0, -1), out=offset[1:])
+    return offset
+
+
+def span_bounds(n):
+    """
+        span_bounds
+        Get the span of each row of the dense charts of a sentence.
+
+        Parameters
+        ----------
+        n: int. The number of words.
+
+        Returns
+        ----------
+        bounds: np.array((n_cells, 2), int).
+            The first word and the end (excluded) of each span.
+    """
+    return np.array([(k, k+lev+1) for lev in range(n) \
+        for k in range(n-lev)], dtype=np.int64).reshape(-1, 2)
+
+
+def _inside_cell(grammar, left_scores, right_scores, inside):
+    """
+        _inside_cell
+        Computes the inside log-scores of a cell given the inside log-scores
+        of its left and right sub-cells for every split point.
+
+        Parameters
+        ----------
+        grammar: CompiledPCFG.
+        left_scores: np.array((batch, n_splits, n_nt)).
+        right_scores: np.array((batch, n_splits, n_nt)).
+        inside: np.array((batch, n_nt)).
+            Output array.
+    """
+    rule_parent, rule_left, rule_right, rule_logp = grammar.binary_rules()
+    left_active = np.flatnonzero(np.any(left_scores > -np.inf, axis=(0, 1)))
+    rules = grammar.rules_with_left(left_active)
+    right_active = np.any(right_scores > -np.inf, axis=(0, 1))
+    rules = rules[right_active[rule_right[rules]]]
+    if len(rules) == 0:
+        return
+
+    # Sum over split points, then over the rules of each parent
+    cand = left_scores[:, :, rule_left[rules]] + \
+        right_scores[:, :, rule_right[rules]]
+    rule_sum = np.logaddexp.reduce(cand, axis=1) + rule_logp[rules]
+    parents = rule_parent[rules]
+    starts = np.flatnonzero(np.append(True, parents[1:] != parents[:-1]))
+    inside[:, parents[starts]] = np.logaddexp.reduceat(rule_sum, starts, \
+        axis=1)
+
+
+def _outside_cell(grammar, child_ids, side, parent_outside, sibling_inside, \
+        outside):
+    """
+        _outside_cell
+        Adds to the outside log-scores of a cell the contributions of the
+        parent cells in which it is the left (or right) sub-cell.
+
+        Parameters
+        ----------
+        grammar: CompiledPCFG.
+        child_ids: np.array(int).
+            The non-terminals with a finite inside score in the cell.
+        side: int.
+            0 if the cell is the left sub-cell, 1 if it is the right one.
+        parent_outside: np.array((batch, n_parents, n_nt)).
+            Outside log-scores of the parent cells.
+        sibling_inside: np.array((batch, n_parents, n_nt)).
+            Inside log-scores of the sibling sub-cell in each parent cell.
+        outside: np.array((batch, n_nt)).
+            Output array (accumulated).
+    """
+    rule_parent, rule_left, rule_right, rule_logp = grammar.binary_rules()
+    if side == 0:
+        ptr, child_rules = grammar.rules_by_left()
+        rule_sibling = rule_right
+    else:
+        ptr, child_rules = grammar.rules_by_right()
+        rule_sibling = rule_left
+
+    # Rules grouped by child, with an active parent and sibling
+    rules = child_rules[_concat_ranges(ptr[child_ids], ptr[child_ids+1])]
+    parent_active = np.any(parent_outside > -np.inf, axis=(0, 1))
+    sibling_active = np.any(sibling_inside > -np.inf, axis=(0, 1))
+    rules = rules[parent_active[rule_parent[rules]] & \
+        sibling_active[rule_sibling[rules]]]
+    if len(rules) == 0:
+        return
+
+    # Sum over parent cells, then over the rules of each child
+    cand = parent_outside[:, :, rule_parent[rules]] + \
+        sibling_inside[:, :, rule_sibling[rules]]
+    rule_sum = np.logaddexp.reduce(cand, axis=1) + rule_logp[rules]
+    children = rule_left[rules] if side == 0 else rule_right[rules]
+    starts = np.flatnonzero(np.append(True, children[1:] != children[:-1]))
+    children = children[starts]
+    outside[:, children] = np.logaddexp(outside[:, children], \
+        np.logaddexp.reduceat(rule_sum, starts, axis=1))
+
+
+def batch_inside_outside(grammar, batch_word_ids, root):
+    """
+        batch_inside_outside
+        Computes the inside and outside log-scores of sentences of the same
+        length. The two dense float64 arrays take
+        2 * 8 * batch * n_cells * n_nt bytes, n_cells = n * (n+1) / 2 for
+        sentences of n words (e.g. 0.7 GB each for 32 sentences of 25 words
+        and 8000 non-terminals): see batch_span_posteriors to bound it.
+
+        Parameters
+        ----------
+        grammar: CompiledPCFG.
+        batch_word_ids: list(list(int)).
+            The ids of the words of each sentence in the grammar.
+        root: int.
+            The id of the root non-terminal.
+
+        Returns
+        ----------
+        inside: np.array((batch, n_cells, n_nt)).
+        outside: np.array((batch, n_cells, n_nt)).
+        log_z: np.array(batch).
+            The log-probability of each sentence (-inf if it can not be
+            parsed).
+    """
+    batch = len(batch_word_ids)
+    n = len(batch_word_ids[0])
+    n_nt = grammar.n_nt()
+    offset = span_offsets(n)
+    n_cells = int(offset[n])
+
+    inside = np.full((batch, n_cells, n_nt), -np.inf)
+    outside = np.full((batch, n_cells, n_nt), -np.inf)
+    for b in range(batch):
+        if len(batch_word_ids[b]) != n:
+            raise Exception("Sentences of a batch must have the same length")
+        for k in range(n):
+            nt_ids, logps = grammar.lexical_rules(batch_word_ids[b][k])
+            inside[b, k, nt_ids] = logps
+
+    for lev in range(1, n):
+        splits = np.arange(lev)
+        for k in range(n-lev):
+            _inside_cell(grammar, inside[:, offset[splits] + k], \
+                inside[:, offset[lev-splits-1] + k+1+splits], \
+                inside[:, offset[lev] + k])
+
+    log_z = inside[:, n_cells-1, root].copy()
+    parsed = log_z > -np.inf
+    if not np.any(parsed):
+        return inside, outside, log_z
+
+    # Top-down: the outside scores of a cell are given by the cells in
+    # which it is the left sub-cell (with the right sibling (j, k+lev+1))
+    # and the ones in which it is the right sub-cell (with the left sibling
+    # (j, k-1-j))
+    outside[parsed, n_cells-1, root] = 0.0
+    for lev in range(n-2, -1, -1):
+        for k in range(n-lev):
+            child_ids = np.flatnonzero(np.any(inside[:, offset[lev] + k] > \
+                -np.inf, axis=0))
+            if len(child_ids) == 0:
+                continue
+            j = np.arange(n-1-lev-k)
+            if len(j) > 0:
+                _outside_cell(grammar, child_ids, 0, \
+                    outside[:, offset[lev+1+j] + k], \
+                    inside[:, offset[j] + k+lev+1], \
+                    outside[:, offset[lev] + k])
+            j = np.arange(k)
+            if len(j) > 0:
+                _outside_cell(grammar, child_ids, 1, \
+                    outside[:, offset[lev+1+j] + k-1-j], \
+                    inside[:, offset[j] + k-1-j], \
+                    outside[:, offset[lev] + k])
+
+    return inside, outside, log_z
+
+
+def inside_outside(grammar, word_ids, root):
+    """
+        inside_outside
+        Computes the inside and outside log-scores of a sentence.
+
+        Parameters
+        ----------
+        grammar: CompiledPCFG.
+        word_ids: list(int).
+            The ids of the words of the sentence in the grammar.
+        root: int.
+            The id of the root non-terminal.
+
+        Returns
+        ----------
+        inside: list(np.array((n-lev, n_nt))).
+            The cells of each level (same layout as Vectorized_CYK_Parser).
+        outside: list(np.array((n-lev, n_nt))).
+        log_z: float.
+            The log-probability of the sentence (-inf if it can not be
+            parsed).
+    """
+    n = len(word_ids)
+    offset = span_offsets(n)
+    inside, outside, log_z = batch_inside_outside(grammar, [word_ids], root)
+    return [inside[0, offset[lev]:offset[lev+1]] for lev in range(n)], \
+        [outside[0, offset[lev]:offset[lev+1]] for lev in range(n)], \
+        log_z[0]
+
+
+def batch_span_posteriors(grammar, sentences_word_ids, root, \
+        batch_size=32, max_memory=256 * 2**20):
+    """
+        batch_span_posteriors
+        Computes the posterior probability of each non-terminal over each
+        span of many sentences, i.e. the probability that a parse of the
+        sentence has this non-terminal over this span. Sentences are
+        grouped by length in batches, whose inside and outside arrays take
+        2 * 8 * batch * n_cells * n_nt bytes (see batch_inside_outside):
+        the batches are made smaller so as to stay under max_memory.
+
+        Parameters
+        ----------
+        grammar: CompiledPCFG.
+        sentences_word_ids: list(list(int)).
+            The ids of the words of each sentence in the grammar.
+        root: int.
+            The id of the root non-terminal.
+        batch_size=32: int.
+            Optional. Maximum number of sentences processed at once.
+        max_memory=256 * 2**20: int.
+            Optional. Maximum size in bytes of the inside and outside
+            arrays of a batch (a sentence is processed alone if its own
+            arrays are larger).
+
+        Returns
+        ----------
+        posteriors: list(np.array((n_cells, n_nt)) or None).
+            The dense [span, label] posteriors of each sentence (rows as
+            given by span_bounds), None if the sentence can not be parsed.
+    """
+    by_length = {}
+    for i, word_ids in enumerate(sentences_word_ids):
+        if len(word_ids) > 0:
+            by_length.setdefault(len(word_ids), []).append(i)
+
+    posteriors = [None] * len(sentences_word_ids)
+    for n, indexes in by_length.items():
+        sentence_memory = 2 * 8 * int(span_offsets(n)[n]) * grammar.n_nt()
+        n_batch = max(1, min(batch_size, max_memory // sentence_memory))
+        for start in range(0, len(indexes), n_batch):
+            batch = indexes[start:start+n_batch]
+            inside, outside, log_z = batch_inside_outside(grammar, \
+                [sentences_word_ids[i] for i in batch], root)
+            for b, i in enumerate(batch):
+                if log_z[b] > -np.inf:
+                    posteriors[i] = np.exp(inside[b] + outside[b] - log_z[b])
+    return posteriors
+
+
+def span_posteriors(grammar, word_ids, root):
+    """
+        span_posteriors
+        Computes the posterior probability of each non-terminal over each
+        span of a sentence.
+
+        Parameters
+        ----------
+        grammar: CompiledPCFG.
+        word_ids: list(int).
+            The ids of the words of the sentence in the grammar.
+        root: int.
+            The id of the root non-terminal.
+
+        Returns
+        ----------
+        posteriors: list(np.array((n-lev, n_nt))) or None if the sentence
+            can not be parsed.
+    """
+    posterior = batch_span_posteriors(grammar, [word_ids], root)[0]
+    if posterior is None:
+        return None
+    offset = span_offsets(len(word_ids))
+    return [posterior[offset[lev]:offset[lev+1]] \
+        for lev in range(len(word_ids))]
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy k-best derivations of a Viterbi chart (Huang and Chiang 2005,
+algorithm 3): the derivations of a node are enumerated on demand, from a
+heap of candidates seeded with the best derivation of each of its incoming
+hyperedges (rule, split point).
+"""
+
+
+import heapq
+import numpy as np
+
+
+class KBest_Derivations:
+    """
+        KBest_Derivations
+        Enumerates the derivations of the nodes (lev, k, a) of a chart of
+        Vectorized_CYK_Parser by decreasing log-score. Ties are broken as in
+        the Viterbi parse (lowest split point, then lowest rule index), so
+        the first derivation is the Viterbi one.
+        A derivation is a tuple (score, split, rule, left rank, right rank),
+        with split and rule None on the first level.
+    """
+
+
+    def __init__(self, grammar, chart_score, k_max):
+        """
+            KBest_Derivations.__init__
+
+            Parameters
+            ----------
+            grammar: CompiledPCFG.
+            chart_score: list(np.array((n-lev, n_nt))).
+                The Viterbi log-scores of the chart.
+            k_max: int.
+                The maximum number of derivations per node.
+        """
+        self._grammar = grammar
+        self._rule_parent, self._rule_left, self._rule_right, \
+            self._rule_logp = grammar.binary_rules()
+        self._parent_ptr = grammar.rules_by_parent()
+        self._chart_score = chart_score
+        self._k_max = k_max
+        # Node -> sorted derivations found so far, heap of candidates and
+        # set of the candidates already pushed
+        self._derivations = {}
+        self._candidates = {}
+        self._seen = {}
+
+
+    def _edge_score(self, lev, k, split, rule, left_rank, right_rank):
+        left = self._derivations[(split, k, self._rule_left[rule])]
+        right = self._derivations[(lev-split-1, k+1+split, \
+            self._rule_right[rule])]
+        return (left[left_rank][0] + right[right_rank][0]) + \
+            self._rule_logp[rule]
+
+
+    def _init_node(self, node):
+        """
+            KBest_Derivations._init_node
+            Seeds the candidates of a node with the best derivation of its
+            k_max best incoming hyperedges.
+
+            Parameters
+            ----------
+            node: tuple(int). (lev, k, a).
+        """
+        lev, k, a = node
+        if lev == 0:
+            self._derivations[node] = [(self._chart_score[0][k, a], None, \
+                None, 0, 0)]
+            self._candidates[node] = []
+            return
+
+        # Best derivation of each hyperedge: Viterbi scores of the children
+        rules = np.arange(self._parent_ptr[a], self._parent_ptr[a+1])
+        splits = np.arange(lev)
+        left = np.stack([self._chart_score[i][k][self._rule_left[rules]] \
+            for i in splits])
+        right = np.stack([self._chart_score[lev-i-1][k+1+i][ \
+            self._rule_right[rules]] for i in splits])
+        scores = (left + right) + self._rule_logp[rules]
+        split_ids, rule_ids = np.nonzero(scores > -np.inf)
+        scores = scores[split_ids, rule_ids]
+        order = np.lexsort((rules[rule_ids], split_ids, -scores))
+        order = order[:self._k_max]
+
+        self._derivations[node] = []
+        self._candidates[node] = [(-scores[o], int(split_ids[o]), \
+            int(rules[rule_ids[o]]), 0, 0) for o in order.tolist()]
+        heapq.heapify(self._candidates[node])
+        self._seen[node] = set((c[1], c[2], 0, 0) \
+            for c in self._candidates[node])
+
+
+    def _next_derivation(self, node):
+        """
+            KBest_Derivations._next_derivation
+            Finds the next derivation of a node (lazy next of the last one,
+            then pop of the best candidate).
+
+            Parameters
+            ----------
+            node: tuple(int). (lev, k, a).
+
+            Returns
+            ----------
+            found: bool.
+        """
+        lev, k, a = node
+        derivations = self._derivations[node]
+        candidates = self._candidates[node]
+        if lev > 0 and len(derivations) > 0:
+            score, split, rule, left_rank, right_rank = derivations[-1]
+            children = ((split, k, self._rule_left[rule]), \
+                (lev-split-1, k+1+split, self._rule_right[rule]))
+            for side in (0, 1):
+                ranks = [left_rank, right_rank]
+                ranks[side] += 1
+                key = (split, rule, ranks[0], ranks[1])
+                if key in self._seen[node]:
+                    continue
+                if not self.kth(children[side], ranks[side]) or \
+                        not self.kth(children[1-side], ranks[1-side]):
+                    continue
+                self._seen[node].add(key)
+                heapq.heappush(candidates, (-self._edge_score(lev, k, \
+                    split, rule, ranks[0], ranks[1]), split, rule, \
+                    ranks[0], ranks[1]))
+        if len(candidates) == 0:
+            return False
+        neg_score, split, rule, left_rank, right_rank = \
+            heapq.heappop(candidates)
+        derivations.append((-neg_score, split, rule, left_rank, right_rank))
+        return True
+
+
+    def kth(self, node, rank):
+        """
+            KBest_Derivations.kth
+            Makes sure the derivation of a given rank of a node is found.
+
+            Parameters
+            ----------
+            node: tuple(int). (lev, k, a).
+            rank: int.
+                From 0 (the best derivation).
+
+            Returns
+            ----------
+            found: bool.
+                False if the node has no more than rank derivations (or if
+                rank >= k_max).
+        """
+        if rank >= self._k_max:
+            return False
+        if node not in self._derivations.keys():
+            self._init_node(node)
+        derivations = self._derivations[node]
+        while len(derivations) <= rank:
+            if not self._next_derivation(node):
+                return False
+        return True
+
+
+    def derivation(self, node, rank):
+        """
+            KBest_Derivations.derivation
+            Get a derivation of a node (which must exist, see kth).
+
+            Parameters
+            ----------
+            node: tuple(int). (lev, k, a).
+            rank: int.
+
+            Returns
+            ----------
+            derivation: tuple.
+                (score, split, rule, left rank, right rank).
+        """
+        self.kth(node, rank)
+        return self._derivations[node][rank]
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Counters and timers of the parses and of the training. Each call collects
+its own Call_Stats, which is then added to the metrics of the process
+(Metrics_Registry), to be exported as JSON or in the Prometheus text format.
+Nothing is collected unless enabled (collect_stats=True).
+"""
+
+
+import json
+import threading
+
+
+class Call_Stats:
+    """
+        Call_Stats
+        Counters, timers (in seconds) and times of the chart levels of one
+        call.
+    """
+
+    __slots__ = ("_counters", "_timers", "_levels")
+
+
+    def __init__(self):
+        self._counters = {}
+        self._timers = {}
+        self._levels = []
+
+
+    def count(self, name, n=1):
+        """
+            Call_Stats.count
+            Increments a counter.
+
+            Parameters
+            ----------
+            name: string.
+            n=1: int.
+                Optional.
+        """
+        self._counters[name] = self._counters.get(name, 0) + n
+
+
+    def add_time(self, name, seconds):
+        """
+            Call_Stats.add_time
+            Adds time to a timer.
+
+            Parameters
+            ----------
+            name: string.
+            seconds: float.
+        """
+        self._timers[name] = self._timers.get(name, 0.0) + seconds
+
+
+    def add_level_time(self, lev, seconds):
+        """
+            Call_Stats.add_level_time
+            Adds time to a chart level.
+
+            Parameters
+            ----------
+            lev: int.
+                The level (0 for the words).
+            seconds: float.
+        """
+        while len(self._levels) <= lev:
+            self._levels.append(0.0)
+        self._levels[lev] += seconds
+
+
+    def counters(self):
+        """
+            Call_Stats.counters
+            Get the counters.
+
+            Returns
+            ----------
+            res: dict(string: int).
+        """
+        return dict(self._counters)
+
+
+    def timers(self):
+        """
+            Call_Stats.timers
+            Get the timers.
+
+            Returns
+            ----------
+            res: dict(string: float).
+        """
+        return dict(self._timers)
+
+
+    def level_times(self):
+        """
+            Call_Stats.level_times
+            Get the time spent on each chart level.
+
+            Returns
+            ----------
+            res: list(float).
+        """
+        return list(self._levels)
+
+
+    def to_dict(self):
+        """
+            Call_Stats.to_dict
+            Get the stats as a JSON serializable dict.
+
+            Returns
+            ----------
+            res: dict.
+                "counters", "seconds" and "level_seconds".
+        """
+        return {"counters": dict(self._counters), \
+            "seconds": dict(self._timers), \
+            "level_seconds": list(self._levels)}
+
+
+    def __repr__(self):
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+
+class Metrics_Registry:
+    """
+        Metrics_Registry
+        Sums of the Call_Stats of the calls, by kind of call ("parse",
+        "train"). Thread-safe.
+    """
+
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}
+
+
+    def record(self, kind, stats):
+        """
+            Metrics_Registry.record
+            Adds the stats of a call.
+
+            Parameters
+            ----------
+            kind: string.
+                Kind of call, e.g. "parse".
+            stats: Call_Stats.
+        """
+        with self._lock:
+            if kind not in self._kinds:
+                self._kinds[kind] = Call_Stats()
+                self._kinds[kind]._counters["calls"] = 0
+            total = self._kinds[kind]
+            total._counters["calls"] += 1
+            for name, n in stats._counters.items():
+                total.count(name, n)
+            for name, seconds in stats._timers.items():
+                total.add_time(name, seconds)
+            for lev, seconds in enumerate(stats._levels):
+                total.add_level_time(lev, seconds)
+
+
+    def reset(self):
+        """
+            Metrics_Registry.reset
+            Forgets all the recorded stats.
+        """
+        with self._lock:
+            self._kinds = {}
+
+
+    def snapshot(self):
+        """
+            Metrics_Registry.snapshot
+            Get the sums of the recorded stats.
+
+            Returns
+            ----------
+            res: dict(string: dict).
+                For each kind of call, the to_dict of the sum of its stats
+                (the counter "calls" being the number of calls).
+        """
+        with self._lock:
+            return dict((kind, total.to_dict()) \
+                for kind, total in self._kinds.items())
+
+
+    def to_json(self):
+        """
+            Metrics_Registry.to_json
+            Get the sums of the recorded stats as JSON (see snapshot).
+
+            Returns
+            ----------
+            res: string.
+        """
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+
+    def to_prometheus(self, namespace="speechnlp"):
+        """
+            Metrics_Registry.to_prometheus
+            Get the sums of the recorded stats in the Prometheus text
+            format, e.g.
+                # TYPE speechnlp_parse_cells_total counter
+                speechnlp_parse_cells_total 1830
+                # TYPE speechnlp_parse_seconds_total counter
+                speechnlp_parse_seconds_total{phase="lexical"} 0.0123
+                # TYPE speechnlp_parse_level_seconds_total counter
+                speechnlp_parse_level_seconds_total{level="1"} 0.0456
+
+            Parameters
+            ----------
+            namespace="speechnlp": string.
+                Optional. Prefix of the metric names.
+
+            Returns
+            ----------
+            res: string.
+        """
+        lines = []
+        for kind, stats in sorted(self.snapshot().items()):
+            prefix = namespace + "_" + kind
+            for name, n in sorted(stats["counters"].items()):
+                lines.append("# TYPE " + prefix + "_" + name + \
+                    "_total counter")
+                lines.append(prefix + "_" + name + "_total " + str(n))
+            if len(stats["seconds"]) > 0:
+                lines.append("# TYPE " + prefix + "_seconds_total counter")
+                for name, seconds in sorted(stats["seconds"].items()):
+                    lines.append(prefix + '_seconds_total{phase="' + name + \
+                        '"} ' + repr(seconds))
+            if len(stats["level_seconds"]) > 0:
+                lines.append("# TYPE " + prefix + \
+                    "_level_seconds_total counter")
+                for lev, seconds in enumerate(stats["level_seconds"]):
+                    lines.append(prefix + '_level_seconds_total{level="' + \
+                        str(lev) + '"} ' + repr(seconds))
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of the current process
+_process_metrics = Metrics_Registry()
+
+
+def process_metrics():
+    """
+        process_metrics
+        Get the metrics of the current process, where the parsers and the
+        PCFG record the stats of their calls.
+
+        Returns
+        ----------
+        metrics: Metrics_Registry.
+    """
+    return _process_metrics
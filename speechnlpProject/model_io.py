@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Binary model format of a trained PCFG: NumPy arrays in a .npz file, with all
+the symbol and word strings stored once in a string table.
+
+Format (version 2):
+    format, version: identification of the file.
+    string_data, string_ptr: UTF-8 bytes of the strings, string i being
+        string_data[string_ptr[i]:string_ptr[i+1]].
+    symbol_string, symbol_type: the GSymbols, as a string id and a type.
+    rule_root, rule_ptr, rule_children, rule_proba: the transitions, the
+        result symbols of transition r being
+        rule_children[rule_ptr[r]:rule_ptr[r+1]].
+    frequency_word, frequency_value: the frequency of the words.
+    rule_count, train_options: optional (both or none), the raw counts of
+        the transitions and the options (to_lower_case, chomsky_normalize,
+        short_name) of the training, needed by PCFG.update and PCFG.remove.
+    long_name_short, long_name_long: optional (both or none), the string ids
+        of the short names of the symbols created by the Chomsky
+        normalization and of the sequences they replace (see
+        SymbolTable.long_name), used by the coarse projections.
+The version 1 has no rule_count nor train_options: its models are loaded to
+parse only.
+"""
+
+
+from speechnlpProject.grammar import *
+import numpy as np
+
+
+MODEL_FORMAT = "speechnlpProject.PCFG"
+MODEL_VERSION = 2
+
+
+def _pack_strings(strings):
+    """
+        _pack_strings
+        Packs a list of strings in a string table.
+
+        Parameters
+        ----------
+        strings: list(string).
+
+        Returns
+        ----------
+        string_data: np.array(uint8).
+        string_ptr: np.array(int64).
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    string_ptr = np.zeros(len(encoded)+1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=string_ptr[1:])
+    string_data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return string_data, string_ptr
+
+
+def _unpack_strings(string_data, string_ptr):
+    """
+        _unpack_strings
+        Unpacks a string table.
+
+        Parameters
+        ----------
+        string_data: np.array(uint8).
+        string_ptr: np.array(int64).
+
+        Returns
+        ----------
+        strings: list(string).
+    """
+    data = string_data.tobytes()
+    ptr = string_ptr.tolist()
+    return [data[ptr[i]:ptr[i+1]].decode("utf-8") \
+        for i in range(len(ptr)-1)]
+
+
+def save_pcfg(pcfg, path, compressed=False):
+    """
+        save_pcfg
+        Saves a PCFG in the binary model format.
+
+        Parameters
+        ----------
+        pcfg: PCFG.
+        path: string.
+            The file path (NumPy appends ".npz" if missing).
+        compressed=False: bool.
+            Optional. Compresses the arrays.
+    """
+    strings = []
+    string_index = {}
+    symbols = []
+    symbol_index = {}
+
+    def string_id(s):
+        if s not in string_index.keys():
+            string_index[s] = len(strings)
+            strings.append(s)
+        return string_index[s]
+
+    def symbol_id(gsymb):
+        if gsymb not in symbol_index.keys():
+            symbol_index[gsymb] = len(symbols)
+            symbols.append((string_id(gsymb.ssymb()), gsymb.stype()))
+        return symbol_index[gsymb]
+
+    rule_root = []
+    rule_ptr = [0]
+    rule_children = []
+    rule_proba = []
+    rule_count = []
+    for gsymb, gtrans_proba in pcfg._cfgmap.items():
+        for gtrans, proba in gtrans_proba.items():
+            rule_root.append(symbol_id(gtrans.symb()))
+            rule_children += [symbol_id(s) for s in gtrans.res_symb()]
+            rule_ptr.append(len(rule_children))
+            rule_proba.append(proba)
+            if pcfg._counts is not None:
+                rule_count.append(pcfg._counts[gsymb][gtrans])
+
+    frequency_word = []
+    frequency_value = []
+    for word, frequency in pcfg._frequency_lexicon.items():
+        frequency_word.append(string_id(word))
+        frequency_value.append(frequency)
+
+    long_names = pcfg._symbol_table.long_names()
+    long_name_short = [string_id(name) for name, _ in long_names]
+    long_name_long = [string_id(long_name) for _, long_name in long_names]
+
+    string_data, string_ptr = _pack_strings(strings)
+    arrays = {
+        "format": np.array(MODEL_FORMAT),
+        "version": np.array(MODEL_VERSION, dtype=np.int32),
+        "string_data": string_data,
+        "string_ptr": string_ptr,
+        "symbol_string": np.array([s[0] for s in symbols], dtype=np.int32),
+        "symbol_type": np.array([s[1] for s in symbols], dtype=np.int8),
+        "rule_root": np.array(rule_root, dtype=np.int32),
+        "rule_ptr": np.array(rule_ptr, dtype=np.int64),
+        "rule_children": np.array(rule_children, dtype=np.int32),
+        "rule_proba": np.array(rule_proba, dtype=np.float64),
+        "frequency_word": np.array(frequency_word, dtype=np.int32),
+        "frequency_value": np.array(frequency_value, dtype=np.float64),
+        }
+    if pcfg._counts is not None:
+        arrays["rule_count"] = np.array(rule_count, dtype=np.int64)
+        arrays["train_options"] = np.array([pcfg._to_lower_case, \
+            pcfg._chomsky_normalize, pcfg._short_name], dtype=np.int8)
+    if len(long_names) > 0:
+        arrays["long_name_short"] = np.array(long_name_short, dtype=np.int32)
+        arrays["long_name_long"] = np.array(long_name_long, dtype=np.int32)
+    if compressed:
+        np.savez_compressed(path, **arrays)
+    else:
+        np.savez(path, **arrays)
+
+
+def load_pcfg(path):
+    """
+        load_pcfg
+        Loads a PCFG saved in the binary model format (version 1 or 2,
+        a model without the counts of its rules being loaded to parse only).
+
+        Parameters
+        ----------
+        path: string.
+
+        Returns
+        ----------
+        pcfg: PCFG.
+    """
+    with np.load(path, allow_pickle=False) as arrays:
+        if "format" not in arrays.files or \
+                str(arrays["format"]) != MODEL_FORMAT:
+            raise Exception("Not a PCFG model file: " + str(path))
+        version = int(arrays["version"])
+        if version not in (1, MODEL_VERSION):
+            raise Exception("Unsupported PCFG model version: " + \
+                str(version))
+
+        strings = _unpack_strings(arrays["string_data"], arrays["string_ptr"])
+        symbol_table = SymbolTable()
+        symbols = [symbol_table.symbol(strings[s], t) for s, t in \
+            zip(arrays["symbol_string"].tolist(), \
+                arrays["symbol_type"].tolist())]
+
+        rule_root = arrays["rule_root"].tolist()
+        rule_ptr = arrays["rule_ptr"].tolist()
+        rule_children = arrays["rule_children"].tolist()
+        rule_proba = arrays["rule_proba"].tolist()
+        # Files saved without the counts can be parsed with, not updated
+        rule_count = None
+        train_options = [None, None, None]
+        if version >= 2 and "rule_count" in arrays.files:
+            rule_count = arrays["rule_count"].tolist()
+            train_options = [bool(option) for option \
+                in arrays["train_options"].tolist()]
+        if "long_name_short" in arrays.files:
+            for name, long_name in zip(arrays["long_name_short"].tolist(), \
+                    arrays["long_name_long"].tolist()):
+                symbol_table.add_long_name(strings[name], strings[long_name])
+
+        cfgmap = {}
+        counts = None if rule_count is None else {}
+        for r in range(len(rule_root)):
+            gsymb = symbols[rule_root[r]]
+            gtrans = symbol_table.transition(gsymb, [symbols[c] for c in \
+                rule_children[rule_ptr[r]:rule_ptr[r+1]]])
+            if gsymb not in cfgmap.keys():
+                cfgmap[gsymb] = {}
+                if counts is not None:
+                    counts[gsymb] = {}
+            cfgmap[gsymb][gtrans] = rule_proba[r]
+            if counts is not None:
+                counts[gsymb][gtrans] = rule_count[r]
+
+        frequency_lexicon = {strings[w]: f for w, f in \
+            zip(arrays["frequency_word"].tolist(), \
+                arrays["frequency_value"].tolist())}
+
+    pcfg = PCFG.__new__(PCFG)
+    pcfg._symbol_table = symbol_table
+    pcfg._train_stats = None
+    pcfg._to_lower_case, pcfg._chomsky_normalize, pcfg._short_name = \
+        train_options
+    pcfg._version = 0
+    pcfg._counts = counts
+    pcfg._word_counts = None
+    if counts is not None:
+        pcfg._word_counts = {}
+        for gtrans_count in counts.values():
+            for gtrans, count in gtrans_count.items():
+                res_symb = gtrans.res_symb()
+                if len(res_symb) == 1 and \
+                        res_symb[0].stype() == GSymbol.TERMINAL:
+                    pcfg._word_counts[res_symb[0].ssymb()] = \
+                        pcfg._word_counts.get(res_symb[0].ssymb(), 0) + count
+    pcfg._set_probabilities(cfgmap, frequency_lexicon)
+    return pcfg
@@ -7,7 +7,23 @@ Created on Fri Feb 23 11:58:06 2018
 
 
 from speechnlpProject.grammar import *
+from speechnlpProject.compiled_grammar import default_projection
+from speechnlpProject.inside_outside import span_posteriors, \
+    batch_span_posteriors
+from speechnlpProject.tree import ParseTree, build_tree, \
+    is_binarization_symbol, is_terminal_substitute
+from speechnlpProject.parse_cache import LRU_Cache
+from speechnlpProject.metrics import Call_Stats, process_metrics
+import hashlib
+import multiprocessing
 import numpy as np
+import re
+import time
+
+
+# Words of a sentence: as the words of the treebank (see read_tree), runs of
+# characters other than white spaces
+_SENTENCE_WORD = re.compile(r"[^ \t\r\n]+")
 
 
 def edit_distance(s1, s2):
@@ -29,71 +45,754 @@ def edit_distance(s1, s2):
     """
     # Note that compared to the psuedo code given in the slides:
     # - arrays indices in python begin at 0
-    # - m is in fact of shape (len(s1)+1, len(s2)+1)
+    # - only the previous row of the matrix m of shape
+    #   (len(s1)+1, len(s2)+1) is kept
     # - strings indices in python begin at 0
     # We make the suitable index changes
-    m = np.zeros((len(s1)+1, len(s2)+1), dtype=int)
-    m[:, 0] = np.arange(0, len(s1)+1)
-    m[0, :] = np.arange(0, len(s2)+1)
+    prev = list(range(len(s2)+1))
     for i in range(1, len(s1)+1):
+        cur = [i]
         for j in range(1, len(s2)+1):
             if s1[i-1] == s2[j-1]:
-                m[i, j] = np.min([m[i-1, j]+1, m[i, j-1]+1, m[i-1, j-1]])
-                #m[i, j] = m[i-1, j-1]
+                cur.append(min(prev[j]+1, cur[j-1]+1, prev[j-1]))
             else:
-                m[i, j] = np.min([m[i-1, j]+1, m[i, j-1]+1, \
-                                        m[i-1, j-1]+1])
-    return m[len(s1), len(s2)]
+                cur.append(min(prev[j]+1, cur[j-1]+1, prev[j-1]+1))
+        prev = cur
+    return prev[len(s2)]
 
 
-class CYK_Parser:
+def bounded_edit_distance(s1, s2, max_distance):
+    """
+        bounded_edit_distance
+        Computes the Levenshtein distance between 2 given strings if it is
+        at most max_distance. Only the band of width 2*max_distance+1 around
+        the diagonal of the Wagner–Fischer matrix is computed (O(k.n) time
+        and memory), and the computation stops as soon as a whole row
+        exceeds max_distance.
+        
+        Parameters
+        ----------
+        s1: string. First string.
+        s2: string. Second string.
+        max_distance: int. The threshold k.
+        
+        Returns
+        ----------
+        res: int. The Levenshtein distance between s1 and s2 if <= k,
+            else k+1.
+    """
+    k = max_distance
+    over = k + 1
+    n1 = len(s1)
+    n2 = len(s2)
+    if abs(n1 - n2) > k:
+        return over
+    
+    # Two rows of the matrix, cells out of the band are worth k+1
+    prev = [j if j <= k else over for j in range(n2+1)]
+    cur = [over] * (n2+1)
+    for i in range(1, n1+1):
+        lo = max(1, i-k)
+        hi = min(n2, i+k)
+        cur[lo-1] = i if lo == 1 and i <= k else over
+        row_min = cur[lo-1]
+        c1 = s1[i-1]
+        for j in range(lo, hi+1):
+            v = prev[j-1] if c1 == s2[j-1] else prev[j-1]+1
+            if prev[j]+1 < v:
+                v = prev[j]+1
+            if cur[j-1]+1 < v:
+                v = cur[j-1]+1
+            if v > over:
+                v = over
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > k:
+            return over
+        prev, cur = cur, prev
+    return prev[n2]
+
+
+def encode_words(words):
+    """
+        encode_words
+        Encodes a list of words as a padded matrix of code points, for
+        batch_edit_distance.
+        
+        Parameters
+        ----------
+        words: list(string).
+        
+        Returns
+        ----------
+        codes: np.array((len(words), max length), int32).
+            Code points of the words, padded with -1.
+        lengths: np.array(int32). The lengths of the words.
+    """
+    lengths = np.array([len(w) for w in words], dtype=np.int32)
+    codes = np.full((len(words), max(lengths.max(initial=0), 1)), -1, \
+        dtype=np.int32)
+    for i, w in enumerate(words):
+        codes[i, :len(w)] = [ord(c) for c in w]
+    return codes, lengths
+
+
+def batch_edit_distance(s, candidates, max_distance):
+    """
+        batch_edit_distance
+        Computes the bounded Levenshtein distance between a string and many
+        candidates at once: the band of the Wagner–Fischer matrix is
+        computed for all the candidates with NumPy operations.
+        
+        Parameters
+        ----------
+        s: string. The query.
+        candidates: list(string) or tuple(codes, lengths).
+            The candidates, or their encoding by encode_words.
+        max_distance: int. The threshold k.
+        
+        Returns
+        ----------
+        res: np.array(int). For each candidate, the Levenshtein distance to
+            s if <= k, else k+1.
+    """
+    if isinstance(candidates, tuple):
+        codes, lengths = candidates
+    else:
+        codes, lengths = encode_words(candidates)
+    k = max_distance
+    over = k + 1
+    n_cand, n2 = codes.shape
+    res = np.full(n_cand, over, dtype=np.int32)
+    
+    # Skip candidates whose length difference already exceeds k
+    active = np.flatnonzero(np.abs(lengths - len(s)) <= k)
+    if len(active) == 0:
+        return res
+    codes = codes[active]
+    
+    prev = np.minimum(np.arange(n2+1, dtype=np.int32), over)
+    prev = np.tile(prev, (len(active), 1))
+    for i in range(1, len(s)+1):
+        lo = max(1, i-k)
+        hi = min(n2, i+k)
+        cur = np.full_like(prev, over)
+        if lo == 1 and i <= k:
+            cur[:, 0] = i
+        c1 = ord(s[i-1])
+        for j in range(lo, hi+1):
+            v = prev[:, j-1] + (codes[:, j-1] != c1)
+            np.minimum(v, prev[:, j]+1, out=v)
+            np.minimum(v, cur[:, j-1]+1, out=v)
+            np.minimum(v, over, out=cur[:, j])
+        if cur[:, lo-1:hi+1].min() > k:
+            return res
+        prev = cur
+    res[active] = prev[np.arange(len(active)), lengths[active]]
+    return res
+
+
+def _deletes(s, max_deletes):
+    """
+        _deletes
+        Get all the strings obtained by deleting at most max_deletes
+        characters of s (s included).
+
+        Parameters
+        ----------
+        s: string.
+        max_deletes: int.
+
+        Returns
+        ----------
+        res: set(string).
+    """
+    res = {s}
+    frontier = {s}
+    for z in range(max_deletes):
+        next_frontier = set()
+        for x in frontier:
+            for i in range(len(x)):
+                next_frontier.add(x[:i] + x[i+1:])
+        res |= next_frontier
+        frontier = next_frontier
+    return res
+
+
+class LexiconIndex:
+    """
+        LexiconIndex
+        Implements a SymSpell-style deletion index over the words of a
+        lexicon, in order to find the words within a given edit distance of
+        an unknown word without scanning the whole lexicon.
+        Two words within edit distance d always share a string obtained by
+        deleting at most d characters of each of their prefixes, so only the
+        deletes of the first prefix_length characters of each word are
+        indexed (as hashes, in sorted arrays). Candidates are then checked
+        with the actual edit distance.
+    """
+
+
+    def __init__(self, words, max_distance=3, prefix_length=7):
+        """
+            LexiconIndex.__init__
+            Builds the index.
+
+            Parameters
+            ----------
+            words: iterable(string).
+                The lexicon. Results are given in this order.
+            max_distance=3: int.
+                Optional. Maximal edit distance of the queries.
+            prefix_length=7: int.
+                Optional. Length of the indexed prefixes (smaller index,
+                but more candidates to check, when shorter).
+        """
+        self._words = list(words)
+        self._max_distance = max_distance
+        self._prefix_length = prefix_length
+        self._codes, self._lengths = encode_words(self._words)
+
+        hashes = []
+        word_ids = []
+        n_deletes = []
+        for w_id, w in enumerate(self._words):
+            prefix = w[:prefix_length]
+            for x in _deletes(prefix, max_distance):
+                hashes.append(hash(x))
+                word_ids.append(w_id)
+                n_deletes.append(len(prefix) - len(x))
+
+        # Sort entries by hash for binary search
+        order = np.argsort(np.array(hashes, dtype=np.int64), kind="stable")
+        self._hashes = np.array(hashes, dtype=np.int64)[order]
+        self._word_ids = np.array(word_ids, dtype=np.int32)[order]
+        self._n_deletes = np.array(n_deletes, dtype=np.int8)[order]
+
+
+    def _candidates(self, word, distance):
+        """
+            LexiconIndex._candidates
+            Get the words which may be within the given edit distance.
+
+            Parameters
+            ----------
+            word: string.
+            distance: int.
+
+            Returns
+            ----------
+            w_ids: np.array(int). Sorted ids of the candidate words.
+        """
+        query = np.array([hash(x) for x in \
+            _deletes(word[:self._prefix_length], distance)], dtype=np.int64)
+        starts = np.searchsorted(self._hashes, query, side="left")
+        counts = np.searchsorted(self._hashes, query, side="right") - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int32)
+        # Concatenate the ranges [starts[i], starts[i]+counts[i])
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + \
+            np.arange(total)
+        positions = positions[self._n_deletes[positions] <= distance]
+        w_ids = np.unique(self._word_ids[positions])
+        return w_ids[np.abs(self._lengths[w_ids] - len(word)) <= distance]
+
+
+    def lookup(self, word, max_distance=None):
+        """
+            LexiconIndex.lookup
+            Get all the words within the given edit distance, grouped by
+            distance.
+
+            Parameters
+            ----------
+            word: string.
+            max_distance=None: int.
+                Optional. Defaults to the max_distance of the index.
+
+            Returns
+            ----------
+            groups: list(list(string)).
+                groups[d] is the list of the words at distance d (in the
+                order of the lexicon), for d in 0..max_distance.
+        """
+        if max_distance is None:
+            max_distance = self._max_distance
+        if max_distance > self._max_distance:
+            raise Exception("Distance greater than the index max_distance")
+
+        groups = [[] for z in range(max_distance+1)]
+        w_ids = self._candidates(word, max_distance)
+        distances = batch_edit_distance(word, \
+            (self._codes[w_ids], self._lengths[w_ids]), max_distance)
+        for w_id, current_edit_distance in zip(w_ids.tolist(), \
+                distances.tolist()):
+            if current_edit_distance <= max_distance:
+                groups[current_edit_distance].append(self._words[w_id])
+        return groups
+
+
+    def nearest(self, word, max_distance=None):
+        """
+            LexiconIndex.nearest
+            Get the words at the smallest edit distance, if within the given
+            edit distance. Distances are searched in increasing order, so
+            that close words are found without checking far candidates.
+
+            Parameters
+            ----------
+            word: string.
+            max_distance=None: int.
+                Optional. Defaults to the max_distance of the index.
+
+            Returns
+            ----------
+            distance: int or None if no word is within max_distance.
+            words: list(string).
+                The words at this distance (in the order of the lexicon).
+        """
+        if max_distance is None:
+            max_distance = self._max_distance
+        if max_distance > self._max_distance:
+            raise Exception("Distance greater than the index max_distance")
+
+        distances = {}
+        for distance in range(max_distance+1):
+            words = []
+            for w_id in self._candidates(word, distance).tolist():
+                if w_id not in distances.keys():
+                    distances[w_id] = bounded_edit_distance(word, \
+                        self._words[w_id], max_distance)
+                if distances[w_id] <= distance:
+                    words.append(self._words[w_id])
+            if len(words) > 0:
+                return distance, words
+        return None, []
+
+
+# Parser used by the worker processes of CYK_Parser.map_pool, and queue of
+# the results of the parser service (see _pool_parse_batch)
+_pool_parser = None
+_pool_results = None
+
+
+def _init_pool_parser(parser, results=None):
+    global _pool_parser, _pool_results
+    _pool_parser = parser
+    _pool_results = results
+
+
+def _pool_call(args):
+    function, item = args
+    return function(_pool_parser, item)
+
+
+def _parse_with(parser, test_s):
+    return parser.parse(test_s)
+
+
+def _pool_parse_batch(requests):
+    # Parses (key, sentence, deadline) requests, the deadline being a
+    # time.time() or None: the time budget of a parse is at most the time
+    # left before its deadline, and a request whose deadline has passed is
+    # not parsed (result (None, "timeout")). Each (key, result) is also put
+    # in the results queue as soon as it is parsed
+    res = []
+    time_budget = _pool_parser._time_budget
+    for key, test_s, deadline in requests:
+        result = (None, "timeout")
+        remaining = None if deadline is None else deadline - time.time()
+        if remaining is None or remaining > 0:
+            if remaining is not None and (time_budget is None or \
+                    remaining < time_budget):
+                _pool_parser._time_budget = remaining
+            try:
+                result = (_pool_parser.parse(test_s), \
+                    _pool_parser.parse_status())
+            finally:
+                _pool_parser._time_budget = time_budget
+        if _pool_results is not None:
+            _pool_results.put((key, result))
+        res.append(result)
+    return res
+
+
+class _Budget_Exceeded(Exception):
+    # Raised when the budget of a parse is spent, with the chart built so
+    # far (only complete cells)
     
+    def __init__(self, chart):
+        Exception.__init__(self, "Parse budget exceeded")
+        self.chart = chart
+
+
+class CYK_Parser:
     
-    def __init__(self, pcfg, root_symbol, verbose=False):
+    # Maximum number of unknown words whose replacement is memoized
+    OOV_MEMO_SIZE = 100000
+
+
+    def __init__(self, pcfg, root_symbol, verbose=False, beam_width=None, \
+            threshold=None, coarse_threshold=None, \
+            coarse_projection=default_projection, time_budget=None, \
+            edge_budget=None, cache=None, collect_stats=False, \
+            oov_distance=3):
+        """
+            CYK_Parser.__init__
+            
+            Parameters
+            ----------
+            pcfg: PCFG.
+                The grammar, in Chomsky normal form.
+            root_symbol: GSymbol.
+                The symbol expected over the whole sentence.
+            verbose=False: bool.
+                Optional. Prints the chart after each parse.
+            beam_width=None: int.
+                Optional. Keeps only the beam_width best non-terminals of
+                each cell (of the levels >= 1).
+            threshold=None: float.
+                Optional. Removes from each cell (of the levels >= 1) the
+                non-terminals whose log-probability is more than threshold
+                under the best one.
+            coarse_threshold=None: float.
+                Optional. Coarse-to-fine pruning: the sentence is first
+                parsed with a coarse grammar (the PCFG projected with
+                coarse_projection), and a non-terminal is kept in a cell
+                only if the posterior probability of its coarse category
+                over this span is above coarse_threshold.
+            coarse_projection=default_projection: function.
+                Optional. Maps a GSymbol and the SymbolTable of the PCFG to
+                the name of its coarse category.
+            time_budget=None: float.
+                Optional. Maximum time of a parse in seconds (see parse_tree
+                for what happens when it is spent).
+            edge_budget=None: int.
+                Optional. Maximum number of candidate derivations (pairs of
+                sub-derivations combined by the rules) of a parse, counted
+                in the same way by all the parsers.
+            cache=None: Parse_Cache.
+                Optional. Cache of the parses (see parse_tree), which can be
+                shared by several parsers.
+            collect_stats=False: bool.
+                Optional. Collects the counters and timers of each parse
+                (see parse_stats), and adds them to process_metrics().
+            oov_distance=3: int.
+                Optional. Maximum edit distance of the replacement of an
+                unknown word (0 skips all the unknown words).
+        """
         self._pcfg = pcfg
         self._root_symbol = root_symbol
         self.verbose = verbose
+        self._beam_width = beam_width
+        self._threshold = threshold
+        self._pruning_stats = {"pruned_cells": 0, "pruned_edges": 0, \
+            "fallback": False}
+        self._coarse_threshold = coarse_threshold
+        self._coarse_projection = coarse_projection
+        self._oov_distance = oov_distance
+        self._cache = cache
+        self._load_grammar()
+        
+        self._collect_stats = collect_stats
+        # Call_Stats of the last parse, if collected
+        self._stats = None
+        
+        self._time_budget = time_budget
+        self._edge_budget = edge_budget
+        # Beam of the second try when the budget is spent
+        self._degraded_beam_width = 10 if beam_width is None else \
+            max(1, beam_width // 4)
+        self._deadline = None
+        self._edge_limit = None
+        self._edges = 0
+        self._status = "failed"
     
     
-    def _recursive_string_construction(self, cyk_table, i, j, gsymb):
-        
-        # Get transition
-        gtrans = cyk_table[i][j][gsymb][0]
+    def __getstate__(self):
+        # The lexicon index stores string hashes, which are not the same in
+        # another process: it is rebuilt when needed
+        state = self.__dict__.copy()
+        state["_lexicon_index"] = None
+        return state
+    
+    
+    def _load_grammar(self):
+        """
+            CYK_Parser._load_grammar
+            Resets the structures derived from the grammar (compiled and
+            coarse grammars, index and replacements of the unknown words,
+            prefix of the cache keys): called on init, and before a parse
+            when the grammar was updated since (see PCFG.update).
+        """
+        self._pcfg_version = self._pcfg.version()
+        self._grammar = None
+        if self._coarse_threshold is not None:
+            self._coarse_grammar, self._coarse_map = \
+                self._compiled_grammar().project(self._coarse_projection, \
+                    self._pcfg.symbol_table())
+        # Built on the first unknown word
+        self._lexicon_index = None
+        # Replacements of the unknown words already resolved
+        self._oov_memo = LRU_Cache(self.OOV_MEMO_SIZE)
+        # Grammar and options part of the cache keys
+        self._cache_prefix = None
+    
+    
+    def _check_grammar(self):
+        # Reloads the grammar if it was updated since the last parse
+        if self._pcfg_version != self._pcfg.version():
+            self._load_grammar()
+    
+    
+    def _compiled_grammar(self):
+        """
+            CYK_Parser._compiled_grammar
+            Get the compiled PCFG (compiled on the first call).
+            
+            Returns
+            ----------
+            grammar: CompiledPCFG.
+        """
+        if self._grammar is None:
+            self._grammar = self._pcfg.compile()
+        return self._grammar
+    
+    
+    def _resolve_word(self, ts_init):
+        """
+            CYK_Parser._resolve_word
+            Maps an input word to a word of the lexicon. If the word is not
+            recognized, takes the word with shorter edit distance <=
+            oov_distance (3 by default) with highest frequency. Replacements
+            are memoized: each unknown word is looked up (and reported)
+            once.
+            
+            Parameters
+            ----------
+            ts_init: string.
+                The input word.
+            
+            Returns
+            ----------
+            ts: string or None.
+                The word of the lexicon to be used, or None if the word
+                should be skipped.
+        """
+        if ts_init in self._pcfg.lexicon().keys():
+            return ts_init
+        if self._stats is not None:
+            self._stats.count("oov_words")
+        # Memoized as (replacement,): the replacement can be None
+        memo = self._oov_memo.get(ts_init)
+        if memo is not None:
+            return memo[0]
+        if self._stats is not None:
+            start = time.perf_counter()
+            ts = self._replace_word(ts_init)
+            self._stats.add_time("oov", time.perf_counter() - start)
+        else:
+            ts = self._replace_word(ts_init)
+        self._oov_memo.put(ts_init, (ts,))
+        return ts
+    
+    
+    def _replace_word(self, ts_init):
+        """
+            CYK_Parser._replace_word
+            Looks for the replacement of an unknown word (see
+            _resolve_word).
+            
+            Parameters
+            ----------
+            ts_init: string.
+                The input word, out of the lexicon.
+            
+            Returns
+            ----------
+            ts: string or None.
+        """
+        #~ raise Exception("Unrecognized word:" + w)
+        print("Unrecognized word: " + ts_init + ". Looking for replacement...")
         
-        # If transition maps to a terminal, return the terminal
-        if gtrans.res_symb()[0].stype() == GSymbol.TERMINAL:
-            return str(gsymb) + " " + cyk_table[i][j][gsymb][2]
+        # Get the words in lexicon with smallest edit distance <=
+        # oov_distance
+        if self._lexicon_index is None:
+            self._lexicon_index = LexiconIndex(self._pcfg.lexicon().keys(), \
+                self._oov_distance)
+        k, replacement_words = self._lexicon_index.nearest(ts_init, \
+            self._oov_distance)
         
-        # If the current symbol is a X***, do not print it
-        if len(gsymb.ssymb()) > 1 and gsymb.ssymb()[0] == "X" and gsymb.ssymb()[1].isdigit():
-            return self._recursive_string_construction(cyk_table, \
-                    cyk_table[i][j][gsymb][2], \
-                    cyk_table[i][j][gsymb][3], \
-                    cyk_table[i][j][gsymb][0].res_symb()[0]) + ") (" + \
-                self._recursive_string_construction(cyk_table, \
-                    cyk_table[i][j][gsymb][4], \
-                    cyk_table[i][j][gsymb][5], \
-                    cyk_table[i][j][gsymb][0].res_symb()[1])
+        # Get replacement word with max frequency
+        if len(replacement_words) > 0:
+            ts = max(replacement_words, key=self._pcfg.get_frequency)
+            print("Replaced with word: " + ts + ", edit dist=", k)
+            return ts
         
-        # else, recursively get the transitions
-        return str(gsymb) + " (" + \
-            self._recursive_string_construction(cyk_table, \
-                cyk_table[i][j][gsymb][2], \
-                cyk_table[i][j][gsymb][3], \
-                cyk_table[i][j][gsymb][0].res_symb()[0]) + ") (" + \
-            self._recursive_string_construction(cyk_table, \
-                cyk_table[i][j][gsymb][4], \
-                cyk_table[i][j][gsymb][5], \
-                cyk_table[i][j][gsymb][0].res_symb()[1]) + ")"
+        print("Skip word")
+        return None
     
     
-    def parse(self, test_s):
+    def _tokens(self, test_s):
+        """
+            CYK_Parser._tokens
+            Splits a sentence in words, for the parse and for its cache key
+            (repeated, leading or trailing white spaces do not make empty
+            words).
+            
+            Parameters
+            ----------
+            test_s: string.
+                The sentence, words separated by white spaces.
+            
+            Returns
+            ----------
+            words: list(string).
+        """
+        return _SENTENCE_WORD.findall(test_s)
+    
+    
+    def _resolve_sentence(self, test_s):
+        """
+            CYK_Parser._resolve_sentence
+            Maps the words of a sentence to words of the lexicon, skipping
+            the ones without replacement.
+            
+            Parameters
+            ----------
+            test_s: string.
+                The sentence, words separated by white spaces.
+            
+            Returns
+            ----------
+            words: list(string).
+                The input words which are kept.
+            resolved: list(string).
+                The corresponding words of the lexicon.
+        """
+        words = []
+        resolved = []
+        for ts_init in self._tokens(test_s):
+            ts = self._resolve_word(ts_init)
+            if ts is not None:
+                words.append(ts_init)
+                resolved.append(ts)
+        return words, resolved
+    
+    
+    def _prune_cell(self, current_cell):
+        """
+            CYK_Parser._prune_cell
+            Removes from a cell the entries out of the beam (the beam_width
+            best ones) or below the threshold (more than threshold under the
+            best log-probability of the cell).
+            
+            Parameters
+            ----------
+            current_cell: dict(GSymbol: tuple).
+                The cell, pruned in place.
+        """
+        if self._beam_width is None and self._threshold is None:
+            return
+        if len(current_cell) == 0:
+            return
         
-        # Parse spaces in string
-        input_string = test_s.split(' ')
+        # Entries by decreasing log-probability (stable on ties)
+        ranked = sorted(current_cell.keys(), \
+            key=lambda gsymb: -current_cell[gsymb][1])
+        n_keep = len(ranked)
+        if self._threshold is not None:
+            min_log_proba = current_cell[ranked[0]][1] - self._threshold
+            while current_cell[ranked[n_keep-1]][1] < min_log_proba:
+                n_keep -= 1
+        if self._beam_width is not None:
+            n_keep = min(n_keep, self._beam_width)
         
-        n = len(input_string)
+        if n_keep < len(ranked):
+            for gsymb in ranked[n_keep:]:
+                del current_cell[gsymb]
+            self._pruning_stats["pruned_cells"] += 1
+            self._pruning_stats["pruned_edges"] += len(ranked) - n_keep
+    
+    
+    def _coarse_allowed(self, resolved):
+        """
+            CYK_Parser._coarse_allowed
+            Parses a sentence with the coarse grammar and gets the
+            non-terminals (compiled ids) allowed in each cell.
+            
+            Parameters
+            ----------
+            resolved: list(string).
+                The words of the lexicon.
+            
+            Returns
+            ----------
+            allowed: list(np.array((n-lev, n_nt), bool)) or None if the
+                sentence can not be parsed with the coarse grammar.
+        """
+        coarse_root = self._coarse_grammar.nt_id(self._root_symbol)
+        if coarse_root is None:
+            return None
+        posteriors = span_posteriors(self._coarse_grammar, \
+            [self._coarse_grammar.word_id(ts) for ts in resolved], \
+            coarse_root)
+        if posteriors is None:
+            return None
+        return [posterior[:, self._coarse_map] > self._coarse_threshold \
+            for posterior in posteriors]
+    
+    
+    def _mask_cell(self, current_cell, allowed):
+        """
+            CYK_Parser._mask_cell
+            Removes from a cell the non-terminals which are not allowed by
+            the coarse grammar.
             
+            Parameters
+            ----------
+            current_cell: dict(GSymbol: tuple).
+                The cell, pruned in place.
+            allowed: np.array(n_nt, bool).
+                Indexed by the ids of the compiled grammar.
+        """
+        pruned = [gsymb for gsymb in current_cell.keys() \
+            if not allowed[self._grammar.nt_id(gsymb)]]
+        if len(pruned) > 0:
+            for gsymb in pruned:
+                del current_cell[gsymb]
+            self._pruning_stats["pruned_cells"] += 1
+            self._pruning_stats["pruned_edges"] += len(pruned)
+    
+    
+    def _build_chart(self, words, resolved, prune, right_branching=False):
+        """
+            CYK_Parser._build_chart
+            Fills the CYK table of a sentence.
+            
+            Parameters
+            ----------
+            words: list(string).
+                The input words.
+            resolved: list(string).
+                The corresponding words of the lexicon.
+            prune: bool.
+                Prunes the cells (coarse-to-fine pruning of all the cells,
+                beam and threshold pruning of the levels >= 1).
+            right_branching=False: bool.
+                Optional. Only fills the cells of the right-branching
+                derivations (word k and words k+1..n-1 over words k..n-1).
+            
+            Returns
+            ----------
+            cyk_table: list(list(dict)).
+        """
+        n = len(words)
+        allowed = None
+        if prune and self._coarse_threshold is not None:
+            allowed = self._coarse_allowed(resolved)
         
         # Perform CYK
         # Build a table.
@@ -106,67 +805,39 @@ class CYK_Parser:
         # where logvalue is the log-probability of this non-terminal 
         # leading to this terminal.
         
+        stats = self._stats
+        if stats is not None:
+            stats.count("charts")
+            level_start = time.perf_counter()
+        
         cyk_table.append([])
         current_row = cyk_table[0]
         
-        i = 0
-        j = 0
-        while i < n:
-            
-            # Get terminal symbol
-            ts_init = input_string[j]
-            
-            skip_word = False
-            
-            # If the word is not recognize, take the word with shorter
-            # edit distance <= 2 with highest probability
-            if ts_init in self._pcfg.lexicon().keys():
-                ts = ts_init
-            else:
-                #~ raise Exception("Unrecognized word:" + w)
-                print("Unrecognized word: " + ts_init + ". Looking for replacement...")
-                
-                # Get a word in lexicon with edit distance < 3
-                max_edit_distance = 3
-                replacement_string_map = []
-                for z in range(max_edit_distance):
-                    replacement_string_map.append({})
-                for lexw in self._pcfg.lexicon().keys():
-                    current_edit_distance = edit_distance(ts_init, lexw)
-                    if current_edit_distance <= max_edit_distance:
-                        replacement_string_map[current_edit_distance-1][lexw] = self._pcfg.get_frequency(lexw)
-                k = 0
-                while k < max_edit_distance:
-                    if len(replacement_string_map[k]) > 0:
-                        break
-                    else:
-                        k += 1
-                
-                # Get replacement word with max frequency
-                if k < max_edit_distance and len(replacement_string_map[k]) > 0:
-                    ts = max(replacement_string_map[k], key=replacement_string_map[k].get)
-                    print("Replaced with word: " + ts + ", edit dist=", k+1)
-                else:
-                    print("Skip word")
-                    skip_word = True
-                    n -= 1
+        for i in range(n):
+            ts_init = words[i]
+            ts = resolved[i]
+            current_row.append({})
+            current_cell = current_row[i]
             
-            if not skip_word:
-                current_row.append({})
-                current_cell = current_row[i]
-                
-                # Add all {non-terminal: probability}
-                # Get non-terminals that lead to this terminal
-                for nts in self._pcfg.lexicon()[ts]:
-                    current_max_log_proba = -np.inf
-                    for trans, val in self._pcfg.root_to_trans(nts).items():
-                        if np.log(val) > current_max_log_proba and trans.res_symb()[0].ssymb() == ts:
-                            current_cell[nts] = (trans, np.log(val), ts_init)
-                            current_max_log_proba = np.log(val)
-                i += 1
-            j += 1
+            # Add all {non-terminal: probability}
+            # Get non-terminals that lead to this terminal
+            for nts in self._pcfg.lexicon()[ts]:
+                current_max_log_proba = -np.inf
+                for trans, val in self._pcfg.root_to_trans(nts).items():
+                    if np.log(val) > current_max_log_proba and trans.res_symb()[0].ssymb() == ts:
+                        current_cell[nts] = (trans, np.log(val), ts_init)
+                        current_max_log_proba = np.log(val)
+            if allowed is not None:
+                self._mask_cell(current_cell, allowed[0][i])
+        if stats is not None:
+            self._level_stats(0, level_start, n, 0, 0, \
+                sum(len(cell) for cell in cyk_table[0]))
+        self._spend(0, cyk_table)
         
         for lev in range(1, n):
+            if stats is not None:
+                level_start = time.perf_counter()
+                n_cells = n_pairs = n_rules = n_entries = 0
             # Level lev: on this row, all combinations:
             # [{GSymbol: (GTransition, logvalue, i, j, i', j'))}, \
             #        {GSymbol: (GTransition, logvalue, i, j, i', j'))}...]
@@ -178,13 +849,18 @@ class CYK_Parser:
             for k in range(n-lev):
                 current_row.append({})
                 current_cell = current_row[k]
+                if right_branching and k+lev < n-1:
+                    continue
+                n_edges = 0
                 # On k column, get the possible combinations to get a
                 # suitable substring
                 # Iterate over combinations
-                for i in range(lev):
+                for i in range(1 if right_branching else lev):
                     # Get all symbols on cell (i, k) and cell (lev-i-1, k+1+i)
                     candidate_symbols_1 = cyk_table[i][k].keys()
                     candidate_symbols_2 = cyk_table[lev-i-1][k+1+i].keys()
+                    n_edges += len(candidate_symbols_1) * \
+                        len(candidate_symbols_2)
                     if self.verbose:
                         print("cell1:", (i, k))
                         print("cell2:", (lev-i-1, k+1+i))
@@ -193,23 +869,720 @@ class CYK_Parser:
                             if self.verbose:
                                 print("for candidates", c1, c2, "found:", self._pcfg.res_to_trans((c1, c2)))
                             weight = cyk_table[i][k][c1][1] + cyk_table[lev-i-1][k+1+i][c2][1]
+                            transitions = self._pcfg.res_to_trans((c1, c2))
+                            if stats is not None:
+                                n_rules += len(transitions)
                             # Look for transitions
-                            for trans, value in self._pcfg.res_to_trans((c1, c2)).items():
+                            for trans, value in transitions.items():
                                 # Add combination or replace if probability is greater
                                 if trans.symb() not in current_cell.keys() or weight + np.log(value) > current_cell[trans.symb()][1]:
                                     current_cell[trans.symb()] = (trans, weight + np.log(value), i, k, lev-i-1, k+1+i)
+                if allowed is not None:
+                    self._mask_cell(current_cell, allowed[lev][k])
+                if prune:
+                    self._prune_cell(current_cell)
+                if stats is not None:
+                    n_cells += 1
+                    n_pairs += n_edges
+                    n_entries += len(current_cell)
+                self._spend(n_edges, cyk_table)
                 if self.verbose:            
                     print("\n")
+            if stats is not None:
+                self._level_stats(lev, level_start, n_cells, n_pairs, \
+                    n_rules, n_entries)
         
+        return cyk_table
+    
+    
+    def _level_stats(self, lev, level_start, n_cells, n_pairs, n_rules, \
+            n_entries):
+        """
+            CYK_Parser._level_stats
+            Adds the time and the counters of a complete chart level to the
+            stats of the parse.
+            
+            Parameters
+            ----------
+            lev: int.
+            level_start: float.
+                Time when the level was started (time.perf_counter()).
+            n_cells: int.
+                Number of cells filled.
+            n_pairs: int.
+                Number of pairs of sub-derivations tried.
+            n_rules: int.
+                Number of rules applied to these pairs.
+            n_entries: int.
+                Number of chart entries (non-terminals of the cells).
+        """
+        seconds = time.perf_counter() - level_start
+        self._stats.add_level_time(lev, seconds)
+        if lev == 0:
+            self._stats.add_time("lexical", seconds)
+        self._stats.count("cells", n_cells)
+        self._stats.count("pairs", n_pairs)
+        self._stats.count("rules", n_rules)
+        self._stats.count("chart_entries", n_entries)
+    
+    
+    def _chart_to_tree(self, cyk_table, words):
+        """
+            CYK_Parser._chart_to_tree
+            Builds the parse tree from a filled CYK table.
+            
+            Parameters
+            ----------
+            cyk_table: list(list(dict)).
+            words: list(string).
+                The input words.
+            
+            Returns
+            ----------
+            res: ParseTree or None.
+                The parse tree, or None if the root symbol could not be
+                built over the whole sentence.
+        """
+        n = len(words)
         if self.verbose:
             print("Unweighted CYK table:")
             for lev in range(n-1, -1, -1):
                 print([sorted(list(gsymb.keys())) for gsymb in cyk_table[lev]])
-        if self._root_symbol in cyk_table[n-1][0].keys():
-            if self.verbose:
-                print("Found " + str(self._root_symbol) + " in top level with logp=" + str(cyk_table[n-1][0][self._root_symbol][1]))
-            return "(" + self._recursive_string_construction(cyk_table, n-1, 0, self._root_symbol) + ")"
+        if self._root_symbol not in cyk_table[n-1][0].keys():
+            return None
+        if self.verbose:
+            print("Found " + str(self._root_symbol) + " in top level with logp=" + str(cyk_table[n-1][0][self._root_symbol][1]))
+        
+        return self._subtree(cyk_table, words, n-1, 0, self._root_symbol)
+    
+    
+    def _subtree(self, cyk_table, words, lev, k, gsymb):
+        """
+            CYK_Parser._subtree
+            Builds the tree of the best derivation of a symbol over a cell.
+            
+            Parameters
+            ----------
+            cyk_table: list(list(dict)).
+            words: list(string).
+                The input words.
+            lev, k: int.
+                The cell, covering the words k..k+lev.
+            gsymb: GSymbol.
+            
+            Returns
+            ----------
+            res: ParseTree.
+        """
+        # Nodes are (lev, k, GSymbol), the entries of the cells being
+        # (GTransition, logp, word) on the first level and
+        # (GTransition, logp, lev, k, lev', k') above
+        def expand(node):
+            entry = cyk_table[node[0]][node[1]][node[2]]
+            if node[0] == 0:
+                return node[2].ssymb(), None, None
+            res_symb = entry[0].res_symb()
+            return node[2].ssymb(), (entry[2], entry[3], res_symb[0]), \
+                (entry[4], entry[5], res_symb[1])
+        
+        return build_tree((lev, k, gsymb), expand, \
+            lambda node: cyk_table[0][node[1]][node[2]][2])
+    
+    
+    def _cell_entries(self, cyk_table, lev, k):
+        """
+            CYK_Parser._cell_entries
+            Get the symbols built over a cell of a (possibly partial) table.
+            
+            Parameters
+            ----------
+            cyk_table: list(list(dict)).
+            lev, k: int.
+            
+            Returns
+            ----------
+            res: list(tuple(float, string, GSymbol)).
+                The log-score, name and symbol of each entry.
+        """
+        if lev >= len(cyk_table) or k >= len(cyk_table[lev]):
+            return []
+        return [(entry[1], gsymb.ssymb(), gsymb) for gsymb, entry \
+            in cyk_table[lev][k].items()]
+    
+    
+    def _fragments_tree(self, chart, words):
+        """
+            CYK_Parser._fragments_tree
+            Builds a tree from the best fragments of a partial chart: the
+            fewest subtrees covering the sentence (then the best product of
+            their probabilities), under the root symbol. A word without any
+            symbol is a fragment by itself.
+            
+            Parameters
+            ----------
+            chart: object.
+                The partial chart, as built by _build_chart.
+            words: list(string).
+                The input words.
+            
+            Returns
+            ----------
+            res: ParseTree.
+        """
+        n = len(words)
+        # Best cover of the words 0..j-1: (fragments, bare words, -score),
+        # and its last fragment
+        best = [(0, 0, 0.0)] + [None] * n
+        last = [None] * (n+1)
+        for j in range(1, n+1):
+            for lev in range(j):
+                k = j-lev-1
+                if best[k] is None:
+                    continue
+                candidates = [(score, name, key) for score, name, key \
+                    in self._cell_entries(chart, lev, k) \
+                    if not is_binarization_symbol(name) and \
+                        (lev == 0 or not is_terminal_substitute(name))]
+                if len(candidates) == 0:
+                    if lev > 0:
+                        continue
+                    cost = (best[k][0]+1, best[k][1]+1, best[k][2])
+                    key = None
+                else:
+                    score, name, key = max(candidates, key=lambda c: c[0])
+                    cost = (best[k][0]+1, best[k][1], best[k][2]-score)
+                if best[j] is None or cost < best[j]:
+                    best[j] = cost
+                    last[j] = (lev, k, key)
+        
+        fragments = []
+        j = n
+        while j > 0:
+            lev, k, key = last[j]
+            tree = None
+            if key is not None:
+                tree = self._subtree(chart, words, lev, k, key)
+            # Bare word: no symbol, or a t[...] symbol
+            fragments.append(words[k] if tree is None else tree)
+            j = k
+        fragments.reverse()
+        return ParseTree(str(self._root_symbol), fragments)
+    
+    
+    def _set_budget(self, start, fraction):
+        """
+            CYK_Parser._set_budget
+            Sets the deadline and the maximum number of candidate
+            derivations of the next charts.
+            
+            Parameters
+            ----------
+            start: float.
+                Start time of the parse (time.perf_counter()).
+            fraction: float or None.
+                Fraction of the budgets given from the start of the parse,
+                None for no budget.
+        """
+        self._deadline = None
+        self._edge_limit = None
+        if fraction is None:
+            return
+        if self._time_budget is not None:
+            self._deadline = start + fraction * self._time_budget
+        if self._edge_budget is not None:
+            self._edge_limit = fraction * self._edge_budget
+    
+    
+    def _spend(self, n_edges, chart):
+        """
+            CYK_Parser._spend
+            Counts the candidate derivations of a complete cell, and stops
+            the chart if the budget is spent.
+            
+            Parameters
+            ----------
+            n_edges: int.
+            chart: object.
+                The chart built so far, passed to _Budget_Exceeded.
+        """
+        self._edges += n_edges
+        if self._edge_limit is not None and self._edges > self._edge_limit:
+            raise _Budget_Exceeded(chart)
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _Budget_Exceeded(chart)
+    
+    
+    def _prunes(self):
+        """
+            CYK_Parser._prunes
+            Tells if a pruning mode is set.
+            
+            Returns
+            ----------
+            res: bool.
+        """
+        return self._beam_width is not None or \
+            self._threshold is not None or self._coarse_threshold is not None
+    
+    
+    def pruning_stats(self):
+        """
+            CYK_Parser.pruning_stats
+            Get the pruning statistics of the last parse.
+            
+            Returns
+            ----------
+            stats: dict(string: int or bool).
+                "pruned_cells": number of cells in which entries were pruned,
+                "pruned_edges": number of pruned entries,
+                "fallback": True if the sentence was parsed again without
+                pruning as the root symbol was pruned.
+        """
+        return dict(self._pruning_stats)
+    
+    
+    def _cache_key(self, test_s):
+        """
+            CYK_Parser._cache_key
+            Get the key of a sentence in the parse cache: a digest of the
+            grammar fingerprint and of the options which change the parses,
+            followed by the words of the sentence (see _tokens) separated by
+            a single space.
+            
+            Parameters
+            ----------
+            test_s: string.
+                The sentence, words separated by white spaces.
+            
+            Returns
+            ----------
+            key: string.
+        """
+        if self._cache_prefix is None:
+            options = [type(self).__name__, self._pcfg.fingerprint(), \
+                self._root_symbol.ssymb(), repr(self._beam_width), \
+                repr(self._threshold), repr(self._coarse_threshold), \
+                repr(self._oov_distance)]
+            if self._coarse_threshold is not None:
+                options.append(self._coarse_projection.__module__ + "." + \
+                    self._coarse_projection.__qualname__)
+            self._cache_prefix = hashlib.sha1("\n".join(options).encode( \
+                "utf-8")).hexdigest()
+        return self._cache_prefix + " " + " ".join(self._tokens(test_s))
+    
+    
+    def cache_stats(self):
+        """
+            CYK_Parser.cache_stats
+            Get the counters of the parse cache and of the memoized
+            replacements of the unknown words.
+            
+            Returns
+            ----------
+            stats: dict(string: int).
+                The counters of Parse_Cache.stats (if the parser has a
+                cache), and "oov_hits", "oov_misses", "oov_evictions" and
+                "oov_size" for the unknown words.
+        """
+        stats = {} if self._cache is None else self._cache.stats()
+        for name, value in self._oov_memo.stats().items():
+            stats["oov_" + name] = value
+        return stats
+    
+    
+    def parse_tree(self, test_s):
+        """
+            CYK_Parser.parse_tree
+            Parses a tokenized sentence. With a beam width or a threshold,
+            the chart is pruned first, and the sentence is parsed again
+            without pruning if the root symbol is not found.
+            With a time or edge budget, the parse degrades when half of the
+            budget is spent: the sentence is parsed again with a tighter
+            beam within the rest of the budget, then the best
+            right-branching derivation is taken, and at last the best
+            fragments of the partial chart (see parse_status).
+            With a cache, the exact parses and the failures (not the
+            degraded parses) are cached, and a cached parse is returned
+            without looking up the words (nor pruning statistics).
+            
+            Parameters
+            ----------
+            test_s: string.
+                The sentence, words separated by a white space.
+            
+            Returns
+            ----------
+            res: ParseTree or None.
+                The parse tree (without the X*** and t[...] symbols of the
+                Chomsky normalization), or None if the root symbol could not
+                be built over the whole sentence.
+        """
+        if not self._collect_stats:
+            return self._parse_tree(test_s)
+        
+        self._stats = Call_Stats()
+        start = time.perf_counter()
+        try:
+            return self._parse_tree(test_s)
+        finally:
+            self._stats.add_time("total", time.perf_counter() - start)
+            process_metrics().record("parse", self._stats)
+    
+    
+    def _parse_tree(self, test_s):
+        """
+            CYK_Parser._parse_tree
+            Parses a tokenized sentence (see parse_tree).
+            
+            Parameters
+            ----------
+            test_s: string.
+                The sentence, words separated by a white space.
+            
+            Returns
+            ----------
+            res: ParseTree or None.
+        """
+        self._check_grammar()
+        self._pruning_stats = {"pruned_cells": 0, "pruned_edges": 0, \
+            "fallback": False}
+        self._status = "failed"
+        self._edges = 0
+        
+        key = None
+        if self._cache is not None:
+            key = self._cache_key(test_s)
+            cached = self._cache.get(key)
+            if cached is not None:
+                if self._stats is not None:
+                    self._stats.count("cache_hits")
+                tree_json, self._status = cached
+                if tree_json is None:
+                    print("Failed to parse with CYK.")
+                    return None
+                return ParseTree.from_json(tree_json)
+        
+        # Parse spaces in string
+        if self._stats is not None:
+            start = time.perf_counter()
+            words, resolved = self._resolve_sentence(test_s)
+            self._stats.add_time("resolve", time.perf_counter() - start)
+            self._stats.count("words", len(words))
         else:
+            words, resolved = self._resolve_sentence(test_s)
+        
+        res = None
+        degraded = False
+        if len(words) > 0:
+            start = time.perf_counter()
+            budget = self._time_budget is not None or \
+                self._edge_budget is not None
+            self._set_budget(start, 0.5 if budget else None)
+            try:
+                res = self._parse_chart(words, resolved)
+                self._status = "exact"
+            except _Budget_Exceeded as e:
+                degraded = True
+                res = self._degrade(words, resolved, start, e.chart)
+            finally:
+                self._set_budget(start, None)
+        
+        if res is None:
+            self._status = "failed"
+        if key is not None and not degraded:
+            self._cache.put(key, (None if res is None else res.to_json(), \
+                self._status))
+        if res is None:
             print("Failed to parse with CYK.")
-        return None
+        return res
+    
+    
+    def _parse_chart(self, words, resolved):
+        """
+            CYK_Parser._parse_chart
+            Parses the words of a sentence (with pruning, then without if
+            the root symbol was pruned).
+            
+            Parameters
+            ----------
+            words: list(string).
+                The input words.
+            resolved: list(string).
+                The corresponding words of the lexicon.
+            
+            Returns
+            ----------
+            res: ParseTree or None.
+        """
+        prune = self._prunes()
+        if self._stats is not None:
+            start = time.perf_counter()
+            chart = self._build_chart(words, resolved, prune)
+            self._stats.add_time("chart", time.perf_counter() - start)
+            start = time.perf_counter()
+            res = self._chart_to_tree(chart, words)
+            self._stats.add_time("tree", time.perf_counter() - start)
+        else:
+            res = self._chart_to_tree(self._build_chart(words, resolved, \
+                prune), words)
+        if res is None and self._pruning_stats["pruned_edges"] > 0:
+            if self.verbose:
+                print("Root pruned, parsing again without pruning.")
+            self._pruning_stats["fallback"] = True
+            res = self._chart_to_tree(self._build_chart(words, \
+                resolved, False), words)
+        return res
+    
+    
+    def _degrade(self, words, resolved, start, partial_chart):
+        """
+            CYK_Parser._degrade
+            Parses a sentence whose budget is spent (see parse_tree).
+            
+            Parameters
+            ----------
+            words: list(string).
+                The input words.
+            resolved: list(string).
+                The corresponding words of the lexicon.
+            start: float.
+                Start time of the parse (time.perf_counter()).
+            partial_chart: object.
+                The chart of the first try, when its budget was spent.
+            
+            Returns
+            ----------
+            res: ParseTree or None.
+        """
+        if self.verbose:
+            print("Budget exceeded, parsing again with a tighter beam.")
+        beam_width = self._beam_width
+        self._beam_width = self._degraded_beam_width
+        self._set_budget(start, 1.0)
+        try:
+            res = self._chart_to_tree(self._build_chart(words, resolved, \
+                True), words)
+            if res is not None:
+                self._status = "beam"
+                return res
+        except _Budget_Exceeded:
+            pass
+        finally:
+            self._beam_width = beam_width
+            self._set_budget(start, None)
+        
+        res = self._right_branching_tree(words, resolved)
+        if res is not None:
+            self._status = "right_branching"
+            return res
         
+        self._status = "fragments"
+        return self._fragments_tree(partial_chart, words)
+    
+    
+    def _right_branching_tree(self, words, resolved):
+        """
+            CYK_Parser._right_branching_tree
+            Builds the best right-branching derivation of a sentence (each
+            span k..n-1 split in the word k and the span k+1..n-1), in
+            linear time in the number of words.
+            
+            Parameters
+            ----------
+            words: list(string).
+                The input words.
+            resolved: list(string).
+                The corresponding words of the lexicon.
+            
+            Returns
+            ----------
+            res: ParseTree or None.
+                None if the grammar has no such derivation.
+        """
+        return self._chart_to_tree(self._build_chart(words, resolved, False, \
+            right_branching=True), words)
+    
+    
+    def parse_stats(self):
+        """
+            CYK_Parser.parse_stats
+            Get the counters and timers of the last parse (with
+            collect_stats=True):
+                counters "words", "oov_words" (out of the lexicon),
+                "charts" (charts built: 2 after a fallback or a degraded
+                parse), "cells" (filled), "pairs" (pairs of
+                sub-derivations tried), "rules" (rules applied, times the
+                split points for Vectorized_CYK_Parser),
+                "chart_entries" (non-terminals of the cells, after
+                pruning), "cache_hits";
+                timers "total", "resolve" (lookup of the words), "oov"
+                (replacement of the unknown words), "lexical" (first
+                chart level), "chart" (first chart), "tree" (tree of the
+                first chart);
+                the time spent on each chart level.
+            
+            Returns
+            ----------
+            stats: Call_Stats or None.
+                None if the stats are not collected.
+        """
+        return self._stats
+    
+    
+    def parse_status(self):
+        """
+            CYK_Parser.parse_status
+            Get how the last parse was found.
+            
+            Returns
+            ----------
+            status: string.
+                "exact": within the budget (or without budget),
+                "beam": with a tighter beam, after the first half of the
+                budget was spent,
+                "right_branching": best right-branching derivation, after
+                the whole budget was spent,
+                "fragments": best fragments of the partial chart (no
+                right-branching derivation),
+                "failed": no parse.
+        """
+        return self._status
+    
+    
+    def parse(self, test_s):
+        """
+            CYK_Parser.parse
+            Parses a tokenized sentence (see parse_tree).
+            
+            Parameters
+            ----------
+            test_s: string.
+                The sentence, words separated by a white space.
+            
+            Returns
+            ----------
+            res: string or None.
+                The bracketed parse, or None if the root symbol could not be
+                built over the whole sentence.
+        """
+        tree = self.parse_tree(test_s)
+        if tree is None:
+            return None
+        return tree.to_bracketed()
+    
+    
+    def span_posteriors(self, sentences, batch_size=32, \
+            max_memory=256 * 2**20):
+        """
+            CYK_Parser.span_posteriors
+            Computes with the inside-outside algorithm the posterior
+            probability of each non-terminal over each span of sentences
+            (on the compiled grammar, as Vectorized_CYK_Parser). Sentences
+            of the same length are processed in batches, a batch of
+            sentences of n words taking 2 * 8 * batch * n * (n+1) / 2 *
+            n_nt bytes (see inside_outside.batch_span_posteriors).
+            
+            Parameters
+            ----------
+            sentences: iterable(string).
+                Tokenized sentences, words separated by a white space.
+            batch_size=32: int.
+                Optional. Maximum number of sentences processed at once.
+            max_memory=256 * 2**20: int.
+                Optional. Maximum size in bytes of the arrays of a batch,
+                the batches being made smaller if needed.
+            
+            Returns
+            ----------
+            res: list(tuple).
+                For each sentence, (words, posteriors) with words the input
+                words which are kept, and posteriors the dense
+                np.array((n_spans, n_nt)) of the posteriors, or None if the
+                sentence can not be parsed. The rows are the spans given by
+                span_bounds(len(words)), the columns the non-terminals of
+                the compiled grammar.
+        """
+        self._check_grammar()
+        grammar = self._compiled_grammar()
+        root = grammar.nt_id(self._root_symbol)
+        sentences_words = []
+        sentences_word_ids = []
+        for test_s in sentences:
+            words, resolved = self._resolve_sentence(test_s)
+            sentences_words.append(words)
+            sentences_word_ids.append([grammar.word_id(ts) \
+                for ts in resolved])
+        if root is None:
+            return [(words, None) for words in sentences_words]
+        posteriors = batch_span_posteriors(grammar, sentences_word_ids, \
+            root, batch_size, max_memory)
+        return list(zip(sentences_words, posteriors))
+    
+    
+    def parse_many(self, sentences, workers=1, chunksize=1):
+        """
+            CYK_Parser.parse_many
+            Parses many sentences, possibly in a pool of worker processes.
+            The parser (and its grammar) is sent once to each worker: it is
+            inherited when processes are forked, else it is pickled once per
+            worker, never per sentence.
+            
+            Parameters
+            ----------
+            sentences: iterable(string).
+                Tokenized sentences, words separated by a white space.
+            workers=1: int.
+                Optional. Number of worker processes (1 parses in the
+                current process).
+            chunksize=1: int.
+                Optional. Number of sentences sent at once to a worker.
+            
+            Returns
+            ----------
+            res: list(string or None).
+                The parses, in the order of the input sentences.
+        """
+        return self.map_pool(_parse_with, sentences, workers, chunksize)
+    
+    
+    def map_pool(self, function, items, workers=1, chunksize=1):
+        """
+            CYK_Parser.map_pool
+            Calls function(parser, item) on many items, possibly in a pool
+            of worker processes, each with a copy of the parser (sent once
+            to each worker, as in parse_many).
+            
+            Parameters
+            ----------
+            function: function(CYK_Parser, object) -> object.
+                A function of a module (which can be pickled).
+            items: iterable(object).
+            workers=1: int.
+                Optional. Number of worker processes (1 calls function in
+                the current process).
+            chunksize=1: int.
+                Optional. Number of items sent at once to a worker.
+            
+            Returns
+            ----------
+            res: list(object).
+                The results, in the order of the items.
+        """
+        if workers <= 1:
+            return [function(self, item) for item in items]
+        
+        global _pool_parser
+        if "fork" in multiprocessing.get_all_start_methods():
+            # Workers inherit the parser from the parent process
+            _pool_parser = self
+            ctx = multiprocessing.get_context("fork")
+            pool = ctx.Pool(workers)
+        else:
+            pool = multiprocessing.Pool(workers, _init_pool_parser, (self,))
+        try:
+            return list(pool.imap(_pool_call, ((function, item) \
+                for item in items), chunksize))
+        finally:
+            pool.close()
+            pool.join()
+            _pool_parser = None
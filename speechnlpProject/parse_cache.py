@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Caches of the parsers: a bounded LRU map, and the cache of the parses of
+sentences, in memory with an optional on-disk tier (SQLite file) which is
+shared by the processes and kept between runs.
+"""
+
+
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+
+
+class LRU_Cache:
+    """
+        LRU_Cache
+        Bounded map evicting the least recently used entries, with hit,
+        miss and eviction counters.
+    """
+
+
+    def __init__(self, max_size):
+        """
+            LRU_Cache.__init__
+
+            Parameters
+            ----------
+            max_size: int.
+                Maximum number of entries.
+        """
+        if max_size < 1:
+            raise Exception("The size of a cache must be positive")
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+    def get(self, key, default=None):
+        """
+            LRU_Cache.get
+            Get the value of a key, which becomes the most recently used.
+
+            Parameters
+            ----------
+            key: hashable.
+            default=None: object.
+                Optional. Returned if the key is not in the cache.
+
+            Returns
+            ----------
+            value: object.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self._stats["misses"] += 1
+            return default
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return value
+
+
+    def put(self, key, value):
+        """
+            LRU_Cache.put
+            Sets the value of a key, evicting the least recently used entry
+            if the cache is full.
+
+            Parameters
+            ----------
+            key: hashable.
+            value: object.
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+
+    def stats(self):
+        """
+            LRU_Cache.stats
+            Get the counters.
+
+            Returns
+            ----------
+            stats: dict(string: int).
+                "hits", "misses", "evictions" and "size".
+        """
+        stats = dict(self._stats)
+        stats["size"] = len(self._entries)
+        return stats
+
+
+class Parse_Cache:
+    """
+        Parse_Cache
+        Cache of the parses of sentences (bracketed JSON tree and status),
+        keyed by strings built by the parsers from the tokens of the
+        sentence, the grammar fingerprint and the parser options. The
+        memory tier is an LRU_Cache; the entries missing from it are looked
+        up in the disk tier, if any, and every new entry is written to both.
+    """
+
+
+    def __init__(self, max_size=10000, path=None):
+        """
+            Parse_Cache.__init__
+
+            Parameters
+            ----------
+            max_size=10000: int.
+                Optional. Maximum number of parses kept in memory.
+            path=None: string.
+                Optional. SQLite file of the disk tier (created if needed),
+                None for a memory-only cache.
+        """
+        self._memory = LRU_Cache(max_size)
+        self._path = path
+        self._db = None
+        self._db_pid = None
+        self._disk_stats = {"disk_hits": 0, "disk_misses": 0}
+
+
+    def __getstate__(self):
+        # SQLite connections are opened again by each process
+        state = self.__dict__.copy()
+        state["_db"] = None
+        state["_db_pid"] = None
+        return state
+
+
+    def _connection(self):
+        # The connection of the current process (a forked process does not
+        # use the connection of its parent)
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self._path, timeout=30.0)
+            self._db.execute("CREATE TABLE IF NOT EXISTS parses " \
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+
+    def get(self, key):
+        """
+            Parse_Cache.get
+            Get the cached parse of a key.
+
+            Parameters
+            ----------
+            key: string.
+
+            Returns
+            ----------
+            value: tuple(string or None, string) or None.
+                The JSON of the tree (None if the sentence could not be
+                parsed) and the status of the parse, or None if the key is
+                not cached.
+        """
+        value = self._memory.get(key)
+        if value is not None or self._path is None:
+            return value
+
+        row = self._connection().execute( \
+            "SELECT value FROM parses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._disk_stats["disk_misses"] += 1
+            return None
+        self._disk_stats["disk_hits"] += 1
+        value = tuple(json.loads(row[0]))
+        self._memory.put(key, value)
+        return value
+
+
+    def put(self, key, value):
+        """
+            Parse_Cache.put
+            Caches the parse of a key.
+
+            Parameters
+            ----------
+            key: string.
+            value: tuple(string or None, string).
+                The JSON of the tree (None if the sentence could not be
+                parsed) and the status of the parse.
+        """
+        self._memory.put(key, value)
+        if self._path is not None:
+            db = self._connection()
+            db.execute("INSERT OR REPLACE INTO parses VALUES (?, ?)", \
+                (key, json.dumps(list(value), ensure_ascii=False)))
+            db.commit()
+
+
+    def stats(self):
+        """
+            Parse_Cache.stats
+            Get the counters of the cache.
+
+            Returns
+            ----------
+            stats: dict(string: int).
+                "hits", "misses", "evictions" and "size" of the memory
+                tier, "disk_hits" and "disk_misses" of the disk tier.
+        """
+        stats = self._memory.stats()
+        stats.update(self._disk_stats)
+        return stats
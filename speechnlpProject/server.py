@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Parser service: an asyncio server which keeps a parser (and its grammar) in
+memory and parses the requests of its clients in a pool of worker
+processes. The requests received within a short delay are grouped in
+batches, each batch being parsed by one worker. The deadline of each request
+is sent with it: the worker parses it within the time left (see the
+time_budget of CYK_Parser), skips it if its deadline has passed, and sends
+back each parse as soon as it is done.
+Requests and responses are JSON objects, one per line:
+    {"id": 0, "sentence": "la sécurité", "timeout": 10.0}
+    {"id": 0, "parse": "(SENT (DET la) (NC sécurité))", "status": "exact"}
+    {"id": 0, "error": "timeout"}
+The responses of a connection are sent in the order of its requests.
+"""
+
+
+from speechnlpProject.parse import _init_pool_parser, _pool_parse_batch
+from speechnlpProject.client import parse_address
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+
+def _pool_ready():
+    return True
+
+
+class Parser_Server:
+    """
+        Parser_Server
+        Serves the parses of a parser over a Unix socket or a TCP port.
+    """
+
+
+    def __init__(self, parser, workers=1, batch_size=8, batch_delay=0.005, \
+            timeout=60.0):
+        """
+            Parser_Server.__init__
+            Starts the worker processes, each with a copy of the parser
+            (inherited when processes are forked, else pickled once per
+            worker).
+
+            Parameters
+            ----------
+            parser: CYK_Parser.
+            workers=1: int.
+                Optional. Number of worker processes.
+            batch_size=8: int.
+                Optional. Maximum number of sentences parsed at once by a
+                worker.
+            batch_delay=0.005: float.
+                Optional. Time in seconds to wait for other requests before
+                sending an incomplete batch.
+            timeout=60.0: float.
+                Optional. Default timeout of a request in seconds (None for
+                no timeout).
+        """
+        self._batch_size = batch_size
+        self._batch_delay = batch_delay
+        self._timeout = timeout
+        if "fork" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("fork")
+        else:
+            ctx = multiprocessing.get_context()
+        # The workers send each parse on this queue, read by a thread
+        self._results = ctx.Queue()
+        self._executor = concurrent.futures.ProcessPoolExecutor( \
+            max(workers, 1), mp_context=ctx, initializer=_init_pool_parser, \
+            initargs=(parser, self._results))
+        # Start the workers now, before any event loop thread exists
+        for future in [self._executor.submit(_pool_ready) \
+                for i in range(max(workers, 1))]:
+            future.result()
+
+        self._queue = None
+        # Futures of the requests being parsed, by key
+        self._pending = {}
+        self._keys = itertools.count()
+        self._stats = {"requests": 0, "batches": 0, "timeouts": 0, \
+            "errors": 0}
+
+
+    def stats(self):
+        """
+            Parser_Server.stats
+            Get the number of requests, batches, timed out and failed
+            requests since the server was built.
+
+            Returns
+            ----------
+            stats: dict(string: int).
+        """
+        return dict(self._stats)
+
+
+    async def _batcher(self):
+        # Groups the pending requests in batches and sends them to the pool
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._batch_delay
+            while len(batch) < self._batch_size:
+                delay = deadline - loop.time()
+                if delay <= 0:
+                    if self._queue.empty():
+                        break
+                    batch.append(self._queue.get_nowait())
+                    continue
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), \
+                        delay))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests which timed out while waiting are not parsed
+            batch = [request for request in batch \
+                if request[0] in self._pending.keys()]
+            if len(batch) > 0:
+                self._stats["batches"] += 1
+                asyncio.ensure_future(self._parse_batch(batch))
+
+
+    async def _parse_batch(self, batch):
+        # The parses usually come first from the results queue
+        loop = asyncio.get_running_loop()
+        try:
+            res = await loop.run_in_executor(self._executor, \
+                _pool_parse_batch, batch)
+        except Exception as e:
+            for key, test_s, deadline in batch:
+                future = self._pending.get(key)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        for (key, test_s, deadline), result in zip(batch, res):
+            self._set_result(key, result)
+
+
+    def _set_result(self, key, result):
+        # A request skipped by the worker is left to its own timeout
+        future = self._pending.get(key)
+        if future is not None and not future.done() and \
+                result[1] != "timeout":
+            future.set_result(result)
+
+
+    def _read_results(self, loop):
+        # Thread reading the results queue until a None key
+        while True:
+            key, result = self._results.get()
+            if key is None:
+                return
+            loop.call_soon_threadsafe(self._set_result, key, result)
+
+
+    async def _request(self, line):
+        # Parses a request line and gets its response
+        try:
+            request = json.loads(line.decode("utf-8"))
+            test_s = request["sentence"]
+            if not isinstance(test_s, str):
+                raise Exception("sentence is not a string")
+        except Exception as e:
+            self._stats["errors"] += 1
+            return {"id": None, "error": "invalid request: " + str(e)}
+
+        self._stats["requests"] += 1
+        request_id = request.get("id")
+        timeout = request.get("timeout", self._timeout)
+        future = asyncio.get_running_loop().create_future()
+        key = next(self._keys)
+        self._pending[key] = future
+        self._queue.put_nowait((key, test_s, None if timeout is None \
+            else time.time() + timeout))
+        try:
+            # On timeout the request is no longer pending, hence never
+            # parsed if it is still queued, and its worker stops parsing it
+            # at its deadline
+            parse, status = await asyncio.wait_for(future, timeout)
+            return {"id": request_id, "parse": parse, "status": status}
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            return {"id": request_id, "error": "timeout"}
+        except Exception as e:
+            self._stats["errors"] += 1
+            return {"id": request_id, "error": repr(e)}
+        finally:
+            del self._pending[key]
+
+
+    async def _respond(self, responses, writer):
+        # Writes the responses of a connection in the order of its requests
+        while True:
+            task = await responses.get()
+            if task is None:
+                return
+            response = await task
+            writer.write(json.dumps(response, ensure_ascii=False).encode( \
+                "utf-8") + b"\n")
+            await writer.drain()
+
+
+    async def _handle(self, reader, writer):
+        responses = asyncio.Queue()
+        respond = asyncio.ensure_future(self._respond(responses, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip() == b"":
+                    continue
+                responses.put_nowait(asyncio.ensure_future( \
+                    self._request(line)))
+        finally:
+            responses.put_nowait(None)
+            try:
+                await respond
+            except ConnectionError:
+                pass
+            finally:
+                # Also when the server is stopped
+                writer.close()
+
+
+    async def serve(self, address, ready=None):
+        """
+            Parser_Server.serve
+            Serves the requests until cancelled.
+
+            Parameters
+            ----------
+            address: string.
+                "HOST:PORT" or the path of a Unix socket.
+            ready=None: function().
+                Optional. Called once the server listens.
+        """
+        self._queue = asyncio.Queue()
+        path, host, port = parse_address(address)
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            server = await asyncio.start_unix_server(self._handle, path)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+        batcher = asyncio.ensure_future(self._batcher())
+        reader = threading.Thread(target=self._read_results, \
+            args=(asyncio.get_running_loop(),), daemon=True)
+        reader.start()
+        try:
+            async with server:
+                if ready is not None:
+                    ready()
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._results.put((None, None))
+            reader.join()
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+
+    def run(self, address):
+        """
+            Parser_Server.run
+            Serves the requests until interrupted (Ctrl-C), then stops the
+            worker processes.
+
+            Parameters
+            ----------
+            address: string.
+                "HOST:PORT" or the path of a Unix socket.
+        """
+        try:
+            asyncio.run(self.serve(address, \
+                lambda: print("Listening on " + address, flush=True)))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+
+    def close(self):
+        """
+            Parser_Server.close
+            Stops the worker processes (the parses in progress are
+            finished, the queued ones cancelled).
+        """
+        self._executor.shutdown(cancel_futures=True)
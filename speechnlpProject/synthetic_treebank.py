@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic treebanks in the bracketed format of the Sequoia corpus, e.g.
+    ( (SENT (NP-SUJ (DET la) (NC maison)) (VN (V voit)) (PONCT .)))
+generated from a small French-like phrase structure with random pseudo-words
+(Zipf distributed), to train and benchmark the parsers without the corpus.
+"""
+
+
+from speechnlpProject.grammar import read_tree, tree_tokens
+import random
+
+
+# Expansions of the phrases: the first one is the shallowest, and is the
+# only one used from the maximum depth. Function tags (-SUJ, -OBJ) are kept in the
+# output, as in the corpus
+_PHRASES = {
+    "SENT": [["NP-SUJ", "VN"], ["NP-SUJ", "VN", "NP-OBJ"], \
+        ["NP-SUJ", "VN", "PP"], ["VN", "NP-OBJ"], ["NP-SUJ", "VN", "AP"], \
+        ["NP"]],
+    "Sint": [["VN"], ["VN", "NP-OBJ"], ["NP-SUJ", "VN", "NP-OBJ"]],
+    "Ssub": [["CS", "CLS", "V"], ["CS", "NP-SUJ", "VN"], \
+        ["CS", "NP-SUJ", "VN", "NP-OBJ"]],
+    "NP": [["DET", "NC"], ["NPP"], ["PRO"], ["DET", "NC", "AP"], \
+        ["DET", "ADJ", "NC"], ["DET", "NC", "PP"]],
+    "VN": [["V"], ["CLS", "V"], ["ADV", "V"], ["CLS", "ADV", "V"]],
+    "PP": [["P", "NPP"], ["P", "NP"]],
+    "AP": [["ADJ"], ["ADV", "ADJ"]],
+}
+
+# Optional modifiers appended to a phrase while its branching allows it
+_MODIFIERS = {
+    "SENT": ["PP", "Ssub"],
+    "Sint": ["PP"],
+    "Ssub": ["PP"],
+    "NP": ["AP", "PP"],
+    "AP": ["PP"],
+}
+
+# Closed classes: fixed number of words. Open classes: share of the
+# vocabulary
+_CLOSED_CLASSES = {"DET": 8, "P": 10, "CC": 3, "CS": 4, "CLS": 6, "PRO": 8}
+_OPEN_CLASSES = {"NC": 0.4, "V": 0.25, "ADJ": 0.15, "NPP": 0.1, "ADV": 0.1}
+
+_LETTERS = "abcdefghijklmnopqrstuvwxyzéè"
+
+
+class Treebank_Generator:
+    """
+        Treebank_Generator
+        Generates random trees, sentences and unknown words, reproducibly
+        from a seed.
+    """
+
+
+    def __init__(self, max_depth=4, max_branching=3, vocabulary_size=1000, \
+            seed=0):
+        """
+            Treebank_Generator.__init__
+
+            Parameters
+            ----------
+            max_depth=4: int.
+                Optional. Depth from which the phrases of a clause take
+                their shallowest expansion, without modifiers.
+            max_branching=3: int.
+                Optional. Maximum number of children of a phrase (more
+                children if its expansion needs them).
+            vocabulary_size=1000: int.
+                Optional. Number of words of the open classes (nouns, verbs,
+                adjectives, proper nouns, adverbs).
+            seed=0: int.
+                Optional. Seed of the random generator.
+        """
+        if max_depth < 1:
+            raise Exception("The maximum depth must be positive")
+        self._max_depth = max_depth
+        self._max_branching = max_branching
+        self._rng = random.Random(seed)
+
+        # Distinct pseudo-words, by tag, most frequent first
+        used = set()
+        self._words = {}
+        for tag, n_words in _CLOSED_CLASSES.items():
+            self._words[tag] = self._new_words(n_words, 1, 4, used)
+        for tag, share in _OPEN_CLASSES.items():
+            self._words[tag] = self._new_words( \
+                max(1, int(vocabulary_size * share)), 3, 10, used)
+        self._words["PONCT"] = [".", ",", ";"]
+        self._vocabulary = used
+        self._weights = dict((tag, [1.0 / (rank+1) \
+            for rank in range(len(words))]) \
+            for tag, words in self._words.items())
+
+
+    def _new_words(self, n_words, min_length, max_length, used):
+        # Random strings which are not in used (updated)
+        res = []
+        while len(res) < n_words:
+            word = "".join(self._rng.choice(_LETTERS) for i in \
+                range(self._rng.randint(min_length, max_length)))
+            if word not in used:
+                used.add(word)
+                res.append(word)
+        return res
+
+
+    def vocabulary(self):
+        """
+            Treebank_Generator.vocabulary
+            Get the words which can be generated.
+
+            Returns
+            ----------
+            res: set(string).
+        """
+        return set(self._vocabulary)
+
+
+    def _word(self, tag):
+        # Zipf distributed word of a tag
+        return self._rng.choices(self._words[tag], self._weights[tag])[0]
+
+
+    def _phrase(self, label, depth):
+        """
+            Treebank_Generator._phrase
+            Generates a phrase.
+
+            Parameters
+            ----------
+            label: string.
+                Label of the phrase, possibly with a function tag.
+            depth: int.
+                Depth of the phrase (1 for the root of a clause).
+
+            Returns
+            ----------
+            res: tuple.
+                (label, word) for a pre-terminal, (label, list(children))
+                otherwise.
+        """
+        category = label.split("-", 1)[0]
+        if category not in _PHRASES:
+            return (label, self._word(category))
+        expansions = _PHRASES[category]
+        if depth >= self._max_depth:
+            children = list(expansions[0])
+        else:
+            children = list(self._rng.choice(expansions))
+            for modifier in _MODIFIERS.get(category, []):
+                if len(children) < self._max_branching and \
+                        self._rng.random() < 0.25:
+                    children.append(modifier)
+        return (label, [self._phrase(child, depth+1) for child in children])
+
+
+    def tree(self, min_words=0):
+        """
+            Treebank_Generator.tree
+            Generates a tree, with coordinated clauses until it has at least
+            min_words words (and then one more with probability 0.15).
+
+            Parameters
+            ----------
+            min_words=0: int.
+                Optional. Minimum number of words.
+
+            Returns
+            ----------
+            res: string.
+                The bracketed tree, e.g.
+                ( (SENT (NP-SUJ (DET la) (NC maison)) (VN (V voit)))).
+        """
+        clauses = [self._phrase("SENT", 1)]
+        n_words = _count_words(clauses[0])
+        while n_words < min_words or self._rng.random() < 0.15:
+            clauses.append(self._phrase("Sint", 1))
+            n_words += _count_words(clauses[-1]) + 1
+
+        # Each clause is coordinated with the next one, from the last
+        clause = clauses[-1]
+        for i in range(len(clauses)-2, -1, -1):
+            label, children = clauses[i]
+            clause = (label, children + [("COORD", [("CC", \
+                self._word("CC")), clause])])
+        label, children = clause
+        if self._rng.random() < 0.8:
+            clause = (label, children + [("PONCT", \
+                "." if self._rng.random() < 0.8 else ";")])
+        return "( " + _bracketed(clause) + ")"
+
+
+    def treebank(self, n_sentences):
+        """
+            Treebank_Generator.treebank
+            Generates a treebank.
+
+            Parameters
+            ----------
+            n_sentences: int.
+
+            Returns
+            ----------
+            res: list(string).
+                The bracketed trees, one per sentence.
+        """
+        return [self.tree() for i in range(n_sentences)]
+
+
+    def sentence(self, length, max_tries=1000):
+        """
+            Treebank_Generator.sentence
+            Generates a tokenized sentence of a given number of words: the
+            words of a generated tree of this length (or of the closest
+            length found in max_tries trees).
+
+            Parameters
+            ----------
+            length: int.
+            max_tries=1000: int.
+                Optional. Maximum number of generated trees.
+
+            Returns
+            ----------
+            res: string.
+                Words separated by a white space.
+        """
+        res = None
+        for i in range(max_tries):
+            tokens = tree_tokens(read_tree(self.tree(length - 2)))
+            if res is None or abs(len(tokens) - length) < \
+                    abs(len(res) - length):
+                res = tokens
+            if len(res) == length:
+                break
+        return " ".join(res)
+
+
+    def unknown_word(self):
+        """
+            Treebank_Generator.unknown_word
+            Generates a word out of the vocabulary: a word of the
+            vocabulary with 1 to 3 random edits (which can have replacements
+            within an edit distance of 3), or with probability 0.2 a new
+            random word (which usually has none).
+
+            Returns
+            ----------
+            res: string.
+        """
+        while True:
+            if self._rng.random() < 0.2:
+                word = "".join(self._rng.choice(_LETTERS) for i in \
+                    range(self._rng.randint(8, 14)))
+            else:
+                word = list(self._word(self._rng.choice(list(_OPEN_CLASSES))))
+                for i in range(self._rng.randint(1, 3)):
+                    position = self._rng.randrange(len(word) + 1)
+                    edit = self._rng.random()
+                    if edit < 1/3 or len(word) < 2:
+                        word.insert(position, self._rng.choice(_LETTERS))
+                    elif edit < 2/3:
+                        del word[min(position, len(word)-1)]
+                    else:
+                        word[min(position, len(word)-1)] = \
+                            self._rng.choice(_LETTERS)
+                word = "".join(word)
+            if word not in self._vocabulary:
+                return word
+
+
+def _count_words(node):
+    # Number of words of a generated phrase (bounded depth)
+    label, children = node
+    if isinstance(children, str):
+        return 1
+    return sum(_count_words(child) for child in children)
+
+
+def _bracketed(node):
+    # Bracketed string of a generated tree, without recursion: the chains
+    # of coordinated clauses can be long
+    parts = []
+    stack = [node]
+    while len(stack) > 0:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        label, children = item
+        if isinstance(children, str):
+            parts.append("(" + label + " " + children + ")")
+            continue
+        parts.append("(" + label)
+        stack.append(")")
+        for child in reversed(children):
+            stack.append(child)
+            stack.append(" ")
+    return "".join(parts)
+
@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+"""
+Parse trees returned by the parsers, and their serializers. Trees are built
+from the backpointers of a chart without recursion (the binarized chains
+X*** can be as deep as the sentence is long), and every traversal uses an
+explicit stack.
+"""
+
+
+import json
+
+
+def is_binarization_symbol(ssymb):
+    """
+        is_binarization_symbol
+        Tells if a non-terminal is an intermediate symbol X*** created by
+        the Chomsky normalization.
+
+        Parameters
+        ----------
+        ssymb: string.
+
+        Returns
+        ----------
+        res: bool.
+    """
+    return len(ssymb) > 1 and ssymb[0] == "X" and ssymb[1].isdigit()
+
+
+def is_terminal_substitute(ssymb):
+    """
+        is_terminal_substitute
+        Tells if a non-terminal is a symbol t[...] substituted to a terminal
+        of a long rule by the Chomsky normalization.
+
+        Parameters
+        ----------
+        ssymb: string.
+
+        Returns
+        ----------
+        res: bool.
+    """
+    return ssymb.startswith("t[") and ssymb.endswith("]")
+
+
+class ParseTree:
+    """
+        ParseTree
+        A node of a parse tree: a label and a list of children, which are
+        ParseTree or words (string). A preterminal has a single word child.
+    """
+
+    __slots__ = ("_label", "_children")
+
+
+    def __init__(self, label, children=None):
+        """
+            ParseTree.__init__
+
+            Parameters
+            ----------
+            label: string.
+            children=None: list(ParseTree or string).
+                Optional. Empty by default.
+        """
+        self._label = label
+        self._children = [] if children is None else children
+
+
+    def __eq__(self, tree):
+        if not isinstance(tree, ParseTree):
+            return False
+        return self.to_bracketed() == tree.to_bracketed()
+
+
+    def __repr__(self):
+        """
+            ParseTree.__repr__
+            Map ParseTree to its bracketed string.
+
+            res: string.
+        """
+        return self.to_bracketed()
+
+
+    def label(self):
+        """
+            ParseTree.label
+            Get the label.
+
+            Returns
+            ----------
+            res: string.
+        """
+        return self._label
+
+
+    def children(self):
+        """
+            ParseTree.children
+            Get the children.
+
+            Returns
+            ----------
+            res: list(ParseTree or string).
+        """
+        return self._children
+
+
+    def _preorder(self):
+        # Yields the nodes and words in pre-order with their depth
+        stack = [(self, 0)]
+        while len(stack) > 0:
+            node, depth = stack.pop()
+            yield node, depth
+            if isinstance(node, ParseTree):
+                for child in reversed(node._children):
+                    stack.append((child, depth+1))
+
+
+    def words(self):
+        """
+            ParseTree.words
+            Get the words of the tree, from left to right.
+
+            Returns
+            ----------
+            res: list(string).
+        """
+        return [node for node, depth in self._preorder() \
+            if not isinstance(node, ParseTree)]
+
+
+    def preterminals(self):
+        """
+            ParseTree.preterminals
+            Get the (label, word) pairs of the preterminals, from left to
+            right.
+
+            Returns
+            ----------
+            res: list(tuple(string, string)).
+        """
+        return [(node._label, node._children[0]) for node, depth \
+            in self._preorder() if isinstance(node, ParseTree) and \
+            len(node._children) == 1 and \
+            not isinstance(node._children[0], ParseTree)]
+
+
+    def spans(self, preterminals=True):
+        """
+            ParseTree.spans
+            Get the labelled spans of the tree.
+
+            Parameters
+            ----------
+            preterminals=True: bool.
+                Optional. Includes the spans of the preterminals (the
+                brackets of PARSEVAL exclude them).
+
+            Returns
+            ----------
+            res: list(tuple(string, int, int)).
+                (label, first word, end excluded) of each node, in pre-order.
+        """
+        res = []
+        # Open nodes: index in res and depth
+        opened = []
+        # Indices of the preterminals in res
+        tags = set()
+        position = 0
+        for node, depth in self._preorder():
+            while len(opened) > 0 and opened[-1][1] >= depth:
+                i, d = opened.pop()
+                res[i] = (res[i][0], res[i][1], position)
+            if isinstance(node, ParseTree):
+                if len(node._children) == 1 and \
+                        not isinstance(node._children[0], ParseTree):
+                    tags.add(len(res))
+                opened.append((len(res), depth))
+                res.append((node._label, position, position))
+            else:
+                position += 1
+        for i, d in opened:
+            res[i] = (res[i][0], res[i][1], position)
+        if not preterminals:
+            res = [span for i, span in enumerate(res) if i not in tags]
+        return res
+
+
+    def write_bracketed(self, out):
+        """
+            ParseTree.write_bracketed
+            Writes the tree in the bracketed format of the treebank, e.g.
+            (SENT (NC amélioration) (PP (P de) (NP (DET la) (NC sécurité)))).
+
+            Parameters
+            ----------
+            out: file-like.
+                Text buffer (anything with a write method).
+        """
+        # Items are nodes, words or closing parentheses
+        stack = [self]
+        while len(stack) > 0:
+            node = stack.pop()
+            if isinstance(node, ParseTree):
+                out.write("(" + node._label)
+                stack.append(")")
+                for child in reversed(node._children):
+                    stack.append(child)
+                    stack.append(" ")
+            else:
+                out.write(node)
+
+
+    def write_json(self, out):
+        """
+            ParseTree.write_json
+            Writes the tree as JSON: {"label": ..., "children": [...]}, the
+            words being JSON strings.
+
+            Parameters
+            ----------
+            out: file-like.
+                Text buffer (anything with a write method).
+        """
+        # Items are (node, True) or (raw text, False)
+        stack = [(self, True)]
+        while len(stack) > 0:
+            node, is_node = stack.pop()
+            if not is_node:
+                out.write(node)
+            elif isinstance(node, ParseTree):
+                out.write('{"label": ' + json.dumps(node._label, \
+                    ensure_ascii=False) + ', "children": [')
+                stack.append(("]}", False))
+                for i in range(len(node._children)-1, -1, -1):
+                    stack.append((node._children[i], True))
+                    if i > 0:
+                        stack.append((", ", False))
+            else:
+                out.write(json.dumps(node, ensure_ascii=False))
+
+
+    def to_bracketed(self):
+        """
+            ParseTree.to_bracketed
+            Get the bracketed string of the tree (see write_bracketed).
+
+            Returns
+            ----------
+            res: string.
+        """
+        buffer = _ListBuffer()
+        self.write_bracketed(buffer)
+        return buffer.getvalue()
+
+
+    def to_json(self):
+        """
+            ParseTree.to_json
+            Get the JSON string of the tree (see write_json).
+
+            Returns
+            ----------
+            res: string.
+        """
+        buffer = _ListBuffer()
+        self.write_json(buffer)
+        return buffer.getvalue()
+
+
+    def to_tuple(self):
+        """
+            ParseTree.to_tuple
+            Get the tree as nested tuples, in the format of read_tree:
+            (label, word) for a preterminal, (label, (children...))
+            otherwise.
+
+            Returns
+            ----------
+            res: tuple.
+        """
+        # Post-order: the children of a node are converted before it
+        converted = {}
+        for node, depth in reversed(list(self._preorder())):
+            if not isinstance(node, ParseTree):
+                continue
+            if len(node._children) == 1 and \
+                    not isinstance(node._children[0], ParseTree):
+                converted[id(node)] = (node._label, node._children[0])
+            else:
+                converted[id(node)] = (node._label, tuple( \
+                    converted[id(child)] if isinstance(child, ParseTree) \
+                    else child for child in node._children))
+        return converted[id(self)]
+
+
+    @staticmethod
+    def from_tuple(tree):
+        """
+            ParseTree.from_tuple
+            Builds a tree from nested tuples in the format of read_tree (see
+            to_tuple).
+
+            Parameters
+            ----------
+            tree: tuple.
+
+            Returns
+            ----------
+            res: ParseTree.
+        """
+        res = ParseTree(tree[0])
+        # Items: (tuple node, ParseTree)
+        stack = [(tree, res)]
+        while len(stack) > 0:
+            node, built = stack.pop()
+            label, children = node
+            if isinstance(children, str):
+                built._children.append(children)
+                continue
+            for child in children:
+                if isinstance(child, str):
+                    built._children.append(child)
+                else:
+                    subtree = ParseTree(child[0])
+                    built._children.append(subtree)
+                    stack.append((child, subtree))
+        return res
+
+
+    @staticmethod
+    def from_json(s):
+        """
+            ParseTree.from_json
+            Reads a tree written by write_json.
+
+            Parameters
+            ----------
+            s: string.
+
+            Returns
+            ----------
+            res: ParseTree.
+        """
+        data = json.loads(s)
+        res = ParseTree(data["label"])
+        # Items: (JSON node, ParseTree)
+        stack = [(data, res)]
+        while len(stack) > 0:
+            data, tree = stack.pop()
+            for child in data["children"]:
+                if isinstance(child, str):
+                    tree._children.append(child)
+                else:
+                    subtree = ParseTree(child["label"])
+                    tree._children.append(subtree)
+                    stack.append((child, subtree))
+        return res
+
+
+class _ListBuffer:
+    # Minimal write buffer: the parts are joined once at the end
+
+    __slots__ = ("_parts",)
+
+
+    def __init__(self):
+        self._parts = []
+
+
+    def write(self, s):
+        self._parts.append(s)
+
+
+    def getvalue(self):
+        return "".join(self._parts)
+
+
+def build_tree(root, expand, leaf):
+    """
+        build_tree
+        Builds the debinarized tree of a derivation from its backpointers,
+        with an explicit stack: the X*** nodes are replaced by their
+        children, and the t[...] nodes by their word.
+
+        Parameters
+        ----------
+        root: object.
+            The root node of the derivation (any chart item).
+        expand: function(node) -> (string, node, node) or (string, None,
+                None).
+            Gives the label of a node and its left and right children, None
+            for a lexical node.
+        leaf: function(node) -> string.
+            Gives the word of a lexical node.
+
+        Returns
+        ----------
+        res: ParseTree or None.
+            None if the root itself is hidden.
+    """
+    top = []
+    # Items: (chart node, list of children of the output parent)
+    stack = [(root, top)]
+    while len(stack) > 0:
+        node, siblings = stack.pop()
+        label, left, right = expand(node)
+        if left is None:
+            if is_terminal_substitute(label):
+                siblings.append(leaf(node))
+            else:
+                siblings.append(ParseTree(label, [leaf(node)]))
+            continue
+        if is_binarization_symbol(label):
+            children = siblings
+        else:
+            tree = ParseTree(label)
+            siblings.append(tree)
+            children = tree._children
+        # The left child is popped first: children are appended in order
+        stack.append((right, children))
+        stack.append((left, children))
+    return top[0] if len(top) == 1 and isinstance(top[0], ParseTree) \
+        else None
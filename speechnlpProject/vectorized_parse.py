@@ -0,0 +1,517 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized CYK parser: it works on the compiled grammar (non-terminals
+interned to dense ints), chart cells are float arrays of Viterbi log-scores
+with int backpointers, and binary rules are applied as batched NumPy
+operations over the rule table.
+"""
+
+
+from speechnlpProject.grammar import *
+from speechnlpProject.parse import *
+from speechnlpProject.kbest import KBest_Derivations
+from speechnlpProject.tree import ParseTree, build_tree
+import numpy as np
+import time
+
+
+class Vectorized_CYK_Parser(CYK_Parser):
+    """
+        Vectorized_CYK_Parser
+        Drop-in replacement of CYK_Parser returning the same bracketed
+        output. Ties between derivations of equal log-probability are broken
+        by lowest split point, then by lowest rule index.
+    """
+
+
+    def __init__(self, pcfg, root_symbol, verbose=False, beam_width=None, \
+            threshold=None, coarse_threshold=None, \
+            coarse_projection=default_projection, time_budget=None, \
+            edge_budget=None, cache=None, collect_stats=False, \
+            oov_distance=3):
+        """
+            Vectorized_CYK_Parser.__init__
+            Compiles the PCFG into integer symbol tables and rule indexes.
+
+            Parameters
+            ----------
+            pcfg: PCFG.
+                The grammar, preferably in Chomsky normal form.
+            root_symbol: GSymbol.
+                The symbol expected over the whole sentence.
+            verbose=False: bool.
+                Optional. Prints the chart after each parse.
+            beam_width=None, threshold=None: int, float.
+                Optional. Pruning of the cells (see CYK_Parser.__init__).
+            coarse_threshold=None, coarse_projection=default_projection:
+                Optional. Coarse-to-fine pruning (see CYK_Parser.__init__).
+                The parse of the coarse grammar costs more than it saves
+                here: it only speeds up CYK_Parser.
+            time_budget=None, edge_budget=None: float, int.
+                Optional. Budget of a parse (see CYK_Parser.__init__).
+            cache=None: Parse_Cache.
+                Optional. Cache of the parses (see CYK_Parser.__init__).
+            collect_stats=False: bool.
+                Optional. Collects the stats of each parse (see
+                CYK_Parser.parse_stats).
+            oov_distance=3: int.
+                Optional. Maximum edit distance of the replacement of an
+                unknown word.
+        """
+        CYK_Parser.__init__(self, pcfg, root_symbol, verbose, beam_width, \
+            threshold, coarse_threshold, coarse_projection, time_budget, \
+            edge_budget, cache, collect_stats, oov_distance)
+
+
+    def _load_grammar(self):
+        """
+            Vectorized_CYK_Parser._load_grammar
+            Compiles the grammar and gets its rule arrays (see
+            CYK_Parser._load_grammar).
+        """
+        CYK_Parser._load_grammar(self)
+        self._grammar = self._compiled_grammar()
+
+        self._nt_symbs = self._grammar.nt_symbs()
+        self._rule_parent, self._rule_left, self._rule_right, \
+            self._rule_logp = self._grammar.binary_rules()
+        self._hidden = self._grammar.hidden()
+
+
+    def _fill_cell(self, left_scores, right_scores, score, rule, split, \
+            allowed=None):
+        """
+            Vectorized_CYK_Parser._fill_cell
+            Computes the Viterbi scores of a cell given the scores of its
+            left and right sub-cells for every split point.
+
+            Parameters
+            ----------
+            left_scores: np.array((n_splits, n_nt)).
+                Scores of the left sub-cell for each split point.
+            right_scores: np.array((n_splits, n_nt)).
+                Scores of the right sub-cell for each split point.
+            score, rule, split: np.array(n_nt).
+                Output arrays: best log-score, best rule index and best split
+                point of each non-terminal.
+            allowed=None: np.array(n_nt, bool).
+                Optional. The non-terminals allowed by the coarse grammar:
+                the rules of the other ones are not scored at all.
+
+            Returns
+            ----------
+            n_candidates: int.
+                The number of rules scored at the split points (rules times
+                split points).
+        """
+        # Rules whose left child is in one of the left sub-cells and whose
+        # right child is in one of the right sub-cells, sorted by parent
+        left_active = np.flatnonzero(np.any(left_scores > -np.inf, axis=0))
+        rules = self._grammar.rules_with_left(left_active)
+        right_active = np.any(right_scores > -np.inf, axis=0)
+        rules = rules[right_active[self._rule_right[rules]]]
+        if allowed is not None:
+            keep = allowed[self._rule_parent[rules]]
+            if not np.all(keep):
+                self._pruning_stats["pruned_cells"] += 1
+                self._pruning_stats["pruned_edges"] += len(np.unique( \
+                    self._rule_parent[rules[~keep]]))
+                rules = rules[keep]
+        n_rules = len(rules)
+        if n_rules == 0:
+            return 0
+
+        # Score of every rule at every split point, then best split point
+        # per rule (the first one in case of ties)
+        cand = left_scores[:, self._rule_left[rules]] + \
+            right_scores[:, self._rule_right[rules]]
+        cand += self._rule_logp[rules]
+        rule_split = np.argmax(cand, axis=0)
+        rule_best = cand[rule_split, np.arange(n_rules)]
+
+        # Best rule per parent (lowest split, then lowest rule index)
+        rule_parent = self._rule_parent[rules]
+        starts = np.flatnonzero(np.append(True, \
+            rule_parent[1:] != rule_parent[:-1]))
+        counts = np.diff(np.append(starts, n_rules))
+        parent_best = np.maximum.reduceat(rule_best, starts)
+        found = parent_best > -np.inf
+        if not np.any(found):
+            return cand.size
+        key = np.where(rule_best == np.repeat(parent_best, counts), \
+            rule_split * n_rules + np.arange(n_rules), np.iinfo(np.int64).max)
+        parent_key = np.minimum.reduceat(key, starts)[found]
+
+        parents = rule_parent[starts][found]
+        score[parents] = parent_best[found]
+        rule[parents] = rules[parent_key % n_rules]
+        split[parents] = parent_key // n_rules
+        return cand.size
+
+
+    def _derivation_tree(self, words, root, backpointer):
+        """
+            Vectorized_CYK_Parser._derivation_tree
+            Builds the parse tree of a derivation of the chart.
+
+            Parameters
+            ----------
+            words: list(string).
+                The input words.
+            root: tuple.
+                (lev, k, a, state) of the root, state being passed to
+                backpointer.
+            backpointer: function(lev, k, a, state) -> (split, rule,
+                    left state, right state).
+
+            Returns
+            ----------
+            res: ParseTree.
+        """
+        def expand(node):
+            lev, k, a, state = node
+            if lev == 0:
+                return self._nt_symbs[a].ssymb(), None, None
+            i, r, left_state, right_state = backpointer(lev, k, a, state)
+            return self._nt_symbs[a].ssymb(), \
+                (i, k, self._rule_left[r], left_state), \
+                (lev-i-1, k+1+i, self._rule_right[r], right_state)
+
+        return build_tree(root, expand, lambda node: words[node[1]])
+
+
+    def _prune_cell(self, score):
+        """
+            Vectorized_CYK_Parser._prune_cell
+            Removes from a cell the non-terminals out of the beam or below
+            the threshold (see CYK_Parser._prune_cell). Ties in the beam are
+            broken by lowest non-terminal id.
+
+            Parameters
+            ----------
+            score: np.array(n_nt).
+                The scores of the cell, pruned in place (set to -inf).
+        """
+        if self._beam_width is None and self._threshold is None:
+            return
+        active = np.flatnonzero(score > -np.inf)
+        if len(active) == 0:
+            return
+        keep = active
+        if self._threshold is not None:
+            keep = keep[score[keep] >= score[keep].max() - self._threshold]
+        if self._beam_width is not None and len(keep) > self._beam_width:
+            keep = keep[np.lexsort((keep, -score[keep]))[:self._beam_width]]
+
+        n_pruned = len(active) - len(keep)
+        if n_pruned > 0:
+            pruned = np.setdiff1d(active, keep, assume_unique=True)
+            score[pruned] = -np.inf
+            self._pruning_stats["pruned_cells"] += 1
+            self._pruning_stats["pruned_edges"] += n_pruned
+
+
+    def _mask_cell(self, score, allowed):
+        """
+            Vectorized_CYK_Parser._mask_cell
+            Removes from a cell the non-terminals which are not allowed by
+            the coarse grammar (see CYK_Parser._mask_cell).
+
+            Parameters
+            ----------
+            score: np.array(n_nt).
+                The scores of the cell, pruned in place (set to -inf).
+            allowed: np.array(n_nt, bool).
+        """
+        pruned = ~allowed & (score > -np.inf)
+        n_pruned = int(np.count_nonzero(pruned))
+        if n_pruned > 0:
+            score[pruned] = -np.inf
+            self._pruning_stats["pruned_cells"] += 1
+            self._pruning_stats["pruned_edges"] += n_pruned
+
+
+    def _build_chart(self, words, resolved, prune):
+        """
+            Vectorized_CYK_Parser._build_chart
+            Fills the chart of a sentence.
+
+            Parameters
+            ----------
+            words: list(string).
+                The input words.
+            resolved: list(string).
+                The corresponding words of the lexicon.
+            prune: bool.
+                Prunes the cells (coarse-to-fine pruning of all the cells,
+                beam and threshold pruning of the levels >= 1).
+
+            Returns
+            ----------
+            chart_score, chart_rule, chart_split: list(np.array).
+                chart_score[lev][k, a]: best log-score of non-terminal a over
+                the words k..k+lev. chart_rule and chart_split are the
+                backpointers.
+        """
+        n = len(words)
+        n_nt = len(self._nt_symbs)
+        allowed = None
+        if prune and self._coarse_threshold is not None:
+            allowed = self._coarse_allowed(resolved)
+
+        chart_score = []
+        chart_rule = []
+        chart_split = []
+        stats = self._stats
+        if stats is not None:
+            stats.count("charts")
+            level_start = time.perf_counter()
+
+        # First level: non-terminals corresponding to words
+        chart_score.append(np.full((n, n_nt), -np.inf))
+        chart_rule.append(np.full((n, n_nt), -1, dtype=np.int32))
+        chart_split.append(np.zeros((n, n_nt), dtype=np.int32))
+        for k in range(n):
+            nt_ids, logps = self._grammar.lexical_rules(
+                self._grammar.word_id(resolved[k]))
+            chart_score[0][k, nt_ids] = logps
+            if allowed is not None:
+                self._mask_cell(chart_score[0][k], allowed[0][k])
+        chart = (chart_score, chart_rule, chart_split)
+        if stats is not None:
+            self._level_stats(0, level_start, n, 0, 0, \
+                int(np.isfinite(chart_score[0]).sum()))
+        self._spend(0, chart)
+
+        for lev in range(1, n):
+            if stats is not None:
+                level_start = time.perf_counter()
+                n_pairs = n_rules = 0
+            chart_score.append(np.full((n-lev, n_nt), -np.inf))
+            chart_rule.append(np.full((n-lev, n_nt), -1, dtype=np.int32))
+            chart_split.append(np.zeros((n-lev, n_nt), dtype=np.int32))
+            for k in range(n-lev):
+                left_scores = np.stack([chart_score[i][k] \
+                    for i in range(lev)])
+                right_scores = np.stack([chart_score[lev-i-1][k+1+i] \
+                    for i in range(lev)])
+                n_candidates = self._fill_cell(left_scores, right_scores, \
+                    chart_score[lev][k], chart_rule[lev][k], \
+                    chart_split[lev][k], \
+                    None if allowed is None else allowed[lev][k])
+                if prune:
+                    self._prune_cell(chart_score[lev][k])
+                # The budget counts the pairs of sub-derivations, as
+                # CYK_Parser
+                n_edges = int((np.isfinite(left_scores).sum(axis=1) * \
+                    np.isfinite(right_scores).sum(axis=1)).sum())
+                if stats is not None:
+                    n_pairs += n_edges
+                    n_rules += n_candidates
+                self._spend(n_edges, chart)
+            if stats is not None:
+                self._level_stats(lev, level_start, n-lev, n_pairs, \
+                    n_rules, int(np.isfinite(chart_score[lev]).sum()))
+
+        return chart_score, chart_rule, chart_split
+
+
+    def _right_branching_tree(self, words, resolved):
+        """
+            Vectorized_CYK_Parser._right_branching_tree
+            Builds the best right-branching derivation (see
+            CYK_Parser._right_branching_tree), keeping one score vector per
+            suffix of the sentence instead of a chart.
+
+            Parameters
+            ----------
+            words: list(string).
+                The input words.
+            resolved: list(string).
+                The corresponding words of the lexicon.
+
+            Returns
+            ----------
+            res: ParseTree or None.
+        """
+        n = len(words)
+        n_nt = len(self._nt_symbs)
+        root = self._grammar.nt_id(self._root_symbol)
+        if root is None:
+            return None
+        lexical = np.full((n, n_nt), -np.inf)
+        for k in range(n):
+            nt_ids, logps = self._grammar.lexical_rules(
+                self._grammar.word_id(resolved[k]))
+            lexical[k, nt_ids] = logps
+
+        # Best derivation over the words k..n-1: word k, then the words
+        # k+1..n-1
+        suffix_score = np.full((n, n_nt), -np.inf)
+        suffix_rule = np.full((n, n_nt), -1, dtype=np.int32)
+        split = np.zeros(n_nt, dtype=np.int32)
+        suffix_score[n-1] = lexical[n-1]
+        for k in range(n-2, -1, -1):
+            self._fill_cell(lexical[k][np.newaxis], \
+                suffix_score[k+1][np.newaxis], suffix_score[k], \
+                suffix_rule[k], split)
+        if suffix_score[0, root] == -np.inf:
+            return None
+
+        # Nodes are (k, a, suffix): the word k or the words k..n-1
+        def expand(node):
+            k, a, suffix = node
+            if not suffix or k == n-1:
+                return self._nt_symbs[a].ssymb(), None, None
+            r = suffix_rule[k, a]
+            return self._nt_symbs[a].ssymb(), \
+                (k, self._rule_left[r], False), \
+                (k+1, self._rule_right[r], True)
+
+        return build_tree((0, root, True), expand, lambda node: words[node[0]])
+
+
+    def parse_kbest(self, test_s, k, as_tree=False):
+        """
+            Vectorized_CYK_Parser.parse_kbest
+            Parses a tokenized sentence and returns its k best parses. The
+            chart is filled once, then the derivations are enumerated lazily
+            from it: only the nodes used by the k best parses are visited,
+            each with at most k derivations.
+
+            Parameters
+            ----------
+            test_s: string.
+                The sentence, words separated by a white space.
+            k: int.
+                The number of parses.
+            as_tree=False: bool.
+                Optional. Returns ParseTree instead of bracketed strings.
+
+            Returns
+            ----------
+            res: list(tuple(float, string or ParseTree)).
+                The log-probability and parse of the (at most) k best
+                parses, the first one being the result of parse().
+        """
+        self._check_grammar()
+        words, resolved = self._resolve_sentence(test_s)
+        self._pruning_stats = {"pruned_cells": 0, "pruned_edges": 0, \
+            "fallback": False}
+        root = self._grammar.nt_id(self._root_symbol)
+        n = len(words)
+        if n == 0 or root is None:
+            print("Failed to parse with CYK.")
+            return []
+
+        # Exhaustive chart (also for subclasses building partial charts)
+        chart_score, chart_rule, chart_split = \
+            Vectorized_CYK_Parser._build_chart(self, words, resolved, \
+                self._prunes())
+        if chart_score[n-1][0, root] == -np.inf and \
+                self._pruning_stats["pruned_edges"] > 0:
+            self._pruning_stats["fallback"] = True
+            chart_score, chart_rule, chart_split = \
+                Vectorized_CYK_Parser._build_chart(self, words, resolved, \
+                    False)
+        if chart_score[n-1][0, root] == -np.inf:
+            print("Failed to parse with CYK.")
+            return []
+
+        kbest = KBest_Derivations(self._grammar, chart_score, k)
+        def backpointer(lev, k, a, rank):
+            return kbest.derivation((lev, k, a), rank)[1:]
+
+        res = []
+        rank = 0
+        while kbest.kth((n-1, 0, root), rank):
+            tree = self._derivation_tree(words, (n-1, 0, root, rank), \
+                backpointer)
+            res.append((kbest.derivation((n-1, 0, root), rank)[0], \
+                tree if as_tree else tree.to_bracketed()))
+            rank += 1
+        return res
+
+
+    def _chart_to_tree(self, chart, words):
+        """
+            Vectorized_CYK_Parser._chart_to_tree
+            Builds the parse tree from a filled chart.
+
+            Parameters
+            ----------
+            chart: tuple(list(np.array)).
+                As returned by _build_chart.
+            words: list(string).
+                The input words.
+
+            Returns
+            ----------
+            res: ParseTree or None.
+                The parse tree, or None if the root symbol could not be
+                built over the whole sentence.
+        """
+        chart_score, chart_rule, chart_split = chart
+        n = len(words)
+
+        if self.verbose:
+            print("Unweighted CYK table:")
+            for lev in range(n-1, -1, -1):
+                print([sorted([self._nt_symbs[a] for a in \
+                    np.flatnonzero(cell > -np.inf)]) \
+                    for cell in chart_score[lev]])
+
+        root = self._grammar.nt_id(self._root_symbol)
+        if root is not None and chart_score[n-1][0, root] > -np.inf:
+            if self.verbose:
+                print("Found " + str(self._root_symbol) + \
+                    " in top level with logp=" + \
+                    str(chart_score[n-1][0, root]))
+            return self._subtree(chart, words, n-1, 0, root)
+        return None
+
+
+    def _subtree(self, chart, words, lev, k, a):
+        """
+            Vectorized_CYK_Parser._subtree
+            Builds the tree of the best derivation of a non-terminal over a
+            cell (see CYK_Parser._subtree).
+
+            Parameters
+            ----------
+            chart: tuple(list(np.array)).
+            words: list(string).
+                The input words.
+            lev, k, a: int.
+
+            Returns
+            ----------
+            res: ParseTree.
+        """
+        chart_score, chart_rule, chart_split = chart
+        return self._derivation_tree(words, (lev, k, a, None), \
+            lambda lev, k, a, state: (chart_split[lev][k, a], \
+                chart_rule[lev][k, a], None, None))
+
+
+    def _cell_entries(self, chart, lev, k):
+        """
+            Vectorized_CYK_Parser._cell_entries
+            Get the non-terminals built over a cell of a (possibly partial)
+            chart (see CYK_Parser._cell_entries).
+
+            Parameters
+            ----------
+            chart: tuple(list(np.array)).
+            lev, k: int.
+
+            Returns
+            ----------
+            res: list(tuple(float, string, int)).
+        """
+        chart_score = chart[0]
+        if lev >= len(chart_score):
+            return []
+        cell = chart_score[lev][k]
+        return [(cell[a], self._nt_symbs[a].ssymb(), a) \
+            for a in np.flatnonzero(cell > -np.inf).tolist()]
@@ -8,17 +8,32 @@ Created on Fri Feb 23 14:58:06 2018
 
 from speechnlpProject.grammar import *
 from speechnlpProject.parse import *
+from speechnlpProject.vectorized_parse import *
+from speechnlpProject.corpus import Treebank_File
+import argparse
 import sys
 
 
 # USAGE:
 # python test_main.py "Amélioration de la sécurité\nGutenberg"
+# Train once and save the model, then parse from the saved model:
+# python test_main.py --save-model sequoia.npz
+# python test_main.py --model sequoia.npz "Amélioration de la sécurité"
+# Parse a file (one tokenized sentence per line, "-" for stdin) with 4
+# worker processes:
+# python test_main.py --model sequoia.npz --input sentences.txt --workers 4
+# Keep the model loaded in a parser service, and parse with a thin client:
+# python test_main.py --model sequoia.npz --serve /tmp/parser.sock --workers 4
+# python test_main.py --connect /tmp/parser.sock "Amélioration de la sécurité"
+# Evaluate the parses of the dev split (PARSEVAL) with 4 worker processes:
+# python test_main.py --model sequoia.npz --evaluate dev --workers 4
 
 
 def load_CFG_corpus(path):
     """
         load_CFG_corpus
-        Loads the corpus to be learnt
+        Loads the corpus to be learnt, streamed from the file (plain or
+        compressed, see corpus.Treebank_File).
         
         Parameters
         ----------
@@ -27,70 +42,230 @@ def load_CFG_corpus(path):
         
         Returns
         ----------
-        res: list(string). 
-            A list of strings corresponding to a list of samples.
+        res: Treebank_File. 
+            An iterable over the samples.
     """
-    f = open(path, "r")#    
-    res = f.read().split("\n")
-    f.close()
-    return res
+    return Treebank_File(path)
 
 
-def split_train_dev_test(cfg_corpus):
+def split_train_dev_test(cfg_corpus, method="contiguous"):
     """
         split_train_dev_test
         Splits the corpus in 3 parts (80, 10, 10 %).
         
         Parameters
         ----------
-        cfg_corpus: list(string). 
+        cfg_corpus: Treebank_File. 
+        method="contiguous": string.
+            Optional. "contiguous", "index" or "hash" (see corpus.split_of).
         
         Returns
         ----------
-        cfg_corpus_train: list(string). 
-        cfg_corpus_dev: list(string). 
-        cfg_corpus_test: list(string). 
+        cfg_corpus_train: Corpus_Split. 
+        cfg_corpus_dev: Corpus_Split. 
+        cfg_corpus_test: Corpus_Split. 
     """
-    n = len(cfg_corpus)
-    n_train = int(n * 0.8)
-    n_dev = int((n-n_train) // 2)
-    n_test = n - n_train - n_dev
-    
-    print("n_train=", n_train, "n_dev=", n_dev, "n_test=", n_test)
+    if method == "contiguous":
+        n = len(cfg_corpus)
+        n_train = int(n * 0.8)
+        n_dev = int((n-n_train) // 2)
+        n_test = n - n_train - n_dev
+        
+        print("n_train=", n_train, "n_dev=", n_dev, "n_test=", n_test)
     
-    cfg_corpus_train = cfg_corpus[:n_train]
-    cfg_corpus_dev = cfg_corpus[n_train:n_train+n_dev]
-    cfg_corpus_test = cfg_corpus[n_train+n_dev:]
+    cfg_corpus_train = cfg_corpus.split("train", method)
+    cfg_corpus_dev = cfg_corpus.split("dev", method)
+    cfg_corpus_test = cfg_corpus.split("test", method)
     
     return cfg_corpus_train, cfg_corpus_dev, cfg_corpus_test
 
 
-cfg_corpus = load_CFG_corpus("sequoia-corpus+fct.mrg_strict")
-cfg_corpus_train, cfg_corpus_dev, cfg_corpus_test = split_train_dev_test(cfg_corpus)
+def read_input_sentences(args):
+    """
+        read_input_sentences
+        Get the sentences to be parsed, from the --input file or from the
+        command line.
+        
+        Parameters
+        ----------
+        args: argparse.Namespace.
+        
+        Returns
+        ----------
+        res: list(string).
+    """
+    if args.input is not None:
+        f = sys.stdin if args.input == "-" else open(args.input, "r")
+        res = [line.strip() for line in f if line.strip() != ""]
+        if f is not sys.stdin:
+            f.close()
+        return res
+    
+    input_test_corpus = args.sentences.split("\n")
+    res = []
+    for i in range(len(input_test_corpus)):
+        res += input_test_corpus[i].split("\\n")
+    return res
+
+
+arg_parser = argparse.ArgumentParser(description="PCFG/CYK parser.")
+arg_parser.add_argument("sentences", nargs="?", default=None, \
+    help="Tokenized sentences to be parsed, separated by \\n.")
+arg_parser.add_argument("--corpus", default="sequoia-corpus+fct.mrg_strict", \
+    help="Training corpus (bracketed trees, possibly compressed: .gz, " \
+        ".bz2, .xz).")
+arg_parser.add_argument("--split", default="contiguous", \
+    choices=["contiguous", "index", "hash"], \
+    help="Split of the corpus in train/dev/test (80/10/10 %%): the first " \
+        "trees, then the next ones (contiguous), by position modulo 10 " \
+        "(index), or by a hash of the tree (hash).")
+arg_parser.add_argument("--model", default=None, \
+    help="Load a model saved with --save-model instead of training.")
+arg_parser.add_argument("--save-model", default=None, \
+    help="Save the trained model to this file.")
+arg_parser.add_argument("--input", default=None, \
+    help="File of sentences to be parsed, one per line (- for stdin).")
+arg_parser.add_argument("--workers", type=int, default=1, \
+    help="Number of worker processes used to train and to parse.")
+arg_parser.add_argument("--beam-width", type=int, default=None, \
+    help="Keep only the best non-terminals of each chart cell.")
+arg_parser.add_argument("--threshold", type=float, default=None, \
+    help="Prune the non-terminals of a chart cell whose log-probability is " \
+        "more than this under the best one.")
+arg_parser.add_argument("--coarse-threshold", type=float, default=None, \
+    help="Coarse-to-fine parsing: prune the non-terminals whose coarse " \
+        "posterior probability is below this.")
+arg_parser.add_argument("--time-budget", type=float, default=None, \
+    help="Maximum time of a parse in seconds, after which the parse " \
+        "degrades (tighter beam, right-branching tree, fragments).")
+arg_parser.add_argument("--edge-budget", type=int, default=None, \
+    help="Maximum number of candidate derivations of a parse (pairs of " \
+        "sub-derivations tried), after which the parse degrades.")
+arg_parser.add_argument("--cache-size", type=int, default=None, \
+    help="Cache the parses of this number of sentences in memory.")
+arg_parser.add_argument("--cache-path", default=None, \
+    help="Also cache the parses in this SQLite file, kept between runs " \
+        "(with --cache-size, 10000 by default).")
+arg_parser.add_argument("--metrics", default=None, \
+    help="Collect the counters and timers of the training and of the " \
+        "parses (in this process: not with --workers), and write them to " \
+        "this file at the end (Prometheus text format if it ends with " \
+        ".prom, else JSON).")
+arg_parser.add_argument("--oov-distance", type=int, default=3, \
+    help="Maximum edit distance of the replacement of an unknown word.")
+arg_parser.add_argument("--evaluate", default=None, choices=["dev", "test"], \
+    help="Parse the sentences of this split of --corpus and compare the " \
+        "parses with its trees (bracket precision, recall and F1, tagging " \
+        "accuracy, latency by length), with --workers worker processes.")
+arg_parser.add_argument("--report-json", default=None, \
+    help="Also write the report of --evaluate to this JSON file.")
+arg_parser.add_argument("--serve", default=None, \
+    help="Serve parse requests on this address (path of a Unix socket or " \
+        "HOST:PORT) with --workers worker processes.")
+arg_parser.add_argument("--batch-size", type=int, default=8, \
+    help="Maximum number of requests parsed at once by a worker of --serve.")
+arg_parser.add_argument("--timeout", type=float, default=60.0, \
+    help="Timeout of a parse request in seconds (--serve, --connect).")
+arg_parser.add_argument("--connect", default=None, \
+    help="Parse with the parser service at this address instead of " \
+        "loading a model.")
+args = arg_parser.parse_args()
 
 
-# Train on training corpus
-b = PCFG(cfg_corpus_train, chomsky_normalize=True)
+if args.connect is not None:
+    from speechnlpProject.client import parse_remote
+    if args.sentences is None and args.input is None:
+        raise Exception("Empty input!")
+    input_test_corpus_2 = read_input_sentences(args)
+    parsed_sents = parse_remote([parsed_sent.lower() for parsed_sent \
+        in input_test_corpus_2], args.connect, timeout=args.timeout)
+    for i in range(0, len(input_test_corpus_2)):
+        print(">>> Parsing: " + input_test_corpus_2[i])
+        print(parsed_sents[i])
+    sys.exit(0)
+
+
+if args.model is None or args.evaluate is not None:
+    cfg_corpus = load_CFG_corpus(args.corpus)
+    cfg_corpus_train, cfg_corpus_dev, cfg_corpus_test = split_train_dev_test(cfg_corpus, \
+        args.split)
+
+if args.model is not None:
+    b = PCFG.load(args.model)
+else:
+    
+    # Train on training corpus
+    b = PCFG(cfg_corpus_train, chomsky_normalize=True, workers=args.workers, \
+        collect_stats=args.metrics is not None)
+    
+    if args.save_model is not None:
+        b.save(args.save_model)
+        print("Saved model to " + args.save_model)
 
 print(len(b.nt_symbs()), "non-terminals")
 print(len(b.lexicon()), "words")
 
-parser = CYK_Parser(b, GSymbol("SENT", GSymbol.NON_TERMINAL), verbose=False)
+if args.sentences is None and args.input is None and args.serve is None \
+        and args.evaluate is None:
+    if args.save_model is not None:
+        sys.exit(0)
+    raise Exception("Empty input!")
+
+cache = None
+if args.cache_size is not None or args.cache_path is not None:
+    from speechnlpProject.parse_cache import Parse_Cache
+    cache = Parse_Cache(10000 if args.cache_size is None else \
+        args.cache_size, args.cache_path)
+
+parser = Vectorized_CYK_Parser(b, GSymbol("SENT", GSymbol.NON_TERMINAL), verbose=False, \
+    beam_width=args.beam_width, threshold=args.threshold, \
+    coarse_threshold=args.coarse_threshold, time_budget=args.time_budget, \
+    edge_budget=args.edge_budget, cache=cache, \
+    collect_stats=args.metrics is not None, oov_distance=args.oov_distance)
+
+
+if args.serve is not None:
+    from speechnlpProject.server import Parser_Server
+    Parser_Server(parser, workers=args.workers, batch_size=args.batch_size, \
+        timeout=args.timeout).run(args.serve)
+    sys.exit(0)
+
+
+if args.evaluate is not None:
+    from speechnlpProject.evaluation import evaluate, format_report
+    import json
+    report = evaluate(parser, cfg_corpus_dev if args.evaluate == "dev" \
+        else cfg_corpus_test, workers=args.workers)
+    print(format_report(report))
+    if args.report_json is not None:
+        with open(args.report_json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    sys.exit(0)
 
 
 # Get input test corpus (tokenized!)
 #~ print(sys.argv[1])
 
-if len(sys.argv) < 2:
-    raise Exception("Empty input!")
+input_test_corpus_2 = read_input_sentences(args)
+
 
-input_test_corpus = sys.argv[1].split("\n")
-input_test_corpus_2 = []
-for i in range(len(input_test_corpus)):
-    input_test_corpus_2 += input_test_corpus[i].split("\\n")
+if args.workers > 1:
+    parsed_sents = parser.parse_many([parsed_sent.lower() for parsed_sent \
+        in input_test_corpus_2], workers=args.workers)
+    for i in range(0, len(input_test_corpus_2)):
+        print(">>> Parsing: " + input_test_corpus_2[i])
+        print(parsed_sents[i])
+else:
+    for i in range(0, len(input_test_corpus_2)):
+        parsed_sent = input_test_corpus_2[i]
+        print(">>> Parsing: " + parsed_sent)
+        print(parser.parse(parsed_sent.lower()))
 
 
-for i in range(0, len(input_test_corpus_2)):
-    parsed_sent = input_test_corpus_2[i]
-    print(">>> Parsing: " + parsed_sent)
-    print(parser.parse(parsed_sent.lower()))
+if args.metrics is not None:
+    from speechnlpProject.metrics import process_metrics
+    with open(args.metrics, "w") as f:
+        if args.metrics.endswith(".prom"):
+            f.write(process_metrics().to_prometheus())
+        else:
+            f.write(process_metrics().to_json())
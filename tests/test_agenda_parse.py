@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the tie-breaking of the A* parser: on grammars where many
+derivations have the same score, it returns the same parses as the
+vectorized CYK (lowest split point, then lowest rule index).
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.vectorized_parse import Vectorized_CYK_Parser
+from speechnlpProject.agenda_parse import AStar_CYK_Parser
+import contextlib
+import io
+import unittest
+
+
+GRAMMARS = [
+    ["( (SENT (SENT (N x) (N x)) (N x)))", \
+        "( (SENT (N x) (SENT (N x) (N x))))", "( (SENT (N x) (N x)))"],
+    ["( (SENT (A (N x) (N x)) (N x)))", "( (SENT (N x) (A (N x) (N x))))", \
+        "( (SENT (A (N x) (N x)) (A (N x) (N x))))", \
+        "( (A (A (N x) (N x)) (N x)))", "( (A (N x) (A (N x) (N x))))"],
+    ["( (SENT (B x) (C x)))", "( (SENT (C x) (B x)))", \
+        "( (SENT (SENT (B x) (C x)) (SENT (C x) (B x))))", \
+        "( (B (B x) (C x)))", "( (C (C x) (B x)))", \
+        "( (SENT (B x) (SENT (C x) (B x))))", \
+        "( (SENT (SENT (B x) (C x)) (B x)))"],
+]
+
+
+class Test_AStar_Ties(unittest.TestCase):
+
+
+    def test_same_parses_with_ties(self):
+        root = GSymbol("SENT", GSymbol.NON_TERMINAL)
+        for trees in GRAMMARS:
+            pcfg = PCFG(trees, chomsky_normalize=True)
+            vectorized = Vectorized_CYK_Parser(pcfg, root)
+            astar = AStar_CYK_Parser(pcfg, root)
+            for n in range(2, 11):
+                test_s = " ".join(["x"] * n)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    expected = vectorized.parse(test_s)
+                    res = astar.parse(test_s)
+                self.assertEqual(res, expected, test_s)
+
+
+if __name__ == "__main__":
+    unittest.main()
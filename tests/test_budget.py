@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the edge budget of the parsers: the unit of the budget (pairs of
+sub-derivations) is the same for all the parsers, and the parse degrades to
+a tighter beam, then to the best right-branching derivation.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.parse import CYK_Parser
+from speechnlpProject.vectorized_parse import Vectorized_CYK_Parser
+from speechnlpProject.agenda_parse import AStar_CYK_Parser
+import contextlib
+import io
+import unittest
+
+
+# Many phrase types over two words, so that the cells hold more
+# non-terminals than the beam of the second try, and a right-branching SENT
+TREES = ["( (SENT (N x) (N x)))"] * 20 + \
+    ["( (SENT (N x) (SENT (N x) (N x))))"] * 20 + \
+    ["( (SENT (P%d (N x) (N x)) (N x)))" % i for i in range(30)]
+SENTENCE = " ".join(["x"] * 6)
+RIGHT_BRANCHING = "(SENT (N x) (SENT (N x) (SENT (N x) (SENT (N x) " \
+    "(SENT (N x) (N x))))))"
+
+
+class Test_Edge_Budget(unittest.TestCase):
+
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pcfg = PCFG(TREES, chomsky_normalize=True)
+        cls.root = GSymbol("SENT", GSymbol.NON_TERMINAL)
+
+
+    def _parse(self, parser_class, edge_budget):
+        parser = parser_class(self.pcfg, self.root, edge_budget=edge_budget)
+        with contextlib.redirect_stdout(io.StringIO()):
+            res = parser.parse(SENTENCE)
+        return parser, res
+
+
+    def test_same_unit(self):
+        # The whole chart: 3335 pairs of sub-derivations for both parsers
+        cyk, cyk_res = self._parse(CYK_Parser, 10**6)
+        vectorized, vectorized_res = self._parse(Vectorized_CYK_Parser, \
+            10**6)
+        self.assertEqual(cyk.parse_status(), "exact")
+        self.assertEqual(vectorized.parse_status(), "exact")
+        self.assertEqual(cyk._edges, vectorized._edges)
+        self.assertEqual(cyk_res, vectorized_res)
+
+
+    def test_beam(self):
+        # Half of the budget is not enough for the whole chart, but the
+        # rest is enough for the chart of the tighter beam
+        for parser_class in (CYK_Parser, Vectorized_CYK_Parser):
+            parser, res = self._parse(parser_class, 4000)
+            self.assertEqual(parser.parse_status(), "beam", \
+                parser_class.__name__)
+            self.assertIsNotNone(res)
+
+
+    def test_right_branching(self):
+        for parser_class, edge_budget in ((CYK_Parser, 1000), \
+                (Vectorized_CYK_Parser, 1000), (AStar_CYK_Parser, 20)):
+            parser, res = self._parse(parser_class, edge_budget)
+            self.assertEqual(parser.parse_status(), "right_branching", \
+                parser_class.__name__)
+            self.assertEqual(res, RIGHT_BRANCHING)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the coarse-to-fine parsing: on a small treebank, the parses pruned
+with the coarse grammar are the parses without pruning, and the projection
+of the symbols created by the Chomsky normalization is kept by a saved
+model.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.parse import CYK_Parser
+from speechnlpProject.vectorized_parse import Vectorized_CYK_Parser
+from speechnlpProject.compiled_grammar import default_projection
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+
+TREES = [
+    "( (SENT (NP-SUJ (DET le) (NC chat)) (VN (V dort)) (PONCT .)))",
+    "( (SENT (NP-SUJ (DET le) (NC chien)) (VN (V voit)) (NP-OBJ (DET le) " \
+        "(NC chat)) (PONCT .)))",
+    "( (SENT (NP-SUJ (DET un) (NC chien)) (VN (V dort)) (PP-MOD (P dans) " \
+        "(NP (DET le) (NC jardin))) (PONCT .)))",
+    "( (SENT (NP-SUJ (NPP Marie)) (VN (V voit)) (NP-OBJ (DET un) (NC chat) " \
+        "(AP (ADJ noir))) (PONCT .)))",
+    "( (SENT (NP-SUJ (DET le) (NC chat) (AP (ADJ noir))) (VN (V dort)) " \
+        "(COORD (CC et) (Sint (NP-SUJ (DET le) (NC chien)) (VN (V voit)) " \
+        "(NP-OBJ (NPP Marie)))) (PONCT .)))",
+]
+SENTENCES = [
+    "le chat dort .",
+    "le chien voit un chat noir .",
+    "Marie dort dans le jardin .",
+    "un chat noir voit le chien .",
+    "le chien dort et Marie voit le chat .",
+]
+
+
+class Test_Coarse_To_Fine(unittest.TestCase):
+
+
+    def setUp(self):
+        self.pcfg = PCFG(TREES, chomsky_normalize=True)
+        self.root = GSymbol("SENT", GSymbol.NON_TERMINAL)
+        self.directory = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def test_same_parses(self):
+        for parser_class in (CYK_Parser, Vectorized_CYK_Parser):
+            parser = parser_class(self.pcfg, self.root)
+            coarse = parser_class(self.pcfg, self.root, \
+                coarse_threshold=1e-4)
+            for test_s in SENTENCES:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    expected = parser.parse(test_s)
+                    res = coarse.parse(test_s)
+                self.assertIsNotNone(expected, test_s)
+                self.assertEqual(res, expected, \
+                    parser_class.__name__ + ": " + test_s)
+
+
+    def test_projection_of_saved_model(self):
+        # The X*** symbols are projected on the category of their first
+        # label, before and after a save
+        path = os.path.join(self.directory, "model.npz")
+        self.pcfg.save(path)
+        pcfg = PCFG.load(path)
+        for grammar in (self.pcfg, pcfg):
+            symbol_table = grammar.symbol_table()
+            names = {}
+            for gsymb in grammar.compile()._nt_symbs:
+                names[gsymb.ssymb()] = default_projection(gsymb, \
+                    symbol_table)
+            self.assertIn("XN", names.values())
+            self.assertNotIn("X", names.values())
+            if grammar is self.pcfg:
+                expected = names
+        self.assertEqual(names, expected)
+
+        parser = Vectorized_CYK_Parser(pcfg, self.root, \
+            coarse_threshold=1e-4)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(parser.parse(SENTENCES[1]), \
+                Vectorized_CYK_Parser(self.pcfg, self.root).parse(\
+                    SENTENCES[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
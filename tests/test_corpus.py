@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the streaming reader of the treebanks: trees over several lines or
+separated by blank lines, compressed files, unbalanced parenthesis, and the
+splits of the corpus.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.corpus import read_trees, split_of, Treebank_File, \
+    SPLITS
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+
+TREES = [
+    "( (SENT (NP-SUJ (DET le) (NC chat)) (VN (V dort)) (PONCT .)))",
+    "( (SENT (NP-SUJ (DET le) (NC chien)) (VN (V voit)) (NP-OBJ (DET le) " \
+        "(NC chat)) (PONCT .)))",
+    "( (SENT (NP-SUJ (NPP Marie)) (VN (V dort)) (PONCT .)))",
+]
+# The same trees over several lines, indented, with blank lines between them
+TEXT = """( (SENT (NP-SUJ (DET le) (NC chat))
+    (VN (V dort))
+    (PONCT .)))
+
+( (SENT
+    (NP-SUJ (DET le) (NC chien))
+    (VN (V voit))
+    (NP-OBJ (DET le) (NC chat))
+    (PONCT .)))
+
+
+( (SENT (NP-SUJ (NPP Marie)) (VN (V dort)) (PONCT .)))
+"""
+
+
+def _normalize(tree):
+    # Trees compared up to their white spaces
+    return " ".join(tree.replace("(", " ( ").replace(")", " ) ").split())
+
+
+class Test_Read_Trees(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def test_several_lines(self):
+        trees = list(read_trees(TEXT.splitlines(True)))
+        self.assertEqual([_normalize(tree) for tree in trees], \
+            [_normalize(tree) for tree in TREES])
+        # One tree per line
+        self.assertEqual(list(read_trees(["\n"] + [tree + "\n" for tree in \
+            TREES] + ["  \n"])), TREES)
+
+
+    def test_gzip_file(self):
+        path = os.path.join(self.directory, "corpus.mrg.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(TEXT)
+        corpus = Treebank_File(path)
+        self.assertEqual([_normalize(tree) for tree in corpus], \
+            [_normalize(tree) for tree in TREES])
+        # Read again at each iteration
+        self.assertEqual(len(corpus), 3)
+        self.assertEqual(len(list(corpus)), 3)
+
+
+    def test_unbalanced_parenthesis(self):
+        # Too many closing parenthesis in a tree
+        with self.assertRaises(Exception):
+            list(read_trees([TREES[0] + ")", TREES[1]]))
+        with self.assertRaises(Exception):
+            list(read_trees(["( (SENT (NP (DET le))", "(NC chat))))"]))
+        # A tree not closed at the end of the corpus, after the other trees
+        trees = read_trees([TREES[0], "( (SENT (NP (DET le) (NC chat))"])
+        self.assertEqual(next(trees), TREES[0])
+        with self.assertRaises(Exception):
+            next(trees)
+
+
+class Test_Split_Of(unittest.TestCase):
+
+
+    def test_hash_reordered(self):
+        # Every tree stays in its split when the corpus is reordered
+        trees = ["( (SENT (NC mot%d)))" % i for i in range(300)]
+        expected = {tree: split_of(i, tree, method="hash") \
+            for i, tree in enumerate(trees)}
+        self.assertEqual(set(expected.values()), set(SPLITS))
+        shuffled = list(trees)
+        random.Random(0).shuffle(shuffled)
+        for i, tree in enumerate(shuffled):
+            self.assertEqual(split_of(i, tree, method="hash"), \
+                expected[tree])
+
+
+    def test_contiguous(self):
+        splits = [split_of(i, None, 20) for i in range(20)]
+        self.assertEqual(splits, ["train"] * 16 + ["dev"] * 2 + \
+            ["test"] * 2)
+
+
+    def test_unknown_method(self):
+        with self.assertRaises(Exception):
+            split_of(0, TREES[0], method="random")
+
+
+if __name__ == "__main__":
+    unittest.main()
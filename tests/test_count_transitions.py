@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the counting of the transitions in worker processes: the grammar
+trained with several workers is the grammar trained in the current process,
+down to the order of its rules.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG
+import unittest
+
+
+SUBJECTS = ["(NP-SUJ (DET le) (NC chat))", "(NP-SUJ (NPP Marie))", \
+    "(NP-SUJ (DET un) (NC chien) (AP (ADJ noir)))"]
+VERBS = ["(VN (V dort))", "(VN (CLR se) (V lave))", "(VN (V voit))"]
+OBJECTS = ["", " (NP-OBJ (DET la) (NC souris))", \
+    " (PP-MOD (P dans) (NP (DET le) (NC jardin)))", \
+    " (NP-OBJ (NPP Paul)) (PP-MOD (P+D du) (NP (NC matin)))"]
+
+
+def _trees(n):
+    # Several shards of 256 trees, new rules appearing in each shard
+    trees = []
+    for i in range(n):
+        tree = "( (SENT " + SUBJECTS[i % 3] + " " + VERBS[i // 3 % 3] + \
+            OBJECTS[i // 9 % 4]
+        if i >= 300:
+            tree += " (COORD (CC et) (Sint " + SUBJECTS[i % 2] + " " + \
+                VERBS[i % 3] + "))"
+        trees.append(tree + " (PONCT .)))")
+    return trees
+
+
+class Test_Count_Workers(unittest.TestCase):
+
+
+    def test_same_grammar(self):
+        trees = _trees(700)
+        pcfg = PCFG(trees, chomsky_normalize=True, workers=1)
+        pcfg_workers = PCFG(trees, chomsky_normalize=True, workers=2)
+        self.assertEqual(pcfg_workers.fingerprint(), pcfg.fingerprint())
+        self.assertEqual(list(pcfg_workers._cfgmap.keys()), \
+            list(pcfg._cfgmap.keys()))
+        for gsymb, gtrans_proba in pcfg._cfgmap.items():
+            self.assertEqual(list(pcfg_workers._cfgmap[gsymb].items()), \
+                list(gtrans_proba.items()))
+
+
+if __name__ == "__main__":
+    unittest.main()
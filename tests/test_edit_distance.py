@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the bounded edit distances (bounded_edit_distance, and
+batch_edit_distance on many candidates at once) against the full
+Wagner–Fischer edit_distance, on random pairs of strings.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.parse import edit_distance, bounded_edit_distance, \
+    batch_edit_distance, encode_words
+import random
+import unittest
+
+
+def _random_string(rng, max_length):
+    return "".join(rng.choice("abcé") for z in \
+        range(rng.randint(0, max_length)))
+
+
+class Test_Bounded_Edit_Distance(unittest.TestCase):
+
+
+    def setUp(self):
+        # Random pairs of unequal lengths, including empty strings
+        rng = random.Random(0)
+        self.pairs = [("", ""), ("", "abc"), ("abcd", ""), ("a", "a"), \
+            ("abc", "cba"), ("ab", "abcdef")]
+        for z in range(500):
+            self.pairs.append((_random_string(rng, 8), \
+                _random_string(rng, 8)))
+
+
+    def test_bounded_edit_distance(self):
+        for s1, s2 in self.pairs:
+            distance = edit_distance(s1, s2)
+            for k in range(4):
+                # k+1 when over the bound
+                expected = distance if distance <= k else k+1
+                self.assertEqual(bounded_edit_distance(s1, s2, k), expected, \
+                    (s1, s2, k))
+
+
+    def test_batch_edit_distance(self):
+        candidates = sorted(set(s2 for s1, s2 in self.pairs))
+        encoded = encode_words(candidates)
+        for s1 in sorted(set(s1 for s1, s2 in self.pairs))[:100]:
+            distances = [edit_distance(s1, s2) for s2 in candidates]
+            for k in range(4):
+                expected = [d if d <= k else k+1 for d in distances]
+                self.assertEqual(batch_edit_distance(s1, candidates, \
+                    k).tolist(), expected, (s1, k))
+                self.assertEqual(batch_edit_distance(s1, encoded, \
+                    k).tolist(), expected, (s1, k))
+
+
+    def test_no_candidate(self):
+        self.assertEqual(batch_edit_distance("abc", [], 2).tolist(), [])
+        self.assertEqual(batch_edit_distance("", [""], 0).tolist(), [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the alignment of the tags of a parse with the words of the
+sentence in the evaluation.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.evaluation import _tags
+from speechnlpProject.grammar import read_tree
+from speechnlpProject.tree import ParseTree
+import unittest
+
+
+class Test_Tags(unittest.TestCase):
+
+
+    def test_deepest_node_of_each_word(self):
+        tree = ParseTree.from_tuple(read_tree("( (SENT (NP (NPP gutenberg))))"))
+        self.assertEqual(_tags(tree, 1), ["NPP"])
+
+
+    def test_word_without_node(self):
+        # A word attached to a node of several words (e.g. a fragment) has
+        # no tag, and the next words keep their positions
+        tree = ParseTree("SENT", [ParseTree("DET", ["le"]), "chat", \
+            ParseTree("ADJ", ["noir"]), ParseTree("V", ["dort"])])
+        self.assertEqual(_tags(tree, 4), ["DET", None, "ADJ", "V"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the collapse of the unary chains (remove_nt_to_nt), against the
+previous implementation which searched the whole list of transitions for the
+first one rooted at the bottom symbol of a chain.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import GSymbol, GTransition, SymbolTable, \
+    read_tree, tree_transitions, remove_nt_to_nt
+from collections import Counter
+import unittest
+
+
+def _baseline_remove_nt_to_nt(l_gtrans):
+    # The previous implementation: only correct when the first transition
+    # rooted at each symbol of a chain is the one of its own subtree, and
+    # loops forever on chains such as NP -> NP
+    l_gtrans2 = list()
+    map_nt_to_nt = {}
+    for gtrans in l_gtrans:
+        new_res_symb = gtrans.res_symb()
+        while len(new_res_symb) == 1 and \
+                new_res_symb[0].stype() == GSymbol.NON_TERMINAL:
+            for gtrans2 in l_gtrans:
+                if gtrans2.symb() == new_res_symb[0]:
+                    if gtrans2.symb() not in map_nt_to_nt.keys():
+                        map_nt_to_nt[gtrans2.symb()] = set()
+                    map_nt_to_nt[gtrans2.symb()].add(gtrans.symb())
+                    new_res_symb = gtrans2.res_symb()
+                    break
+        l_gtrans2.append(GTransition(gtrans.symb(), new_res_symb))
+    n_init = len(l_gtrans2)
+    for i in range(n_init):
+        symbol_to_map = l_gtrans2[i].symb()
+        if symbol_to_map in map_nt_to_nt.keys():
+            for gsymb in map_nt_to_nt[symbol_to_map]:
+                l_gtrans2.append(GTransition(gsymb, l_gtrans2[i].res_symb()))
+    return l_gtrans2
+
+
+def _transitions(test_s):
+    return tree_transitions(read_tree(test_s))
+
+
+def _rule(ssymb, *res):
+    # Transition ssymb -> res, the lower case names being terminals
+    return GTransition(GSymbol(ssymb, GSymbol.NON_TERMINAL), \
+        [GSymbol(s, GSymbol.TERMINAL if s.islower() else \
+        GSymbol.NON_TERMINAL) for s in res])
+
+
+class Test_Remove_NT_To_NT(unittest.TestCase):
+
+
+    def test_same_counts_as_baseline(self):
+        # Trees whose chains have symbols found first in their own subtree
+        trees = [
+            "( (SENT (NP (NPP Gutenberg))))",
+            "( (SENT (NP (NC Amélioration) (PP (P de) (NP (DET la) " \
+                "(NC sécurité))))))",
+            "( (SENT (NP-SUJ (DET le) (NC chat)) (VN (V dort)) " \
+                "(PONCT .)))",
+            "( (SENT (VN (V voit)) (NP-OBJ (NPP Paul)) (PP (P à) " \
+                "(NPP Paris))))",
+            "( (SENT (Sint (VN (V viens)))))",
+        ]
+        for test_s in trees:
+            l_gtrans = _transitions(test_s)
+            self.assertEqual(Counter(remove_nt_to_nt(l_gtrans)), \
+                Counter(_baseline_remove_nt_to_nt(l_gtrans)), test_s)
+
+
+    def test_same_symbol_chain(self):
+        # NP -> NP: the baseline finds the chain itself again and loops
+        l_gtrans = _transitions("( (SENT (NP (NP (DET le) (NC chat)))))")
+        self.assertEqual(Counter(remove_nt_to_nt(l_gtrans)), Counter([ \
+            _rule("SENT", "DET", "NC"), _rule("NP", "DET", "NC"), \
+            _rule("NP", "DET", "NC"), _rule("DET", "le"), \
+            _rule("NC", "chat"), \
+            # Added for the symbols above the bottom of the chain
+            _rule("SENT", "DET", "NC"), _rule("NP", "DET", "NC"), \
+            _rule("SENT", "DET", "NC"), _rule("NP", "DET", "NC")]))
+
+
+    def test_chain_within_own_subtree(self):
+        # The unary NP -> AP must reach the AP of its own subtree (AP -> ADV
+        # ADJ), not the first AP of the sentence (AP -> ADJ -> grand). The
+        # symbols above a chain still get all the results of its bottom
+        # symbol (NP -> grand via AP -> grand)
+        test_s = "( (SENT (VN (V voit)) (AP (ADJ grand)) (NP (AP " \
+            "(ADV très) (ADJ beau)))))"
+        l_gtrans = _transitions(test_s)
+        expected = Counter([_rule("SENT", "VN", "AP", "NP"), \
+            _rule("VN", "voit"), _rule("V", "voit"), _rule("AP", "grand"), \
+            _rule("ADJ", "grand"), _rule("NP", "ADV", "ADJ"), \
+            _rule("AP", "ADV", "ADJ"), _rule("ADV", "très"), \
+            _rule("ADJ", "beau"), \
+            # Added for the symbols above the bottom of the chains
+            _rule("VN", "voit"), _rule("AP", "grand"), _rule("AP", "beau"), \
+            _rule("NP", "grand"), _rule("NP", "ADV", "ADJ")])
+        self.assertEqual(Counter(remove_nt_to_nt(l_gtrans, SymbolTable())), \
+            expected)
+        # The baseline collapsed NP -> AP to NP -> grand
+        baseline = Counter(_baseline_remove_nt_to_nt(l_gtrans))
+        self.assertEqual(baseline[_rule("NP", "grand")], 3)
+        self.assertNotEqual(baseline, expected)
+
+
+    def test_not_in_pre_order(self):
+        l_gtrans = _transitions("( (SENT (NP (NPP Gutenberg))))")
+        with self.assertRaises(Exception):
+            remove_nt_to_nt(l_gtrans[::-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
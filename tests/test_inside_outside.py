@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the batches of the inside-outside algorithm: the posteriors do not
+depend on the size of the batches, which is bounded by their memory.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.inside_outside import batch_span_posteriors
+import numpy as np
+import unittest
+
+
+TREES = [
+    "( (SENT (NP-SUJ (DET le) (NC chat)) (VN (V dort)) (PONCT .)))",
+    "( (SENT (NP-SUJ (DET le) (NC chien)) (VN (V voit)) (NP-OBJ (DET le) " \
+        "(NC chat)) (PONCT .)))",
+    "( (SENT (NP-SUJ (DET un) (NC chat)) (VN (V dort)) (PONCT .)))",
+]
+
+
+class Test_Batch_Span_Posteriors(unittest.TestCase):
+
+
+    def setUp(self):
+        pcfg = PCFG(TREES, chomsky_normalize=True)
+        self.grammar = pcfg.compile()
+        self.root = self.grammar.nt_id(GSymbol("SENT", GSymbol.NON_TERMINAL))
+        self.sentences = [[self.grammar.word_id(w) for w in s.split(" ")] \
+            for s in ["le chat dort .", "un chat dort .", "le chien dort .", \
+            "le chien voit le chat ."]]
+
+
+    def test_memory_bound(self):
+        # A bound smaller than the arrays of a sentence parses each
+        # sentence alone
+        expected = batch_span_posteriors(self.grammar, self.sentences, \
+            self.root)
+        posteriors = batch_span_posteriors(self.grammar, self.sentences, \
+            self.root, max_memory=1)
+        self.assertEqual(len(posteriors), len(expected))
+        for posterior, expected_posterior in zip(posteriors, expected):
+            self.assertIsNotNone(posterior)
+            np.testing.assert_allclose(posterior, expected_posterior)
+
+
+if __name__ == "__main__":
+    unittest.main()
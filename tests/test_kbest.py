@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the k best parses of the vectorized parser (parse_kbest), against
+an enumeration of all the derivations of a small ambiguous grammar.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.vectorized_parse import Vectorized_CYK_Parser
+import contextlib
+import io
+import unittest
+
+
+# Attachments of the prepositional phrases to the verb or to the nouns
+TREES = [
+    "( (SENT (NP (NPP Marie)) (VN (V voit)) (NP (DET le) (NC chat)) " \
+        "(PP (P de) (NP (DET la) (NC cuisine)))))",
+    "( (SENT (NP (NPP Marie)) (VN (V voit)) (NP (DET le) (NC chat) " \
+        "(PP (P de) (NP (DET la) (NC cuisine))))))",
+    "( (SENT (NP (NPP Marie)) (VN (V voit)) (NP (DET le) (NC chat) " \
+        "(PP (P de) (NP (DET la) (NC cuisine) (PP (P de) (NP (DET la) " \
+        "(NC maison))))))))",
+    "( (SENT (NP (NPP Paul)) (VN (V dort))))",
+]
+SENTENCES = [
+    "Marie voit le chat de la cuisine",
+    "Marie voit le chat de la cuisine de la maison",
+    "Paul voit le chat de la maison de la cuisine de la maison",
+]
+
+
+def _all_derivations(parser, resolved):
+    # All the derivations of each node (lev, k, a) of the chart, as
+    # (score, split, rule, left index, right index) sorted by decreasing
+    # score
+    grammar = parser._grammar
+    n = len(resolved)
+    derivations = {}
+    for k, w in enumerate(resolved):
+        nt_ids, logp = grammar.lexical_rules(grammar.word_id(w))
+        for a, score in zip(nt_ids.tolist(), logp.tolist()):
+            derivations[(0, k, a)] = [(score, None, None, 0, 0)]
+    for lev in range(1, n):
+        for k in range(n-lev):
+            for r in range(len(parser._rule_parent)):
+                a = int(parser._rule_parent[r])
+                for i in range(lev):
+                    left = derivations.get((i, k, \
+                        int(parser._rule_left[r])), [])
+                    right = derivations.get((lev-i-1, k+1+i, \
+                        int(parser._rule_right[r])), [])
+                    for l, d_left in enumerate(left):
+                        for m, d_right in enumerate(right):
+                            derivations.setdefault((lev, k, a), []).append( \
+                                (d_left[0] + d_right[0] + \
+                                    float(parser._rule_logp[r]), i, r, l, m))
+            for a in range(grammar.n_nt()):
+                if (lev, k, a) in derivations.keys():
+                    derivations[(lev, k, a)].sort(key=lambda d: -d[0])
+    return derivations
+
+
+class Test_KBest(unittest.TestCase):
+
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parser = Vectorized_CYK_Parser(PCFG(TREES, \
+            chomsky_normalize=True), GSymbol("SENT", GSymbol.NON_TERMINAL))
+
+
+    def _brute_force(self, test_s):
+        # The scores and parses of all the derivations of the sentence
+        with contextlib.redirect_stdout(io.StringIO()):
+            words, resolved = self.parser._resolve_sentence(test_s)
+        derivations = _all_derivations(self.parser, resolved)
+        root = self.parser._grammar.nt_id(self.parser._root_symbol)
+
+        def backpointer(lev, k, a, index):
+            return derivations[(lev, k, a)][index][1:]
+
+        return [(d[0], self.parser._derivation_tree(words, (len(words)-1, \
+            0, root, index), backpointer).to_bracketed()) for index, d in \
+            enumerate(derivations.get((len(words)-1, 0, root), []))]
+
+
+    def test_first_is_parse(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for test_s in SENTENCES:
+                res = self.parser.parse_kbest(test_s, 5)
+                self.assertEqual(res[0][1], self.parser.parse(test_s))
+
+
+    def test_decreasing_scores(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for test_s in SENTENCES:
+                scores = [score for score, z in \
+                    self.parser.parse_kbest(test_s, 50)]
+                self.assertGreater(len(scores), 1)
+                for i in range(1, len(scores)):
+                    self.assertLessEqual(scores[i], scores[i-1])
+
+
+    def test_brute_force(self):
+        for test_s in SENTENCES:
+            expected = self._brute_force(test_s)
+            self.assertGreater(len(expected), 1)
+            for k in (1, 2, len(expected), len(expected)+10):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    res = self.parser.parse_kbest(test_s, k)
+                self.assertEqual(len(res), min(k, len(expected)))
+                for (score, z), (expected_score, y) in zip(res, expected):
+                    self.assertAlmostEqual(score, expected_score)
+            # Fewer than k derivations: all of them
+            self.assertEqual(sorted(parse for z, parse in res), \
+                sorted(parse for z, parse in expected))
+
+
+    def test_failed_parse(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.parser.parse_kbest("le chat le chat", 3), \
+                [])
+
+
+if __name__ == "__main__":
+    unittest.main()
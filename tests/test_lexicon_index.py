@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the deletion index of the lexicon (LexiconIndex), against a scan of
+the whole lexicon with edit_distance, and of the choice of the replacement
+of an unknown word among the nearest ones (the most frequent).
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.parse import CYK_Parser, LexiconIndex, edit_distance
+import contextlib
+import io
+import random
+import unittest
+
+
+# Words longer than the indexed prefixes, which only differ after them
+WORDS = ["chat", "chats", "chut", "chien", "chiens", "le", "la", "les", \
+    "constitution", "constitutions", "constitutionnel", "institution", \
+    "anticonstitutionnellement", "anticonstitutionnel", "a", "é", "été"]
+
+
+def _random_lexicon(n, seed):
+    # Words over a small alphabet, so that many are close to each other
+    rng = random.Random(seed)
+    words = []
+    while len(words) < n:
+        w = "".join(rng.choice("abc") for z in range(rng.randint(1, 12)))
+        if w not in words:
+            words.append(w)
+    return words
+
+
+def _queries(words, seed):
+    # The words, words with a few random edits, and unrelated words
+    rng = random.Random(seed)
+    queries = list(words) + ["", "x", "chaton", "anticonstitutionnelle"]
+    for w in words:
+        q = list(w)
+        for z in range(rng.randint(1, 4)):
+            i = rng.randint(0, len(q))
+            op = rng.randint(0, 2)
+            if op == 0:
+                q.insert(i, rng.choice("abcé"))
+            elif i < len(q):
+                if op == 1:
+                    del q[i]
+                else:
+                    q[i] = rng.choice("abcé")
+        queries.append("".join(q))
+    return queries
+
+
+class Test_Lexicon_Index(unittest.TestCase):
+
+
+    def _check_lookup(self, words, prefix_length):
+        index = LexiconIndex(words, max_distance=3, \
+            prefix_length=prefix_length)
+        for q in _queries(words, 0):
+            distances = [edit_distance(q, w) for w in words]
+            for k in range(4):
+                expected = [[w for w, d in zip(words, distances) if d == z] \
+                    for z in range(k+1)]
+                self.assertEqual(index.lookup(q, k), expected, (q, k))
+
+                # The first group which is not empty
+                expected_distance, expected_words = None, []
+                for z in range(k+1):
+                    if len(expected[z]) > 0:
+                        expected_distance, expected_words = z, expected[z]
+                        break
+                self.assertEqual(index.nearest(q, k), \
+                    (expected_distance, expected_words), (q, k))
+
+
+    def test_lookup(self):
+        for prefix_length in (7, 4, 2):
+            self._check_lookup(WORDS, prefix_length)
+
+
+    def test_lookup_random_lexicon(self):
+        self._check_lookup(_random_lexicon(150, 1), 4)
+
+
+    def test_distance_over_index(self):
+        index = LexiconIndex(WORDS, max_distance=2)
+        with self.assertRaises(Exception):
+            index.lookup("chat", 3)
+        with self.assertRaises(Exception):
+            index.nearest("chat", 3)
+
+
+    def test_most_frequent_replacement(self):
+        # chat and chut are both at distance 1 of chot: the replacement is
+        # the most frequent, whatever the order of the lexicon
+        for counts, expected in (((1, 3), "chut"), ((3, 1), "chat")):
+            trees = ["( (SENT (NC chat) (V dort)))"] * counts[0] + \
+                ["( (SENT (NC chut) (V dort)))"] * counts[1]
+            for order in (trees, trees[::-1]):
+                parser = CYK_Parser(PCFG(order, chomsky_normalize=True), \
+                    GSymbol("SENT", GSymbol.NON_TERMINAL))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(parser._replace_word("chot"), expected)
+                distance, words = parser._lexicon_index.nearest("chot")
+                self.assertEqual(distance, 1)
+                self.assertEqual(sorted(words), ["chat", "chut"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the versions of the binary model format: the counts of the rules
+are saved in the version 2, and the models of the version 1 are loaded to
+parse only.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG
+from speechnlpProject.model_io import MODEL_VERSION
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+
+TREES = [
+    "( (SENT (NP-SUJ (DET le) (NC chat)) (VN (V dort)) (PONCT .)))",
+    "( (SENT (NP-SUJ (DET le) (NC chien)) (VN (V voit)) (NP-OBJ (DET le) " \
+        "(NC chat)) (PONCT .)))",
+]
+NEW_TREES = ["( (SENT (NP-SUJ (DET un) (NC oiseau)) (VN (V chante)) " \
+    "(PONCT .)))"]
+
+
+class Test_Model_Versions(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "model.npz")
+        self.pcfg = PCFG(TREES, chomsky_normalize=True)
+        self.pcfg.save(self.path)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def test_update_loaded_model(self):
+        with np.load(self.path) as arrays:
+            self.assertEqual(int(arrays["version"]), MODEL_VERSION)
+        pcfg = PCFG.load(self.path)
+        pcfg.update(NEW_TREES)
+        self.assertEqual(pcfg.fingerprint(), \
+            PCFG(TREES + NEW_TREES, chomsky_normalize=True).fingerprint())
+        self.assertEqual(set(pcfg.final_non_terminals()), \
+            set(self.pcfg.final_non_terminals()))
+        pcfg.remove(NEW_TREES)
+        self.assertEqual(pcfg.fingerprint(), self.pcfg.fingerprint())
+
+
+    def test_version_1_parse_only(self):
+        # A version 1 file: the same arrays, without the counts
+        with np.load(self.path) as arrays:
+            arrays_v1 = {name: arrays[name] for name in arrays.files \
+                if name not in ("rule_count", "train_options")}
+        arrays_v1["version"] = np.array(1, dtype=np.int32)
+        np.savez(self.path, **arrays_v1)
+
+        pcfg = PCFG.load(self.path)
+        self.assertEqual(pcfg.fingerprint(), self.pcfg.fingerprint())
+        with self.assertRaises(Exception):
+            pcfg.update(NEW_TREES)
+        with self.assertRaises(Exception):
+            pcfg.remove(TREES)
+        self.assertEqual(pcfg.fingerprint(), self.pcfg.fingerprint())
+
+
+if __name__ == "__main__":
+    unittest.main()
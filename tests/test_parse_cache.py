@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the parse caches: eviction and counters of the LRU map, keys of
+the sentences built from their words (whatever the white spaces), and
+parses found in the SQLite tier by another cache.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.vectorized_parse import Vectorized_CYK_Parser
+from speechnlpProject.parse_cache import LRU_Cache, Parse_Cache
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+
+TREES = [
+    "( (SENT (NP-SUJ (DET le) (NC chat)) (VN (V dort)) (PONCT .)))",
+    "( (SENT (NP-SUJ (DET le) (NC chien)) (VN (V voit)) (NP-OBJ (DET le) " \
+        "(NC chat)) (PONCT .)))",
+]
+PARSE = "(SENT (NP (DET le) (NC chat)) (VN dort) (PONCT .))"
+
+
+class Test_LRU_Cache(unittest.TestCase):
+
+
+    def test_eviction(self):
+        cache = LRU_Cache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        # a becomes the most recently used, so b is evicted
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("c"), 3)
+        # Updating a key does not evict anything
+        cache.put("c", 4)
+        self.assertEqual(cache.get("c"), 4)
+        self.assertEqual(cache.stats(), {"hits": 3, "misses": 1, \
+            "evictions": 1, "size": 2})
+
+
+    def test_positive_size(self):
+        with self.assertRaises(Exception):
+            LRU_Cache(0)
+
+
+class Test_Parse_Cache(unittest.TestCase):
+
+
+    def setUp(self):
+        self.pcfg = PCFG(TREES, chomsky_normalize=True)
+        self.root = GSymbol("SENT", GSymbol.NON_TERMINAL)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "parses.sqlite")
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def _parse(self, parser, test_s):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return parser.parse(test_s)
+
+
+    def test_white_spaces(self):
+        # The same key and parse, without empty words
+        parser = Vectorized_CYK_Parser(self.pcfg, self.root, \
+            cache=Parse_Cache(max_size=10))
+        sentences = ["le chat dort .", "le  chat dort .", \
+            " le chat\tdort . ", "le chat dort .\n"]
+        for test_s in sentences:
+            self.assertEqual(parser._cache_key(test_s), \
+                parser._cache_key(sentences[0]))
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(parser._resolve_sentence(test_s), \
+                    (["le", "chat", "dort", "."], ["le", "chat", "dort", "."]))
+            self.assertEqual(self._parse(parser, test_s), PARSE)
+        stats = parser.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), \
+            (3, 1, 1))
+
+
+    def test_memory_eviction(self):
+        parser = Vectorized_CYK_Parser(self.pcfg, self.root, \
+            cache=Parse_Cache(max_size=1))
+        self._parse(parser, "le chat dort .")
+        self._parse(parser, "le chien voit le chat .")
+        self._parse(parser, "le chat dort .")
+        stats = parser.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], \
+            stats["evictions"], stats["size"]), (0, 3, 2, 1))
+
+
+    def test_disk_tier(self):
+        parser = Vectorized_CYK_Parser(self.pcfg, self.root, \
+            cache=Parse_Cache(max_size=10, path=self.path))
+        self.assertEqual(self._parse(parser, "le chat dort ."), PARSE)
+        self.assertIsNone(self._parse(parser, "chat le le"))
+
+        # Another cache on the same file: found on disk, then in memory
+        parser = Vectorized_CYK_Parser(self.pcfg, self.root, \
+            cache=Parse_Cache(max_size=10, path=self.path))
+        for z in range(2):
+            self.assertEqual(self._parse(parser, "le  chat dort ."), PARSE)
+            self.assertEqual(parser.parse_status(), "exact")
+            self.assertIsNone(self._parse(parser, "chat le le"))
+        stats = parser.cache_stats()
+        self.assertEqual((stats["disk_hits"], stats["disk_misses"], \
+            stats["hits"], stats["misses"]), (2, 0, 2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the reading of the bracketed trees (read_tree, parse_transitions,
+recursive_parsed_to_token), against the previous implementation which
+parsed the parenthesis blocks of each level recursively.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import GSymbol, GTransition, read_tree, \
+    tree_transitions, parse_transitions, recursive_parsed_to_token, \
+    remove_nt_to_nt
+from collections import Counter
+import unittest
+
+
+def _baseline_parenthesis_blocks(test_s):
+    # The first level of parenthesis blocks, e.g. ["(1, a)", "(2, b)"] on
+    # "(1, a) (2, b)"
+    parsed = []
+    n_opened = 0
+    i_opened = 0
+    for cursor in range(len(test_s)):
+        if test_s[cursor] == "(":
+            if n_opened == 0:
+                i_opened = cursor
+            n_opened += 1
+        elif test_s[cursor] == ")":
+            n_opened -= 1
+            if n_opened == 0:
+                parsed.append(test_s[i_opened+1:cursor])
+    return parsed
+
+
+def _baseline_transitions(test_s, to_lower_case=False):
+    # The previous implementation: the transitions in pre-order of a tree
+    # without its outer parenthesis, e.g. "NP-SUJ (DET Cette) (NC expo)"
+    nts = test_s.split(' ', 1)[0]
+    nts = GSymbol(nts.split('-', 1)[0], GSymbol.NON_TERMINAL)
+    s_next_level = _baseline_parenthesis_blocks(test_s)
+    if len(s_next_level) > 0:
+        syms_next_level = []
+        for s_next in s_next_level:
+            sym = s_next.split(' ', 1)[0]
+            syms_next_level.append(GSymbol(sym.split('-', 1)[0], \
+                GSymbol.NON_TERMINAL))
+        res = [GTransition(nts, syms_next_level)]
+        for _test_s in s_next_level:
+            res += _baseline_transitions(_test_s, to_lower_case)
+        return res
+    sym = test_s.split(' ', 2)[1]
+    if to_lower_case:
+        sym = sym.lower()
+    return [GTransition(nts, [GSymbol(sym, GSymbol.TERMINAL)])]
+
+
+def _baseline_tokens(test_s, to_lower_case=False):
+    return " ".join(gtrans.res_symb()[0].ssymb() for gtrans in \
+        _baseline_transitions(test_s, to_lower_case) \
+        if gtrans.res_symb()[0].stype() == GSymbol.TERMINAL)
+
+
+# Trees of the treebank, with their inner string (without the outer
+# parenthesis) read by the previous implementation
+TREES = [
+    # Nested nodes and function tags
+    ("( (SENT (NP-SUJ (DET Cette) (NC exposition)) (VN (V montre)) " \
+        "(NP-OBJ (DET les) (NC œuvres) (PP (P de) (NP (NPP Monet)))) " \
+        "(PONCT .)))", \
+     "SENT (NP-SUJ (DET Cette) (NC exposition)) (VN (V montre)) " \
+        "(NP-OBJ (DET les) (NC œuvres) (PP (P de) (NP (NPP Monet)))) " \
+        "(PONCT .)"),
+    # Unary chains, one of them repeating its symbol
+    ("( (SENT (NP-SUJ (NPP Gutenberg)) (VN (V imprime)) " \
+        "(NP-OBJ (NP (NC Bibles))) (PONCT .)))", \
+     "SENT (NP-SUJ (NPP Gutenberg)) (VN (V imprime)) " \
+        "(NP-OBJ (NP (NC Bibles))) (PONCT .)"),
+    # Several function tags, a coordination and an embedded clause
+    ("( (SENT (ADV-MOD Hier) (PONCT ,) (NP-SUJ (PRO Il)) (VN (V est) " \
+        "(VPP venu)) (COORD (CC et) (Sint (VN (CLS-SUJ il) (V dort)))) " \
+        "(PONCT .)))", \
+     "SENT (ADV-MOD Hier) (PONCT ,) (NP-SUJ (PRO Il)) (VN (V est) " \
+        "(VPP venu)) (COORD (CC et) (Sint (VN (CLS-SUJ il) (V dort)))) " \
+        "(PONCT .)"),
+    # A single pre-terminal under the root
+    ("( (SENT (ADV Oui)))", "SENT (ADV Oui)"),
+]
+
+
+class Test_Read_Tree(unittest.TestCase):
+
+
+    def test_same_transitions_as_baseline(self):
+        for test_s, inner in TREES:
+            for to_lower_case in (False, True):
+                expected = _baseline_transitions(inner, to_lower_case)
+                self.assertEqual(tree_transitions(read_tree(test_s, \
+                    to_lower_case)), expected, test_s)
+                self.assertEqual(parse_transitions(test_s, to_lower_case), \
+                    Counter(remove_nt_to_nt(expected)), test_s)
+
+
+    def test_same_tokens_as_baseline(self):
+        for test_s, inner in TREES:
+            for to_lower_case in (False, True):
+                self.assertEqual(recursive_parsed_to_token(test_s, \
+                    to_lower_case), _baseline_tokens(inner, to_lower_case))
+
+
+    def test_outer_parenthesis(self):
+        # The same tree with or without the unused outer parenthesis
+        for test_s, inner in TREES:
+            self.assertEqual(read_tree(inner), read_tree(test_s))
+            self.assertEqual(read_tree("(" + inner + ")"), \
+                read_tree(test_s))
+
+
+if __name__ == "__main__":
+    unittest.main()
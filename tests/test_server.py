@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the timeouts of the parser service on a Unix socket: a slow
+sentence stops at its deadline in its worker, and the other sentences of its
+batch still get their parses, in the order of the requests.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.vectorized_parse import Vectorized_CYK_Parser
+from speechnlpProject.server import Parser_Server
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+
+TREES = ["( (SENT (N x) (SENT (N x) (N y))))", "( (SENT (N y) (N x)))", \
+    "( (SENT (N x) (N x)))"]
+
+
+class _Slow_Parser(Vectorized_CYK_Parser):
+    # Never ends the chart of a sentence starting with "y" before its time
+    # budget is spent, which it checks every 0.2 s (without budget, the
+    # worker would be busy forever)
+
+    def _build_chart(self, words, resolved, prune):
+        if words[0] == "y":
+            while True:
+                time.sleep(0.2)
+                self._spend(0, None)
+        return Vectorized_CYK_Parser._build_chart(self, words, resolved, \
+            prune)
+
+    def _right_branching_tree(self, words, resolved):
+        if words[0] == "y":
+            time.sleep(0.2)
+        return Vectorized_CYK_Parser._right_branching_tree(self, words, \
+            resolved)
+
+
+class Test_Parser_Server(unittest.TestCase):
+
+
+    def setUp(self):
+        parser = _Slow_Parser(PCFG(TREES, chomsky_normalize=True), \
+            GSymbol("SENT", GSymbol.NON_TERMINAL))
+        self.server = Parser_Server(parser, workers=1, batch_size=8, \
+            batch_delay=0.05)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "parser.sock")
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self.task = self.loop.create_task(self.server.serve(self.path, \
+            ready.set))
+        self.thread = threading.Thread(target=self._run)
+        self.thread.start()
+        self.assertTrue(ready.wait(10))
+
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        # Requests and batches left by the stopped server
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, \
+            return_exceptions=True))
+
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join()
+        self.loop.close()
+        self.server.close()
+        os.rmdir(self.directory)
+
+
+    def _requests(self, requests):
+        # Sends the requests at once, and gets each response with the time
+        # at which it was received
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(30)
+        sock.connect(self.path)
+        try:
+            stream = sock.makefile("rwb")
+            start = time.perf_counter()
+            for request in requests:
+                stream.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream.flush()
+            res = []
+            for request in requests:
+                response = json.loads(stream.readline().decode("utf-8"))
+                res.append((response, time.perf_counter() - start))
+            return res
+        finally:
+            sock.close()
+
+
+    def test_slow_sentence_first(self):
+        # Both sentences in the same batch: the fast one is parsed once the
+        # slow one is stopped, and the responses keep the order
+        res = self._requests([ \
+            {"id": 0, "sentence": "y x x", "timeout": 0.5}, \
+            {"id": 1, "sentence": "x x", "timeout": 10.0}])
+        self.assertEqual(res[0][0], {"id": 0, "error": "timeout"})
+        self.assertEqual(res[1][0]["id"], 1)
+        self.assertEqual(res[1][0]["parse"], "(SENT (N x) (N x))")
+        self.assertLess(res[1][1], 5.0)
+        self.assertEqual(self.server.stats()["timeouts"], 1)
+
+
+    def test_fast_sentence_first(self):
+        # The parse of the fast sentence is sent before the slow one of its
+        # batch is stopped, and the worker is free after the deadline
+        res = self._requests([ \
+            {"id": 0, "sentence": "x x", "timeout": 10.0}, \
+            {"id": 1, "sentence": "y x x", "timeout": 1.0}])
+        self.assertEqual(res[0][0]["parse"], "(SENT (N x) (N x))")
+        self.assertLess(res[0][1], 0.8)
+        self.assertEqual(res[1][0], {"id": 1, "error": "timeout"})
+        res = self._requests([{"id": 2, "sentence": "x x", "timeout": 2.0}])
+        self.assertEqual(res[0][0]["parse"], "(SENT (N x) (N x))")
+
+
+if __name__ == "__main__":
+    unittest.main()
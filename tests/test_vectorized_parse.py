@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the vectorized CYK parser: on a treebank without ties between
+derivations, it returns the same parses as CYK_Parser, with unknown words
+and for sentences that can not be parsed.
+Run with: python -m pytest -q tests
+"""
+
+
+from speechnlpProject.grammar import PCFG, GSymbol
+from speechnlpProject.parse import CYK_Parser
+from speechnlpProject.vectorized_parse import Vectorized_CYK_Parser
+import contextlib
+import io
+import unittest
+
+
+# The trees are repeated a different number of times, so that no two
+# derivations of a sentence have the same probability
+TREES = \
+    ["( (SENT (NP-SUJ (DET le) (NC chat)) (VN (V dort)) (PONCT .)))"] * 3 + \
+    ["( (SENT (NP-SUJ (DET le) (NC chien)) (VN (V voit)) (NP-OBJ (DET le) " \
+        "(NC chat)) (PONCT .)))"] * 2 + \
+    ["( (SENT (NP-SUJ (DET un) (NC chien)) (VN (V mange)) (NP-OBJ (DET le) " \
+        "(NC pain)) (PP-MOD (P dans) (NP (DET la) (NC cuisine))) " \
+        "(PONCT .)))"] + \
+    ["( (SENT (NP-SUJ (NPP Marie)) (VN (V voit)) (NP-OBJ (DET un) (NC chat) " \
+        "(PP (P de) (NP (DET la) (NC cuisine)))) (PONCT .)))"] * 5 + \
+    ["( (SENT (NP-SUJ (DET le) (NC chat) (AP (ADJ noir))) (VN (V dort)) " \
+        "(PONCT .)))"] * 7
+SENTENCES = [
+    "le chat dort .",
+    "le chien voit le chat noir .",
+    "Marie mange un chat de la cuisine .",
+    "le chien voit un chat dans la cuisine .",
+    # Unknown words, replaced by the nearest known words
+    "le chats dorment .",
+]
+# No SENT over the whole sentence
+FAILED = "le chat le chat"
+
+
+class Test_Vectorized_Parse(unittest.TestCase):
+
+
+    @classmethod
+    def setUpClass(cls):
+        pcfg = PCFG(TREES, chomsky_normalize=True)
+        root = GSymbol("SENT", GSymbol.NON_TERMINAL)
+        cls.cyk = CYK_Parser(pcfg, root)
+        cls.vectorized = Vectorized_CYK_Parser(pcfg, root)
+
+
+    def _parse(self, parser, test_s):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return parser.parse(test_s)
+
+
+    def test_same_parses(self):
+        for test_s in SENTENCES:
+            expected = self._parse(self.cyk, test_s)
+            self.assertIsNotNone(expected, test_s)
+            self.assertEqual(self._parse(self.vectorized, test_s), \
+                expected, test_s)
+
+
+    def test_unknown_words(self):
+        res = self._parse(self.vectorized, SENTENCES[-1])
+        self.assertEqual(res, "(SENT (NP (DET le) (NC chats)) " \
+            "(VN dorment) (PONCT .))")
+
+
+    def test_failed_parse(self):
+        self.assertIsNone(self._parse(self.cyk, FAILED))
+        self.assertIsNone(self._parse(self.vectorized, FAILED))
+
+
+if __name__ == "__main__":
+    unittest.main()